@@ -2,8 +2,9 @@
 Finance API Blueprint
 Handles finance record queries and financial reports
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from app.services.finance_service import FinanceService
+from app.services.ledger_service import LedgerService
 from app.models.player import Player
 from app.models.game import Game
 
@@ -103,6 +104,56 @@ def get_all_finance_records(player_id: int):
         }), 500
 
 
+@finance_bp.route('/<int:player_id>/ledger', methods=['GET'])
+def get_cash_ledger(player_id: int):
+    """
+    Get the cash ledger of a player (every cash movement with running balance)
+
+    Args:
+        player_id: Player ID
+
+    Query Parameters:
+        round_number: Optional, only entries of this round
+
+    Response:
+    {
+        "success": true,
+        "data": [
+            {
+                "id": 1,
+                "player_id": 1,
+                "round_number": 1,
+                "entry_type": "material",
+                "amount": -1123.45,
+                "balance_after": 8876.55,
+                "created_at": "..."
+            },
+            ...
+        ]
+    }
+    """
+    try:
+        round_number = request.args.get('round_number', type=int)
+        result = LedgerService.get_entries(player_id, round_number)
+
+        return jsonify({
+            "success": True,
+            "data": result
+        }), 200
+
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 404
+
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Internal server error: {str(e)}"
+        }), 500
+
+
 @finance_bp.route('/game/<int:game_id>/profit-summary', methods=['GET'])
 def get_profit_summary(game_id: int):
     """
@@ -160,6 +211,55 @@ def get_profit_summary(game_id: int):
         }), 500
 
 
+@finance_bp.route('/game/<int:game_id>/final-report', methods=['GET'])
+def get_final_report(game_id: int):
+    """
+    Get the end-of-game report (rankings, per-round series, per-product totals)
+
+    Built once when the last round settles and served with a strong ETag;
+    send If-None-Match to get 304 Not Modified.
+
+    Args:
+        game_id: Game ID
+
+    Response:
+    {
+        "success": true,
+        "data": {
+            "game_id": 1,
+            "rounds": [1, 2, ...],
+            "rankings": [...],
+            "players": [...]
+        }
+    }
+    """
+    try:
+        payload, etag = FinanceService.get_final_report(game_id)
+
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = jsonify({
+                "success": True,
+                "data": payload
+            })
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Internal server error: {str(e)}"
+        }), 500
+
+
 @finance_bp.route('/<int:player_id>/detailed-report', methods=['GET'])
 def get_detailed_report(player_id: int):
     """
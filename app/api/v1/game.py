@@ -3,10 +3,13 @@
 """
 from flask import Blueprint, request, jsonify
 from app.core.database import db
-from app.models.game import Game, CustomerFlow
+from app.models.game import Game
 from app.models.player import Player
+from app.utils.customer_flow_table import CustomerFlowTable
+from app.utils.game_cache import GameScopedCache
 from datetime import datetime
 import random
+import secrets
 import string
 
 # 蓝图
@@ -44,12 +47,23 @@ def create_game():
     if not player_name:
         return jsonify({"success": False, "error": "请输入玩家昵称"}), 400
 
+    # 可选：客流剧本与单局客流覆盖 {"customer_flow_overrides": {"3": {"high": 50, "low": 200}}}
+    flow_settings = None
+    if data.get('customer_flow_overrides') or data.get('flow_scenario'):
+        try:
+            flow_settings = CustomerFlowTable.with_overrides(
+                None, data.get('customer_flow_overrides') or {}, scenario=data.get('flow_scenario')
+            )
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+
     # 若当前 session 已绑定旧房间，视为重新开房：删除旧玩家，房间无玩家则清理
     existing_player = Player.query.filter_by(session_token=session_token).first()
     if existing_player:
         old_game_id = existing_player.game_id
         db.session.delete(existing_player)
         db.session.commit()
+        GameScopedCache.invalidate_game(old_game_id)
 
         if old_game_id:
             remaining = Player.query.filter_by(game_id=old_game_id).count()
@@ -72,7 +86,8 @@ def create_game():
         room_code=room_code,
         status='waiting',
         max_players=max_players,
-        current_round=1
+        current_round=1,
+        settings=flow_settings
     )
 
     db.session.add(game)
@@ -168,19 +183,12 @@ def start_game(game_id):
     game.status = 'in_progress'
     game.started_at = datetime.utcnow()
 
-    # 生成所有回合的客流（固定脚本）
-    from app.utils.game_constants import GameConstants
-    for round_num in range(1, 11):  # 10回合
-        flow_data = GameConstants.CUSTOMER_FLOW_SCRIPT.get(round_num, {"high": 40, "low": 300})
-
-        customer_flow = CustomerFlow(
-            game_id=game.id,
-            round_number=round_num,
-            high_tier_customers=flow_data["high"],
-            low_tier_customers=flow_data["low"]
-        )
-        db.session.add(customer_flow)
+    # 结算随机种子：组内余数分配可复算（见 CustomerFlowAllocator.settlement_rng）
+    settings = dict(game.settings or {})
+    settings.setdefault('rng_seed', secrets.randbits(63))
+    game.settings = settings
 
+    # 客流量不再逐回合写入 customer_flows：结算时查进程内客流表（CustomerFlowTable）
     db.session.commit()
 
     return jsonify({
@@ -6,6 +6,7 @@ from app.core.database import db
 from app.models.game import Game
 from app.models.player import Player
 from app.models.product import ProductRecipe, PlayerProduct
+from app.utils.game_cache import GameScopedCache
 from datetime import datetime
 
 # 蓝图
@@ -54,6 +55,7 @@ def join_game():
         old_game_id = existing_player.game_id
         db.session.delete(existing_player)
         db.session.commit()
+        GameScopedCache.invalidate_game(old_game_id)
 
         if old_game_id and old_game_id != game.id:
             remaining = Player.query.filter_by(game_id=old_game_id).count()
@@ -121,6 +123,7 @@ def leave_game(player_id):
 
     db.session.delete(player)
     db.session.commit()
+    GameScopedCache.invalidate_game(game_id)
 
     # 如果房间空了，删除房间
     remaining_players = Player.query.filter_by(game_id=game_id).count()
@@ -4,8 +4,14 @@ Handles production plan submission and queries
 """
 from flask import Blueprint, request, jsonify
 from app.services.production_service import ProductionService
+from app.services.batch_plan_evaluator import BatchPlanEvaluator
+from app.services.preview_service import SalesPreviewService
+from app.services.settlement_service import SettlementService
 from app.models.player import Player
 from app.models.game import Game
+from app.core.logger import get_logger
+
+logger = get_logger("api.production")
 
 production_bp = Blueprint('production', __name__)
 
@@ -15,6 +21,9 @@ def submit_production_plan():
     """
     Submit production plan for a player in a specific round
 
+    Resubmitting for the same round only rewrites changed rows and charges
+    or refunds the difference in material cost.
+
     Request body:
     {
         "player_id": 1,
@@ -35,6 +44,7 @@ def submit_production_plan():
                 ...
                 "total_cost": 123.45
             },
+            "material_delta": 123.45,
             "remaining_cash": 8876.55
         }
     }
@@ -114,20 +124,14 @@ def submit_production_plan():
         )
 
         # Check if all players have submitted their production plans
-        all_submitted = True
-        players = Player.query.filter_by(game_id=game.id, is_active=True).all()
-        for p in players:
-            from app.models.product import RoundProduction
-            productions_check = RoundProduction.query.filter_by(
-                player_id=p.id,
-                round_number=round_number
-            ).all()
-            if not productions_check:
-                all_submitted = False
-                break
+        all_submitted = ProductionService.get_submission_status(game.id, round_number)["all_submitted"]
 
         result["all_players_submitted"] = all_submitted
 
+        # Last submission of the round: precompute settlement so advance only persists it
+        if all_submitted:
+            SettlementService.schedule(game.id, round_number)
+
         return jsonify({
             "success": True,
             "data": result
@@ -142,15 +146,10 @@ def submit_production_plan():
 
     except Exception as e:
         # Unexpected errors
-        import traceback
-        error_traceback = traceback.format_exc()
-        print(f"=== PRODUCTION SUBMIT ERROR ===")
-        print(error_traceback)
-        print(f"=== END ERROR ===")
+        logger.exception("production_submit_failed")
         return jsonify({
             "success": False,
-            "error": f"Internal server error: {str(e)}",
-            "traceback": error_traceback
+            "error": f"Internal server error: {str(e)}"
         }), 500
 
 
@@ -256,7 +255,8 @@ def preview_material_needs():
         # Calculate material needs
         from app.services.calculation_engine import DiscountCalculator
 
-        material_needs = ProductionService.calculate_material_needs(productions)
+        normalized_productions = ProductionService.normalize_productions(productions)
+        material_needs = ProductionService.calculate_material_needs(normalized_productions)
         material_costs = DiscountCalculator.calculate_material_costs(material_needs)
 
         return jsonify({
@@ -267,6 +267,278 @@ def preview_material_needs():
             }
         }), 200
 
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Internal server error: {str(e)}"
+        }), 500
+
+
+@production_bp.route('/evaluate-plans', methods=['POST'])
+def evaluate_plans():
+    """
+    Score many candidate production plans in one call without submitting any
+
+    Request body:
+    {
+        "player_id": 1,
+        "round_number": 1,
+        "plans": [
+            [{"product_id": 1, "productivity": 5, "price": 15}],
+            [{"product_id": 1, "productivity": 3, "price": 20}, {"product_id": 2, "productivity": 2, "price": 25}]
+        ]
+    }
+
+    Response:
+    {
+        "success": true,
+        "data": {
+            "player_id": 1,
+            "round_number": 1,
+            "cash": 10000.0,
+            "total_productivity": 15,
+            "results": [
+                {
+                    "index": 0,
+                    "valid": true,
+                    "errors": [],
+                    "material_needs": {"tea": 5, "milk": 5, "fruit": 0, "ingredient": 0},
+                    "material_costs": {"tea": {...}, "milk": {...}, "total_cost": 50.0},
+                    "material_delta": 50.0,
+                    "remaining_cash": 9950.0
+                },
+                ...
+            ]
+        }
+    }
+    """
+    try:
+        data = request.get_json()
+
+        if not data:
+            return jsonify({
+                "success": False,
+                "error": "Request body is required"
+            }), 400
+
+        player_id = data.get('player_id')
+        round_number = data.get('round_number')
+
+        if not player_id:
+            return jsonify({
+                "success": False,
+                "error": "player_id is required"
+            }), 400
+
+        if not round_number:
+            return jsonify({
+                "success": False,
+                "error": "round_number is required"
+            }), 400
+
+        player = Player.query.get(player_id)
+        if not player:
+            return jsonify({
+                "success": False,
+                "error": f"Player {player_id} not found"
+            }), 404
+
+        result = BatchPlanEvaluator.evaluate_many(player_id, round_number, data.get('plans', []))
+
+        return jsonify({
+            "success": True,
+            "data": result
+        }), 200
+
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Internal server error: {str(e)}"
+        }), 500
+
+
+@production_bp.route('/<int:player_id>/cost-curve', methods=['GET'])
+def get_cost_curve(player_id: int):
+    """
+    Get material cost curves for quantities 0..N of every unlocked product
+
+    Lets the client price any slider position locally instead of calling
+    /material-preview on every move.
+
+    Query Parameters:
+        max_quantity: Optional N, defaults to the player's total productivity
+
+    Response:
+    {
+        "success": true,
+        "data": {
+            "player_id": 1,
+            "max_quantity": 30,
+            "material_curves": {"tea": [0.0, 6.0, 12.0, ...], ...},
+            "products": [
+                {
+                    "product_id": 1,
+                    "recipe_id": 1,
+                    "name": "Milk Tea",
+                    "recipe": {"milk": 1, "tea": 1},
+                    "costs": [0.0, 10.0, 20.0, ...]
+                }
+            ]
+        }
+    }
+
+    The exact cost of a combined plan is the sum over materials of
+    material_curves[material][total units of that material].
+    """
+    try:
+        player = Player.query.get(player_id)
+        if not player:
+            return jsonify({
+                "success": False,
+                "error": f"Player {player_id} not found"
+            }), 404
+
+        max_quantity = request.args.get('max_quantity', type=int)
+        result = ProductionService.get_cost_curve(player_id, max_quantity)
+
+        return jsonify({
+            "success": True,
+            "data": result
+        }), 200
+
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Internal server error: {str(e)}"
+        }), 500
+
+
+@production_bp.route('/preview-sales', methods=['POST'])
+def preview_sales():
+    """
+    Preview projected sales for the current round without submitting or settling
+
+    Uses the plans already submitted by every player in the game, plus one
+    hypothetical change for the requesting player.
+
+    Request body:
+    {
+        "player_id": 1,
+        "round_number": 1,
+        "override": {"product_id": 1, "price": 25, "productivity": 10}  # optional, productivity optional
+    }
+
+    Response:
+    {
+        "success": true,
+        "data": {
+            "round_number": 1,
+            "override": {"product_id": 1, "price": 25.0, "productivity": 10},
+            "baseline": {
+                "products": [
+                    {
+                        "product_id": 1,
+                        "product_name": "Milk Tea",
+                        "price": 20.0,
+                        "produced": 10,
+                        "sold": 8,
+                        "sold_to_high": 3,
+                        "sold_to_low": 5,
+                        "revenue": 160.0
+                    }
+                ],
+                "total_revenue": 160.0
+            },
+            "projected": {...}
+        }
+    }
+    """
+    try:
+        data = request.get_json()
+
+        if not data:
+            return jsonify({
+                "success": False,
+                "error": "Request body is required"
+            }), 400
+
+        player_id = data.get('player_id')
+        round_number = data.get('round_number')
+        override = data.get('override')
+
+        if not player_id:
+            return jsonify({
+                "success": False,
+                "error": "player_id is required"
+            }), 400
+
+        if not round_number:
+            return jsonify({
+                "success": False,
+                "error": "round_number is required"
+            }), 400
+
+        if override is not None and not isinstance(override, dict):
+            return jsonify({
+                "success": False,
+                "error": "override must be an object"
+            }), 400
+
+        player = Player.query.get(player_id)
+        if not player:
+            return jsonify({
+                "success": False,
+                "error": f"Player {player_id} not found"
+            }), 404
+
+        game = Game.query.get(player.game_id)
+        if not game or game.status != 'in_progress':
+            return jsonify({
+                "success": False,
+                "error": "Game is not in progress"
+            }), 400
+
+        if round_number != game.current_round:
+            return jsonify({
+                "success": False,
+                "error": f"Round number mismatch. Game is at round {game.current_round}, but you requested round {round_number}"
+            }), 400
+
+        result = SalesPreviewService.preview_sales(
+            player_id=player_id,
+            round_number=round_number,
+            override=override
+        )
+
+        return jsonify({
+            "success": True,
+            "data": result
+        }), 200
+
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+
     except Exception as e:
         return jsonify({
             "success": False,
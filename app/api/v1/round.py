@@ -2,11 +2,14 @@
 Round API Blueprint
 Handles round progression and round queries
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from app.services.round_service import RoundService
-from app.services.finance_service import FinanceService
+from app.services.production_service import ProductionService
+from app.services.round_job_service import RoundJobQueueFullError, RoundJobService
 from app.models.game import Game
-from app.models.player import Player
+from app.core.logger import get_logger
+
+logger = get_logger("api.round")
 
 round_bp = Blueprint('round', __name__)
 
@@ -19,6 +22,11 @@ def advance_round(game_id: int):
     Args:
         game_id: Game ID
 
+    Query / Request Body (optional):
+        async: true to run settlement as a background job
+        expected_round: the round being settled; if it was already advanced,
+                        its stored result is returned instead of an error
+
     Response:
     {
         "success": true,
@@ -30,6 +38,14 @@ def advance_round(game_id: int):
             "game_finished": false
         }
     }
+
+    Async response (202):
+    {
+        "success": true,
+        "data": {"job_id": "...", "status": "queued", ...}
+    }
+    Poll GET /rounds/jobs/<job_id> for the result.
+    Returns 503 with Retry-After when too many advances are already pending.
     """
     try:
         # Verify game exists
@@ -40,19 +56,37 @@ def advance_round(game_id: int):
                 "error": f"Game {game_id} not found"
             }), 404
 
-        # Advance round
-        result = RoundService.advance_round(game_id)
-
-        # Generate finance records for all players for the previous round
-        previous_round = result["previous_round"]
-        players = Player.query.filter_by(game_id=game_id, is_active=True).all()
+        data = request.get_json(silent=True) or {}
+        run_async = request.args.get('async', '').lower() in ('1', 'true') or data.get('async') is True
+        if run_async:
+            try:
+                job = RoundJobService.enqueue_advance(game_id)
+            except RoundJobQueueFullError as e:
+                response = jsonify({
+                    "success": False,
+                    "error": str(e)
+                })
+                response.headers['Retry-After'] = '1'
+                return response, 503
+            response = jsonify({
+                "success": True,
+                "data": job
+            })
+            response.headers['Location'] = f"/api/v1/rounds/jobs/{job['job_id']}"
+            return response, 202
 
-        for player in players:
+        expected_round = request.args.get('expected_round', type=int)
+        if expected_round is None and data.get('expected_round') is not None:
             try:
-                FinanceService.generate_finance_record(player.id, previous_round)
-            except Exception as e:
-                # Log error but continue
-                print(f"Error generating finance record for player {player.id}: {str(e)}")
+                expected_round = int(data['expected_round'])
+            except (TypeError, ValueError):
+                return jsonify({
+                    "success": False,
+                    "error": "expected_round must be an integer"
+                }), 400
+
+        # Advance round (settlement and finance records are committed together)
+        result = RoundService.advance_round(game_id, expected_round=expected_round)
 
         return jsonify({
             "success": True,
@@ -66,20 +100,57 @@ def advance_round(game_id: int):
         }), 400
 
     except Exception as e:
-        import traceback
-        print(f"Error advancing round {game_id}: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("round_advance_failed", extra={"fields": {"game_id": game_id}})
         return jsonify({
             "success": False,
             "error": f"Internal server error: {str(e)}"
         }), 500
 
 
+@round_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_advance_job(job_id: str):
+    """
+    Get status of an asynchronous round advance
+
+    Args:
+        job_id: Job ID returned by POST /<game_id>/advance?async=true
+
+    Response:
+    {
+        "success": true,
+        "data": {
+            "job_id": "...",
+            "game_id": 1,
+            "round_number": 1,
+            "status": "succeeded",
+            "result": {...},
+            "error": null,
+            "created_at": "...",
+            "finished_at": "..."
+        }
+    }
+    """
+    job = RoundJobService.get_job(job_id)
+    if job is None:
+        return jsonify({
+            "success": False,
+            "error": f"Job {job_id} not found"
+        }), 404
+
+    return jsonify({
+        "success": True,
+        "data": job
+    }), 200
+
+
 @round_bp.route('/<int:game_id>/<int:round_number>/summary', methods=['GET'])
 def get_round_summary(game_id: int, round_number: int):
     """
     Get summary of a specific round
 
+    Settled rounds are served from their snapshot with a strong ETag;
+    send If-None-Match to get 304 Not Modified when nothing changed.
+
     Args:
         game_id: Game ID
         round_number: Round number
@@ -104,12 +175,18 @@ def get_round_summary(game_id: int, round_number: int):
             }), 404
 
         # Get round summary
-        result = RoundService.get_round_summary(game_id, round_number)
+        result, etag = RoundService.get_round_summary_with_etag(game_id, round_number)
 
-        return jsonify({
-            "success": True,
-            "data": result
-        }), 200
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = jsonify({
+                "success": True,
+                "data": result
+            })
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
 
     except ValueError as e:
         return jsonify({
@@ -124,10 +201,60 @@ def get_round_summary(game_id: int, round_number: int):
         }), 500
 
 
+@round_bp.route('/<int:game_id>/<int:round_number>/submissions', methods=['GET'])
+def get_round_submissions(game_id: int, round_number: int):
+    """
+    Get which players have submitted their production plan for a round
+
+    Cheap enough for lobby screens to poll.
+
+    Args:
+        game_id: Game ID
+        round_number: Round number
+
+    Response:
+    {
+        "success": true,
+        "data": {
+            "game_id": 1,
+            "round_number": 1,
+            "submitted_count": 1,
+            "total_players": 2,
+            "all_submitted": false,
+            "players": [
+                {"player_id": 1, "nickname": "Player 1", "submitted": true, "submitted_at": "..."},
+                {"player_id": 2, "nickname": "Player 2", "submitted": false, "submitted_at": null}
+            ]
+        }
+    }
+    """
+    try:
+        # Verify game exists
+        game = Game.query.get(game_id)
+        if not game:
+            return jsonify({
+                "success": False,
+                "error": f"Game {game_id} not found"
+            }), 404
+
+        result = ProductionService.get_submission_status(game_id, round_number)
+
+        return jsonify({
+            "success": True,
+            "data": result
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": f"Internal server error: {str(e)}"
+        }), 500
+
+
 @round_bp.route('/<int:game_id>/<int:round_number>/generate-flow', methods=['POST'])
 def generate_customer_flow(game_id: int, round_number: int):
     """
-    Generate customer flow for a specific round (admin/debug use)
+    Get customer flow for a specific round (admin/debug use)
 
     Args:
         game_id: Game ID
@@ -137,7 +264,6 @@ def generate_customer_flow(game_id: int, round_number: int):
     {
         "success": true,
         "data": {
-            "id": 1,
             "game_id": 1,
             "round_number": 1,
             "high_tier_customers": 25,
@@ -154,14 +280,20 @@ def generate_customer_flow(game_id: int, round_number: int):
                 "error": f"Game {game_id} not found"
             }), 404
 
-        # Generate customer flow
-        customer_flow = RoundService.generate_customer_flow(game_id, round_number)
+        # Look up customer flow
+        customer_flow = RoundService.get_customer_flow(game_id, round_number)
 
         return jsonify({
             "success": True,
-            "data": customer_flow.to_dict()
+            "data": customer_flow
         }), 200
 
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+
     except Exception as e:
         return jsonify({
             "success": False,
@@ -5,6 +5,9 @@ Handles shop management endpoints
 from flask import Blueprint, request, jsonify
 from app.services.shop_service import ShopService
 from app.models.player import Player
+from app.core.logger import get_logger
+
+logger = get_logger("api.shop")
 
 shop_bp = Blueprint('shop', __name__)
 
@@ -96,7 +99,7 @@ def upgrade_decoration(player_id: int):
     """
     try:
         data = request.get_json()
-        print(f"[UPGRADE] player_id: {player_id}, data: {data}")
+        logger.debug("decoration_upgrade_requested", extra={"fields": {"player_id": player_id, "data": data}})
 
         if not data:
             return jsonify({"success": False, "error": "Request body is required"}), 400
@@ -108,7 +111,7 @@ def upgrade_decoration(player_id: int):
 
         # Upgrade decoration
         result = ShopService.upgrade_decoration(player_id, target_level)
-        print(f"[UPGRADE SUCCESS] result: {result}")
+        logger.debug("decoration_upgraded", extra={"fields": {"player_id": player_id, "result": result}})
 
         return jsonify({
             "success": True,
@@ -116,10 +119,10 @@ def upgrade_decoration(player_id: int):
         }), 200
 
     except ValueError as e:
-        print(f"[UPGRADE ERROR] ValueError: {str(e)}")
+        logger.debug("decoration_upgrade_rejected", extra={"fields": {"player_id": player_id, "error": str(e)}})
         return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
-        print(f"[UPGRADE ERROR] Exception: {str(e)}")
+        logger.exception("decoration_upgrade_failed", extra={"fields": {"player_id": player_id}})
         return jsonify({"success": False, "error": f"Internal server error: {str(e)}"}), 500
 
 
@@ -29,6 +29,9 @@ class Config:
         "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 300))
     }
 
+    # 日志配置（DEBUG / INFO / WARNING / ERROR）
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+
     # CORS配置
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', 'http://localhost:3000,http://localhost:5173,http://localhost:5174,http://localhost:5175').split(',')
 
@@ -40,6 +43,11 @@ class Config:
     MAX_PLAYERS = int(os.getenv('MAX_PLAYERS', 4))
     INITIAL_CASH = float(os.getenv('INITIAL_CASH', 10000))
 
+    # 异步推进回合的工作线程数
+    ROUND_ADVANCE_WORKERS = int(os.getenv('ROUND_ADVANCE_WORKERS', 2))
+    # 排队与执行中的异步推进任务上限，超出时拒绝新请求
+    ROUND_ADVANCE_MAX_PENDING = int(os.getenv('ROUND_ADVANCE_MAX_PENDING', 32))
+
     # SocketIO配置
     SOCKETIO_CORS_ALLOWED_ORIGINS = CORS_ORIGINS
 
@@ -0,0 +1,136 @@
+"""
+结构化日志
+每条日志输出为一行 JSON，级别由 LOG_LEVEL 控制；关闭的级别不做任何格式化与计时开销
+"""
+import json
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+ROOT_LOGGER = "naicha"
+
+
+class JsonFormatter(logging.Formatter):
+    """把 LogRecord 格式化为单行 JSON，extra={"fields": {...}} 中的字段平铺输出"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.utcfromtimestamp(record.created).isoformat(timespec="milliseconds") + "Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage()
+        }
+        payload.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def configure_logging(level: str = "INFO"):
+    """
+    初始化根日志器（重复调用只更新级别）
+
+    Args:
+        level: DEBUG / INFO / WARNING / ERROR
+    """
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    root.propagate = False
+
+    if not root.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(JsonFormatter())
+        root.addHandler(handler)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """获取模块日志器，如 get_logger("round_service") -> naicha.round_service"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+# ==================== 分阶段计时 ====================
+
+_sql_counter = threading.local()
+_sql_listener_installed = False
+_sql_listener_lock = threading.Lock()
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_sql_counter, "active", 0):
+        _sql_counter.count += 1
+
+
+def _install_sql_listener():
+    """首次启用计时时才注册 SQL 计数监听，日志关闭时完全不挂钩"""
+    global _sql_listener_installed
+    with _sql_listener_lock:
+        if not _sql_listener_installed:
+            event.listen(Engine, "before_cursor_execute", _count_statement)
+            _sql_listener_installed = True
+
+
+class StageTimer:
+    """
+    记录一次操作各阶段耗时与 SQL 条数，结束时输出一条日志
+
+    用法:
+        timer = StageTimer(logger, "round_settled", game_id=1)
+        with timer.stage("verify"):
+            ...
+        timer.emit(round_number=1)
+
+    logger 未启用 INFO 时所有方法都是空操作。
+    """
+
+    def __init__(self, logger: logging.Logger, event_name: str, level: int = logging.INFO, **fields):
+        self.logger = logger
+        self.event_name = event_name
+        self.level = level
+        self.enabled = logger.isEnabledFor(level)
+        self.fields = fields
+        self.stages: Dict[str, float] = {}
+        self.sql: Dict[str, int] = {}
+
+        if self.enabled:
+            _install_sql_listener()
+            self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+
+        outer_active = getattr(_sql_counter, "active", 0)
+        outer_count = getattr(_sql_counter, "count", 0)
+        _sql_counter.active = outer_active + 1
+        _sql_counter.count = 0
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = round((time.perf_counter() - started) * 1000, 2)
+            self.sql[name] = _sql_counter.count
+            _sql_counter.active = outer_active
+            _sql_counter.count = outer_count + _sql_counter.count
+
+    def emit(self, **fields):
+        if not self.enabled:
+            return
+
+        record = dict(self.fields, **fields)
+        record["duration_ms"] = round((time.perf_counter() - self._started) * 1000, 2)
+        record["stages_ms"] = self.stages
+        record["sql_count"] = self.sql
+        record["sql_total"] = sum(self.sql.values())
+        self.logger.log(self.level, self.event_name, extra={"fields": record})
+
+
+# 导出
+__all__ = ['JsonFormatter', 'configure_logging', 'get_logger', 'StageTimer']
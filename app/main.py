@@ -5,6 +5,7 @@ from flask import Flask, jsonify
 from flask_cors import CORS
 from app.core.config import config
 from app.core.database import db, init_db
+from app.core.logger import configure_logging
 from app.services.session_cleanup import start_inactive_player_cleanup
 
 
@@ -18,6 +19,9 @@ def create_app(config_name='default', config_overrides=None):
         # 允许测试/脚本覆盖配置（如内存数据库）
         app.config.update(config_overrides)
 
+    # 初始化结构化日志
+    configure_logging(app.config.get('LOG_LEVEL', 'INFO'))
+
     # 初始化CORS - 默认放开前端调试
     CORS(app, resources={
         r"/api/*": {
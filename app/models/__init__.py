@@ -1,12 +1,12 @@
 # Models package
-from app.models.game import Game, CustomerFlow
+from app.models.game import Game, CustomerFlow, RoundSummary, RoundSubmission
 from app.models.player import Player, Shop, Employee
 from app.models.product import ProductRecipe, PlayerProduct, RoundProduction
-from app.models.finance import FinanceRecord, MaterialInventory, ResearchLog, MarketAction
+from app.models.finance import FinanceRecord, MaterialInventory, ResearchLog, MarketAction, FinalReport, CashLedgerEntry
 
 __all__ = [
-    'Game', 'CustomerFlow',
+    'Game', 'CustomerFlow', 'RoundSummary', 'RoundSubmission',
     'Player', 'Shop', 'Employee',
     'ProductRecipe', 'PlayerProduct', 'RoundProduction',
-    'FinanceRecord', 'MaterialInventory', 'ResearchLog', 'MarketAction'
+    'FinanceRecord', 'MaterialInventory', 'ResearchLog', 'MarketAction', 'FinalReport', 'CashLedgerEntry'
 ]
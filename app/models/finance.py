@@ -1,6 +1,6 @@
 """
 Finance-related data models
-Includes FinanceRecord, MaterialInventory, ResearchLog, MarketAction
+Includes FinanceRecord, MaterialInventory, ResearchLog, MarketAction, FinalReport, CashLedgerEntry
 """
 from app.core.database import db
 from datetime import datetime
@@ -168,5 +168,52 @@ class MarketAction(db.Model):
         }
 
 
+class FinalReport(db.Model):
+    """End-of-game report (built once when the last round settles)"""
+    __tablename__ = "final_reports"
+
+    id = db.Column(db.Integer, primary_key=True)
+    game_id = db.Column(db.Integer, db.ForeignKey('games.id', ondelete='CASCADE'), nullable=False, unique=True)
+    payload = db.Column(db.JSON, nullable=False, comment='Rankings, per-round series, per-product totals')
+    etag = db.Column(db.String(64), nullable=False, comment='SHA-256 of payload')
+    created_at = db.Column(db.TIMESTAMP, default=datetime.utcnow)
+
+    # Relationships
+    game = db.relationship("Game", back_populates="final_report")
+
+
+class CashLedgerEntry(db.Model):
+    """Cash ledger entry (append-only, one row per cash movement)"""
+    __tablename__ = "cash_ledger"
+
+    id = db.Column(db.Integer, primary_key=True)
+    player_id = db.Column(db.Integer, db.ForeignKey('players.id', ondelete='CASCADE'), nullable=False)
+    round_number = db.Column(db.Integer, nullable=False)
+    entry_type = db.Column(db.String(20), nullable=False, comment='material, hire, product_research, advertisement, market_research, decoration, revenue')
+    amount = db.Column(db.DECIMAL(10, 2), nullable=False, comment='Signed amount: negative = cash out')
+    balance_after = db.Column(db.DECIMAL(10, 2), nullable=True, comment='Player cash after this entry (NULL for backfilled rows)')
+    created_at = db.Column(db.TIMESTAMP, default=datetime.utcnow)
+
+    # Relationships
+    player = db.relationship("Player", back_populates="cash_ledger")
+
+    # Index
+    __table_args__ = (
+        db.Index('idx_ledger_player_round', 'player_id', 'round_number', 'entry_type'),
+    )
+
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            "id": self.id,
+            "player_id": self.player_id,
+            "round_number": self.round_number,
+            "entry_type": self.entry_type,
+            "amount": float(self.amount),
+            "balance_after": float(self.balance_after) if self.balance_after is not None else None,
+            "created_at": self.created_at.isoformat() if self.created_at else None
+        }
+
+
 # Export models
-__all__ = ['FinanceRecord', 'MaterialInventory', 'ResearchLog', 'MarketAction']
+__all__ = ['FinanceRecord', 'MaterialInventory', 'ResearchLog', 'MarketAction', 'FinalReport', 'CashLedgerEntry']
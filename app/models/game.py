@@ -23,6 +23,9 @@ class Game(db.Model):
     # 关系
     players = db.relationship("Player", back_populates="game", cascade="all, delete-orphan")
     customer_flows = db.relationship("CustomerFlow", back_populates="game", cascade="all, delete-orphan")
+    round_summaries = db.relationship("RoundSummary", back_populates="game", cascade="all, delete-orphan")
+    round_submissions = db.relationship("RoundSubmission", back_populates="game", cascade="all, delete-orphan")
+    final_report = db.relationship("FinalReport", back_populates="game", uselist=False, cascade="all, delete-orphan")
 
     def to_dict(self):
         """转换为字典"""
@@ -62,3 +65,40 @@ class CustomerFlow(db.Model):
             "high_tier_customers": self.high_tier_customers,
             "low_tier_customers": self.low_tier_customers
         }
+
+
+class RoundSummary(db.Model):
+    """回合结算摘要快照（结算时写入一次，之后只读）"""
+    __tablename__ = "round_summaries"
+
+    id = db.Column(db.Integer, primary_key=True)
+    game_id = db.Column(db.Integer, db.ForeignKey('games.id', ondelete='CASCADE'), nullable=False)
+    round_number = db.Column(db.Integer, nullable=False)
+    payload = db.Column(db.JSON, nullable=False, comment='RoundService.get_round_summary 的结果')
+    etag = db.Column(db.String(64), nullable=False, comment='payload 的 SHA-256')
+    created_at = db.Column(db.TIMESTAMP, default=datetime.utcnow)
+
+    # 关系
+    game = db.relationship("Game", back_populates="round_summaries")
+
+    __table_args__ = (
+        db.UniqueConstraint('game_id', 'round_number', name='uk_summary_game_round'),
+    )
+
+
+class RoundSubmission(db.Model):
+    """回合提交记录（每名玩家每回合一行，提交生产计划时在同一事务内写入）"""
+    __tablename__ = "round_submissions"
+
+    id = db.Column(db.Integer, primary_key=True)
+    game_id = db.Column(db.Integer, db.ForeignKey('games.id', ondelete='CASCADE'), nullable=False)
+    round_number = db.Column(db.Integer, nullable=False)
+    player_id = db.Column(db.Integer, db.ForeignKey('players.id', ondelete='CASCADE'), nullable=False)
+    submitted_at = db.Column(db.TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # 关系
+    game = db.relationship("Game", back_populates="round_submissions")
+
+    __table_args__ = (
+        db.UniqueConstraint('game_id', 'round_number', 'player_id', name='uk_submission_game_round_player'),
+    )
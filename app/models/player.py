@@ -30,6 +30,12 @@ class Player(db.Model):
     material_inventories = db.relationship("MaterialInventory", back_populates="player", cascade="all, delete-orphan")
     research_logs = db.relationship("ResearchLog", back_populates="player", cascade="all, delete-orphan")
     market_actions = db.relationship("MarketAction", back_populates="player", cascade="all, delete-orphan")
+    cash_ledger = db.relationship("CashLedgerEntry", back_populates="player", cascade="all, delete-orphan")
+
+    # 索引（与 scripts/init_database.sql 中 idx_game_player 一致）
+    __table_args__ = (
+        db.Index('idx_game_player', 'game_id', 'player_number'),
+    )
 
     def to_dict(self):
         """转换为字典"""
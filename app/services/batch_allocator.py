@@ -0,0 +1,216 @@
+"""
+批量客流分配引擎
+一次处理多个游戏/回合的客流分配（锦标赛、模拟），结果与 CustomerFlowAllocator.allocate_products 一致
+"""
+import random
+from typing import List, Dict, Sequence, Tuple
+import numpy as np
+
+
+class BatchCustomerFlowAllocator:
+    """
+    批量客流分配器
+
+    把多个市场（一个游戏的一个回合）的产品打包成结构化数组
+    （reputation / price / available / game_index），排序、分组与组内注水平分全部向量化；
+    只有组内余数的随机抽样按市场逐个进行（每个市场每档客户最多一次），
+    因此使用相同随机源时结果与标量路径逐位一致。
+    """
+
+    @staticmethod
+    def allocate_many(markets: List[Dict]) -> List[Dict]:
+        """
+        批量执行客流分配
+
+        Args:
+            markets: [
+                {
+                    "products": [...],          # 同 allocate_products 的产品记录
+                    "high_tier_customers": 40,
+                    "low_tier_customers": 300,
+                    "rng": random.Random(...)   # 可选，组内余数分配使用的随机源
+                },
+                ...
+            ]
+
+        Returns:
+            与 markets 一一对应的分配结果列表，每项结构同 CustomerFlowAllocator.allocate_products
+        """
+        if not markets:
+            return []
+
+        counts = [len(m["products"]) for m in markets]
+        game_index = np.repeat(np.arange(len(markets)), counts)
+        reputation = np.fromiter(
+            (p["reputation"] for m in markets for p in m["products"]), dtype=np.float64, count=len(game_index)
+        )
+        price = np.fromiter(
+            (p["price"] for m in markets for p in m["products"]), dtype=np.float64, count=len(game_index)
+        )
+        available = np.fromiter(
+            (p["available"] for m in markets for p in m["products"]), dtype=np.int64, count=len(game_index)
+        )
+        high = np.array([m["high_tier_customers"] for m in markets], dtype=np.int64)
+        low = np.array([m["low_tier_customers"] for m in markets], dtype=np.int64)
+        rngs = [m.get("rng") or random for m in markets]
+
+        sold_high, sold_low = BatchCustomerFlowAllocator.allocate_arrays(
+            reputation, price, available, game_index, high, low, rngs
+        )
+
+        results = []
+        offset = 0
+        for market, count in zip(markets, counts):
+            records = []
+            total_revenue = 0.0
+            for i, p in enumerate(market["products"], start=offset):
+                sh = int(sold_high[i])
+                sl = int(sold_low[i])
+                records.append(dict(p, available=p["available"] - sh - sl, sold_high=sh, sold_low=sl))
+                total_revenue += (sh + sl) * p["price"]
+            offset += count
+
+            results.append({
+                "high_tier_served": sum(r["sold_high"] for r in records),
+                "low_tier_served": sum(r["sold_low"] for r in records),
+                "total_revenue": total_revenue,
+                "sales_details": records
+            })
+
+        return results
+
+    @staticmethod
+    def allocate_arrays(reputation: np.ndarray, price: np.ndarray, available: np.ndarray,
+                        game_index: np.ndarray, high_tier_customers: np.ndarray,
+                        low_tier_customers: np.ndarray,
+                        rngs: Sequence[random.Random]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        结构化数组上的分配内核
+
+        Args:
+            reputation / price / available / game_index: 每个产品一项；
+                同一市场的产品须连续存放，且顺序与标量路径的输入顺序一致
+            high_tier_customers / low_tier_customers: 每个市场一项
+            rngs: 每个市场一个随机源
+
+        Returns:
+            (sold_high, sold_low) 两个 int64 数组
+        """
+        index = np.arange(len(available))
+
+        # 高购买力：口碑(高->低) > 价格(低->高)
+        sold_high = BatchCustomerFlowAllocator._allocate_tier(
+            -reputation, price, available, game_index, high_tier_customers,
+            np.ones(len(available), dtype=bool), index, rngs
+        )
+
+        # 低购买力：价格(低->高) > 口碑(高->低)，且口碑 > 0
+        sold_low = BatchCustomerFlowAllocator._allocate_tier(
+            price, -reputation, available - sold_high, game_index, low_tier_customers,
+            reputation > 0, index, rngs
+        )
+
+        return sold_high, sold_low
+
+    @staticmethod
+    def _allocate_tier(primary: np.ndarray, secondary: np.ndarray, available: np.ndarray,
+                       game_index: np.ndarray, customers: np.ndarray, eligible: np.ndarray,
+                       index: np.ndarray, rngs: Sequence[random.Random]) -> np.ndarray:
+        """
+        单档客户的向量化分配：排序 → 分组 → 逐组消耗客户 → 部分组注水平分
+        """
+        sold = np.zeros(len(available), dtype=np.int64)
+
+        # 库存为0的产品不影响分组结果与余数候选顺序，直接剔除
+        selected = index[eligible & (available > 0)]
+        if len(selected) == 0:
+            return sold
+
+        # 稳定排序：市场 > 主键 > 次键 > 原始顺序
+        order = selected[np.lexsort((
+            selected, secondary[selected], primary[selected], game_index[selected]
+        ))]
+        games = game_index[order]
+        caps = available[order]
+        k1 = primary[order]
+        k2 = secondary[order]
+
+        # 分组（相同市场且排序键完全相同）
+        new_group = np.ones(len(order), dtype=bool)
+        new_group[1:] = (games[1:] != games[:-1]) | (k1[1:] != k1[:-1]) | (k2[1:] != k2[:-1])
+        group_id = np.cumsum(new_group) - 1
+        starts = np.flatnonzero(new_group)
+        group_supply = np.add.reduceat(caps, starts)
+        group_game = games[starts]
+
+        # 每组之前同市场各组的总库存 -> 到达该组时剩余的客户数
+        supply_before = np.cumsum(group_supply) - group_supply
+        first_of_game = np.ones(len(starts), dtype=bool)
+        first_of_game[1:] = group_game[1:] != group_game[:-1]
+        game_base = np.maximum.accumulate(np.where(first_of_game, np.arange(len(starts)), 0))
+        budget = customers[group_game] - (supply_before - supply_before[game_base])
+
+        # 需求 >= 供给：全组卖光
+        full = budget >= group_supply
+        sorted_sold = np.where(full[group_id], caps, 0)
+
+        # 需求 < 供给：每个市场最多一个部分组
+        partial = (budget > 0) & ~full
+        if partial.any():
+            BatchCustomerFlowAllocator._water_fill(
+                sorted_sold, caps, group_id, starts, budget, partial,
+                [rngs[g] for g in group_game[partial]]
+            )
+
+        sold[order] = sorted_sold
+        return sold
+
+    @staticmethod
+    def _water_fill(sorted_sold: np.ndarray, caps: np.ndarray, group_id: np.ndarray,
+                    starts: np.ndarray, budget: np.ndarray, partial: np.ndarray,
+                    rngs: List[random.Random]):
+        """
+        多个部分组同时注水平分（结果写入 sorted_sold）
+
+        第 j 小库存的产品卖光的条件：前 j 个库存之和 + cap_j × (k - j) <= 剩余客户，
+        该条件对 j 单调，故卖光数量可直接求和得到。
+        """
+        partial_groups = np.flatnonzero(partial)
+        members = np.flatnonzero(partial[group_id])
+        member_group = group_id[members]
+
+        # 组内按库存升序
+        by_capacity = members[np.lexsort((caps[members], member_group))]
+        cap_sorted = caps[by_capacity]
+        grp_sorted = group_id[by_capacity]
+
+        sizes = np.bincount(grp_sorted, minlength=len(starts))
+        first = np.searchsorted(grp_sorted, grp_sorted, side="left")
+        rank = np.arange(len(by_capacity)) - first
+        running = np.cumsum(cap_sorted)
+        prefix = running - cap_sorted - (running[first] - cap_sorted[first])
+
+        saturates = prefix + cap_sorted * (sizes[grp_sorted] - rank) <= budget[grp_sorted]
+        saturated_supply = np.bincount(grp_sorted, weights=cap_sorted * saturates, minlength=len(starts))
+        saturated_count = np.bincount(grp_sorted, weights=saturates, minlength=len(starts))
+
+        open_count = (sizes - saturated_count).astype(np.int64)
+        leftover = budget - saturated_supply.astype(np.int64)
+        safe_open = np.maximum(open_count, 1)
+        level = leftover // safe_open
+        extra = leftover % safe_open
+
+        sorted_sold[by_capacity] = np.where(saturates, cap_sorted, level[grp_sorted])
+
+        # 余数：未卖光产品按组内顺序编号后抽样，与标量路径的随机调用一致
+        is_open = np.zeros(len(sorted_sold), dtype=bool)
+        is_open[by_capacity[~saturates]] = True
+        for g, rng in zip(partial_groups, rngs):
+            start = starts[g]
+            open_positions = start + np.flatnonzero(is_open[start:start + sizes[g]])
+            for i in rng.sample(range(len(open_positions)), int(extra[g])):
+                sorted_sold[open_positions[i]] += 1
+
+
+# 导出类
+__all__ = ['BatchCustomerFlowAllocator']
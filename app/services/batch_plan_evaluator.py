@@ -0,0 +1,192 @@
+"""
+批量生产计划评估
+一次评估多个候选生产计划（产品组合 × 定价），不写数据库；供规划工具与机器人在提交前比较方案
+"""
+from decimal import Decimal
+from typing import Dict, List
+import numpy as np
+from app.services.calculation_engine import DiscountCalculator
+from app.services.production_service import ProductionService
+from app.utils.game_constants import GameConstants
+
+
+class BatchPlanEvaluator:
+    """
+    批量计划评估器
+
+    玩家、总生产力与所有方案涉及的产品配方只加载一次；
+    原材料需求（方案产量矩阵 × 配方矩阵）与折扣成本（档位查表）对所有方案向量化计算，
+    结果与逐个调用 calculate_material_needs / calculate_material_costs 一致。
+    """
+
+    MATERIALS = tuple(GameConstants.MATERIAL_BASE_PRICES)
+
+    # 单次请求允许的最大方案数
+    MAX_PLANS = 100
+
+    @staticmethod
+    def evaluate_many(player_id: int, round_number: int, plans: List[List[Dict]]) -> Dict:
+        """
+        批量评估候选生产计划
+
+        Args:
+            player_id: 玩家ID
+            round_number: 回合数（用于定价锁定校验）
+            plans: [
+                [{"product_id": 1, "productivity": 5, "price": 15}, ...],  # 方案 0
+                [{"product_id": 2, "productivity": 10, "price": 25}],      # 方案 1
+                ...
+            ]
+
+        Returns:
+            {
+                "player_id": 1,
+                "round_number": 1,
+                "cash": 10000.0,
+                "total_productivity": 15,
+                "results": [
+                    {
+                        "index": 0,
+                        "valid": True,
+                        "errors": [],
+                        "material_needs": {"tea": 5, "milk": 5, "fruit": 0, "ingredient": 0},
+                        "material_costs": {"tea": {...}, ..., "total_cost": 50.0},
+                        "material_delta": 50.0,    # 提交该方案实际扣除（负数为退还）的原材料费
+                        "remaining_cash": 9950.0
+                    },
+                    ...
+                ]
+            }
+
+        Raises:
+            ValueError: 玩家不存在或方案数量不合法
+        """
+        if not isinstance(plans, list):
+            raise ValueError("plans 必须是列表")
+        if len(plans) > BatchPlanEvaluator.MAX_PLANS:
+            raise ValueError(f"一次最多评估 {BatchPlanEvaluator.MAX_PLANS} 个方案")
+
+        # 1. 标准化；格式错误的方案记为空方案并带上错误
+        normalized_plans = []
+        errors = []
+        for plan in plans:
+            try:
+                if not isinstance(plan, list):
+                    raise ValueError("每个方案必须是生产计划列表")
+                normalized_plans.append(ProductionService.normalize_productions(plan))
+                errors.append([])
+            except ValueError as e:
+                normalized_plans.append([])
+                errors.append([str(e)])
+
+        # 2. 一次加载玩家、总生产力与所有方案涉及的产品
+        context = ProductionService.load_submission_context(
+            player_id, [prod for plan in normalized_plans for prod in plan]
+        )
+        player = context["player"]
+        cash = Decimal(str(player.cash))
+
+        # 本回合已提交过计划时，提交新方案只需支付（或退还）原材料差额
+        already_paid, _ = ProductionService._material_already_paid(player_id, round_number)
+
+        # 3. 逐方案规则校验（只读上下文，不访问数据库）
+        for plan, plan_errors in zip(normalized_plans, errors):
+            if plan_errors:
+                continue
+            for validate in (
+                lambda: ProductionService._validate_productivity_allocation(plan, context["total_productivity"]),
+                lambda: ProductionService._validate_pricing(plan),
+                lambda: ProductionService._validate_price_lock(player_id, round_number, plan, context),
+                lambda: ProductionService._validate_products_unlocked(player_id, plan, context)
+            ):
+                try:
+                    validate()
+                except ValueError as e:
+                    plan_errors.append(str(e))
+
+        # 4. 向量化计算需求与成本
+        needs, unit_prices, rates = BatchPlanEvaluator._material_arrays(normalized_plans, context["products"])
+        totals = needs * unit_prices
+
+        results = []
+        for i, plan_errors in enumerate(errors):
+            material_needs = {m: int(needs[i, j]) for j, m in enumerate(BatchPlanEvaluator.MATERIALS)}
+
+            material_costs = {}
+            total_cost = 0.0
+            for j, material in enumerate(BatchPlanEvaluator.MATERIALS):
+                if needs[i, j] <= 0 or unit_prices[i, j] <= 0:
+                    continue
+                material_total = round(float(totals[i, j]), 2)
+                material_costs[material] = {
+                    "quantity": int(needs[i, j]),
+                    "unit_price": round(float(unit_prices[i, j]), 2),
+                    "total": material_total,
+                    "discount_rate": round(float(rates[i, j]), 2)
+                }
+                total_cost += material_total
+            # 与 calculate_material_costs 一致：总成本由取整后的分项相加
+            purchase_cost = round(total_cost, 2)
+            material_costs["total_cost"] = purchase_cost
+            material_delta = Decimal(str(purchase_cost)) - already_paid
+
+            if material_delta > 0 and cash < material_delta:
+                plan_errors.append(f"现金不足！需要 {float(material_delta)} 元，当前余额 {float(cash)} 元")
+
+            results.append({
+                "index": i,
+                "valid": not plan_errors,
+                "errors": plan_errors,
+                "material_needs": material_needs,
+                "material_costs": material_costs,
+                "material_delta": float(material_delta),
+                "remaining_cash": float(cash - material_delta)
+            })
+
+        return {
+            "player_id": player_id,
+            "round_number": round_number,
+            "cash": float(cash),
+            "total_productivity": context["total_productivity"],
+            "results": results
+        }
+
+    @staticmethod
+    def _material_arrays(plans: List[List[Dict]], products: Dict) -> tuple:
+        """
+        计算所有方案的原材料需求、折后单价与折扣率
+
+        Returns:
+            (needs, unit_prices, rates)，形状均为 (方案数, 原材料数)
+        """
+        materials = BatchPlanEvaluator.MATERIALS
+        product_ids = list(products)
+        column = {product_id: j for j, product_id in enumerate(product_ids)}
+
+        # 方案产量矩阵：产量 <= 0 或产品不存在的条目不计入（同 calculate_material_needs）
+        quantities = np.zeros((len(plans), len(product_ids)), dtype=np.int64)
+        for i, plan in enumerate(plans):
+            for prod in plan:
+                j = column.get(prod['product_id'])
+                if j is not None and prod['productivity'] > 0:
+                    quantities[i, j] += prod['productivity']
+
+        # 配方矩阵：每个产品每杯所需各原材料份数
+        recipes = np.array(
+            [[products[product_id].recipe.recipe_json.get(m, 0) for m in materials] for product_id in product_ids],
+            dtype=np.int64
+        ).reshape(len(product_ids), len(materials))
+
+        needs = quantities @ recipes
+
+        # 折扣档位查表
+        tiers = np.minimum(needs // GameConstants.DISCOUNT_TIER_SIZE, GameConstants.MAX_DISCOUNT_TIERS)
+        price_table = np.array([DiscountCalculator.TIER_UNIT_PRICES[m] for m in materials], dtype=np.float64)
+        unit_prices = price_table[np.arange(len(materials)), tiers]
+        rates = np.array(DiscountCalculator.DISCOUNT_RATES, dtype=np.float64)[tiers]
+
+        return needs, unit_prices, rates
+
+
+# 导出
+__all__ = ['BatchPlanEvaluator']
@@ -2,19 +2,27 @@
 核心计算引擎
 包含：口碑分计算、客流分配算法、批量折扣计算
 """
-from typing import List, Dict, Tuple
+from types import MappingProxyType
+from typing import List, Dict, Mapping, Tuple
 from itertools import groupby
+import hashlib
 import random
+from sqlalchemy import bindparam, func, update
 from app.core.database import db
-from app.models.game import CustomerFlow
+from app.models.game import Game
 from app.models.player import Player
-from app.models.product import PlayerProduct, RoundProduction
+from app.models.product import ProductRecipe, PlayerProduct, RoundProduction
 from app.utils.game_constants import GameConstants
+from app.utils.customer_flow_table import CustomerFlowTable
+from app.utils.game_cache import GameScopedCache
 
 
 class ReputationCalculator:
     """口碑分计算器"""
 
+    # 每局 recipe_id -> 解锁人数，游戏状态变化时由 GameScopedCache.invalidate_game 失效
+    _unlock_counts = GameScopedCache()
+
     @staticmethod
     def calculate(player_product: PlayerProduct, ad_score: float = None) -> float:
         """
@@ -24,30 +32,99 @@ class ReputationCalculator:
         动态圈粉率: 基础圈粉率 - (解锁人数-1)*5%
         - 若历史销量为0且广告分为0，使用圈粉率作为最小基线，避免首轮口碑为0导致低消费客流无法分配
         """
-        base_rate = float(player_product.recipe.base_fan_rate)
-        
-        # Calculate number of players who unlocked this recipe in the same game
-        unlocked_count = PlayerProduct.query.join(Player).filter(
-            PlayerProduct.recipe_id == player_product.recipe_id,
-            PlayerProduct.is_unlocked == True,
-            Player.game_id == player_product.player.game_id
-        ).count()
-        
+        # Number of players who unlocked this recipe in the same game (cached per game)
+        unlock_counts = ReputationCalculator.get_unlock_counts(player_product.player.game_id)
+        unlocked_count = unlock_counts.get(player_product.recipe_id, 0)
+
+        ad_score_value = ad_score if ad_score is not None else (player_product.current_ad_score or 0)
+
+        return ReputationCalculator.compute(
+            base_fan_rate=float(player_product.recipe.base_fan_rate),
+            unlocked_count=unlocked_count,
+            ad_score=ad_score_value,
+            total_sold=player_product.total_sold or 0
+        )
+
+    @staticmethod
+    def compute(base_fan_rate: float, unlocked_count: int, ad_score: float, total_sold: int) -> float:
+        """
+        口碑分公式本身（纯计算，不访问数据库）
+
+        Args:
+            base_fan_rate: 配方基础圈粉率（百分比）
+            unlocked_count: 本局解锁该配方的玩家数
+            ad_score: 广告分
+            total_sold: 累计销售杯数
+
+        Returns:
+            口碑分
+        """
         # Dynamic Fan Rate: Base - (Count - 1) * 5%
         decay = (unlocked_count - 1) * 5.0
-        actual_rate = max(base_rate - decay, 5.0)
+        actual_rate = max(base_fan_rate - decay, 5.0)
         actual_rate_decimal = actual_rate / 100.0
 
-        ad_score_value = ad_score if ad_score is not None else (player_product.current_ad_score or 0)
-        total_sold = player_product.total_sold or 0
-        
-        reputation = ad_score_value + (actual_rate_decimal * total_sold)
+        reputation = ad_score + (actual_rate_decimal * total_sold)
         # 基线：避免首轮口碑为0
         minimum_reputation = max(actual_rate_decimal, 0.01)
         if reputation <= 0:
             reputation = minimum_reputation
         return float(reputation)
 
+    @staticmethod
+    def calculate_many(game_id: int, player_products: List[PlayerProduct],
+                       ad_scores: Dict[int, float] = None) -> Dict[int, float]:
+        """
+        批量计算同一局多个产品的口碑分
+
+        解锁人数来自按局缓存，不再逐个产品 COUNT；调用方应预先加载 recipe 以避免懒加载
+
+        Args:
+            game_id: 游戏ID
+            player_products: 玩家产品对象列表
+            ad_scores: 可选的 {player_id: 广告分}，缺省使用产品的 current_ad_score
+
+        Returns:
+            {player_product_id: reputation}
+        """
+        unlock_counts = ReputationCalculator.get_unlock_counts(game_id)
+        ad_scores = ad_scores or {}
+
+        return {
+            product.id: ReputationCalculator.compute(
+                base_fan_rate=float(product.recipe.base_fan_rate),
+                unlocked_count=unlock_counts.get(product.recipe_id, 0),
+                ad_score=ad_scores.get(product.player_id, product.current_ad_score or 0),
+                total_sold=product.total_sold or 0
+            )
+            for product in player_products
+        }
+
+    @staticmethod
+    def get_unlock_counts(game_id: int) -> Dict[int, int]:
+        """
+        获取本局每个配方的解锁人数（按局缓存，未命中时一次 GROUP BY）
+
+        Returns:
+            {recipe_id: unlocked_count}
+        """
+        return ReputationCalculator._unlock_counts.get_or_compute(
+            game_id, 'unlock_counts', lambda: ReputationCalculator._query_unlock_counts(game_id)
+        )
+
+    @staticmethod
+    def _query_unlock_counts(game_id: int) -> Dict[int, int]:
+        rows = db.session.query(
+            PlayerProduct.recipe_id, func.count(PlayerProduct.id)
+        ).join(
+            Player, Player.id == PlayerProduct.player_id
+        ).filter(
+            Player.game_id == game_id,
+            PlayerProduct.is_unlocked == True
+        ).group_by(PlayerProduct.recipe_id).all()
+
+        return {recipe_id: count for recipe_id, count in rows}
+
     @staticmethod
     def calculate_for_production(production: RoundProduction, player_product: PlayerProduct) -> float:
         """
@@ -70,26 +147,109 @@ class CustomerFlowAllocator:
     负责根据口碑分、定价、生产力分配客流给各个产品
     """
 
+    # 每局 round_number -> 结算输入快照，游戏状态变化时由 GameScopedCache.invalidate_game 失效
+    _inputs = GameScopedCache()
+
     @staticmethod
     def allocate(game_id: int, round_number: int) -> Dict:
         """
         执行客流分配 - 主函数
+
+        加载（load_inputs）→ 分配内核（allocate_products）→ 写回（_save_sales）
+        """
+        # 1. 获取客流量与所有产品数据
+        inputs = CustomerFlowAllocator.load_inputs(game_id, round_number)
+
+        # 2. 纯内存分配（组内余数使用本局本回合的确定性随机流）
+        game = Game.query.get(game_id)
+        result = CustomerFlowAllocator.allocate_products(
+            inputs["products"],
+            inputs["high_tier_customers"],
+            inputs["low_tier_customers"],
+            rng=CustomerFlowAllocator.settlement_rng(game, round_number)
+        )
+
+        # 3. 保存销售结果
+        if result["sales_details"]:
+            CustomerFlowAllocator._save_sales(result["sales_details"])
+            GameScopedCache.invalidate_game(game_id)
+
+        return result
+
+    @staticmethod
+    def load_inputs(game_id: int, round_number: int) -> Dict:
+        """
+        从数据库加载一局一回合的结算输入
+
+        Returns:
+            {
+                "high_tier_customers": 40,
+                "low_tier_customers": 300,
+                "products": [...]  # 同 _get_all_products
+            }
+
+        Raises:
+            ValueError: 游戏不存在或回合不在客流表中
+        """
+        game = Game.query.get(game_id)
+        if not game:
+            raise ValueError(f"游戏 {game_id} 不存在")
+
+        # 客流来自进程内客流表（剧本 + Game.settings 覆盖），不查询 customer_flows
+        customer_flow = CustomerFlowTable.get(game, round_number)
+
+        return {
+            "high_tier_customers": customer_flow["high_tier_customers"],
+            "low_tier_customers": customer_flow["low_tier_customers"],
+            "products": CustomerFlowAllocator._get_all_products(game_id, round_number)
+        }
+
+    @staticmethod
+    def get_cached_inputs(game_id: int, round_number: int) -> Dict:
+        """
+        结算输入的按局缓存版本（预览等只读场景使用）
+
+        返回的快照被多个调用方共享，只能读取；分配内核本身不会修改输入记录
         """
-        # 1. 获取客流量
-        customer_flow = CustomerFlow.query.filter_by(
-            game_id=game_id,
-            round_number=round_number
-        ).first()
+        return CustomerFlowAllocator._inputs.get_or_compute(
+            game_id, round_number, lambda: CustomerFlowAllocator.load_inputs(game_id, round_number)
+        )
+
+    @staticmethod
+    def settlement_rng(game: Game, round_number: int) -> random.Random:
+        """
+        获取某局某回合结算使用的随机源
 
-        if not customer_flow:
-            raise ValueError(f"未找到游戏 {game_id} 第 {round_number} 回合的客流量数据")
+        种子由游戏保存的 rng_seed（Game.settings，开局时生成）、game_id 与回合数派生，
+        同一输入在任何进程中都得到相同的随机流，结算可逐位复算、并行计算或按输入缓存。
+        旧游戏没有 rng_seed 时仅由 game_id 与回合数派生。
+        """
+        seed = (game.settings or {}).get('rng_seed') if game else None
+        material = f"{seed}:{game.id if game else 0}:{round_number}".encode()
+        return random.Random(int.from_bytes(hashlib.sha256(material).digest()[:8], 'big'))
+
+    @staticmethod
+    def allocate_products(products: List[Dict], high_tier_total: int, low_tier_total: int,
+                          rng: random.Random = None) -> Dict:
+        """
+        分配内核：只做内存计算，不访问数据库
 
-        high_tier_total = customer_flow.high_tier_customers
-        low_tier_total = customer_flow.low_tier_customers
+        可用于结算、预览、模拟与基准测试。输入记录不会被修改。
 
-        # 2. 获取所有产品数据
-        products = CustomerFlowAllocator._get_all_products(game_id, round_number)
+        Args:
+            products: 产品记录列表，每条至少包含 reputation / price / available
+            high_tier_total: 高购买力客户数
+            low_tier_total: 低购买力客户数
+            rng: 组内余数分配使用的随机源，结算时传入 settlement_rng()，默认使用全局 random
 
+        Returns:
+            {
+                "high_tier_served": int,
+                "low_tier_served": int,
+                "total_revenue": float,
+                "sales_details": [...]  # 输入记录的副本，附带 sold_high / sold_low
+            }
+        """
         if not products:
             return {
                 "high_tier_served": 0,
@@ -98,49 +258,44 @@ class CustomerFlowAllocator:
                 "sales_details": []
             }
 
-        # Reset counters
-        for p in products:
-            p['sold_high'] = 0
-            p['sold_low'] = 0
-            p['sold_temp'] = 0 
+        records = [dict(p, sold_high=0, sold_low=0, sold_temp=0) for p in products]
 
-        # 3. 分配高购买力客户
+        # 1. 分配高购买力客户
         # 优先级: 口碑(高->低) > 价格(低->高)
         def high_tier_key(p): return (-p['reputation'], p['price'])
-        
+
         remaining_high = CustomerFlowAllocator._distribute_logic(
-            products, high_tier_total, high_tier_key
+            records, high_tier_total, high_tier_key, rng=rng
         )
         # 提交临时销量
-        for p in products:
+        for p in records:
             p['sold_high'] = p['sold_temp']
             p['sold_temp'] = 0
 
-        # 4. 分配低购买力客户
+        # 2. 分配低购买力客户
         # 优先级: 价格(低->高) > 口碑(高->低)
         # 且 口碑 > 0
         def low_tier_key(p): return (p['price'], -p['reputation'])
-        
+
         remaining_low = CustomerFlowAllocator._distribute_logic(
-            products, low_tier_total, low_tier_key, is_low_tier=True
+            records, low_tier_total, low_tier_key, is_low_tier=True, rng=rng
         )
-        # 提交临时销量
-        for p in products:
-            p['sold_low'] = p['sold_temp']
-            p['sold_temp'] = 0
 
-        # 5. 保存销售结果
-        total_revenue = CustomerFlowAllocator._save_sales(products)
+        total_revenue = 0.0
+        for p in records:
+            p['sold_low'] = p.pop('sold_temp')
+            total_revenue += (p['sold_high'] + p['sold_low']) * p['price']
 
         return {
             "high_tier_served": high_tier_total - remaining_high,
             "low_tier_served": low_tier_total - remaining_low,
             "total_revenue": total_revenue,
-            "sales_details": products
+            "sales_details": records
         }
 
     @staticmethod
-    def _distribute_logic(products: List[Dict], customer_count: int, sort_key, is_low_tier: bool = False) -> int:
+    def _distribute_logic(products: List[Dict], customer_count: int, sort_key, is_low_tier: bool = False,
+                          rng: random.Random = None) -> int:
         """
         通用分配逻辑：支持分组平分
         """
@@ -176,49 +331,60 @@ class CustomerFlowAllocator:
                     p['available'] = 0
                     remaining_customers -= sold
             else:
-                # 需求 < 供给：需要在组内平分
-                # 迭代平分算法
-                active_products = list(group)
-                while remaining_customers > 0 and active_products:
-                    count = len(active_products)
-                    share = remaining_customers // count
-                    remainder = remaining_customers % count
-                    
-                    if share == 0:
-                        # 随机分配余数
-                        import random
-                        random.shuffle(active_products)
-                        for i in range(remainder):
-                            if active_products[i]['available'] > 0:
-                                active_products[i]['sold_temp'] += 1
-                                active_products[i]['available'] -= 1
-                                remaining_customers -= 1
-                        break
-                    
-                    # 分配份额
-                    next_active = []
-                    for p in active_products:
-                        can_sell = min(p['available'], share)
-                        p['sold_temp'] += can_sell
-                        p['available'] -= can_sell
-                        remaining_customers -= can_sell
-                        
-                        if p['available'] > 0:
-                            next_active.append(p)
-                            
-                    active_products = next_active
+                # 需求 < 供给：组内注水平分，本组消化全部剩余客户
+                CustomerFlowAllocator._water_fill(group, remaining_customers, rng=rng)
+                remaining_customers = 0
 
         return remaining_customers
 
+    @staticmethod
+    def _water_fill(group: List[Dict], customer_count: int, rng: random.Random = None) -> None:
+        """
+        组内注水平分（要求 customer_count < 组内总库存）
+
+        按库存升序扫描：库存不超过当前水位的产品直接卖光，其余产品按水位平分，
+        余数在未卖光的产品中（按组内顺序编号）随机抽样，每个最多+1。复杂度 O(k log k)，与客户数无关。
+        """
+        k = len(group)
+        by_capacity = sorted(range(k), key=lambda i: group[i]['available'])
+
+        remaining = customer_count
+        saturated = 0
+        while saturated < k:
+            capacity = group[by_capacity[saturated]]['available']
+            # capacity <= remaining // (k - saturated)
+            if capacity * (k - saturated) > remaining:
+                break
+            remaining -= capacity
+            saturated += 1
+
+        filled = set(by_capacity[:saturated])
+        open_products = [p for i, p in enumerate(group) if i not in filled]
+        level, extra = divmod(remaining, len(open_products))
+        lucky = set((rng or random).sample(range(len(open_products)), extra))
+
+        for i in filled:
+            p = group[i]
+            p['sold_temp'] += p['available']
+            p['available'] = 0
+
+        for i, p in enumerate(open_products):
+            sold = level + 1 if i in lucky else level
+            p['sold_temp'] += sold
+            p['available'] -= sold
+
     @staticmethod
     def _get_all_products(game_id: int, round_number: int) -> List[Dict]:
         """
         获取所有玩家的所有产品数据
 
+        查询次数固定（广告分、解锁人数、生产计划连接查询各一次），与玩家数和产品数无关
+
         Returns:
             [
                 {
                     "production_id": int,
+                    "player_product_id": int,
                     "player_id": int,
                     "product_name": str,
                     "reputation": float,
@@ -232,97 +398,173 @@ class CustomerFlowAllocator:
         """
         products = []
         # 当回合广告分（线下骰子）映射：player_id -> ad_score
+        # 只连接本局玩家（players.game_id 索引 + market_actions(player_id, round_number) 索引），
+        # 查询代价只与当前房间规模相关
         from app.models.finance import MarketAction
         ad_scores = {
-            action.player_id: action.result_value or 0
-            for action in MarketAction.query.filter_by(
-                round_number=round_number,
-                action_type='ad'
-            ).all()
+            player_id: result_value or 0
+            for player_id, result_value in db.session.query(
+                MarketAction.player_id, MarketAction.result_value
+            ).join(
+                Player, Player.id == MarketAction.player_id
+            ).filter(
+                Player.game_id == game_id,
+                MarketAction.round_number == round_number,
+                MarketAction.action_type == 'ad'
+            ).order_by(MarketAction.id)
         }
 
-        # 获取游戏中的所有玩家
-        players = Player.query.filter_by(game_id=game_id, is_active=True).all()
-
-        for player in players:
-            # 获取玩家本回合的生产计划
-            productions = RoundProduction.query.filter_by(
-                player_id=player.id,
-                round_number=round_number
-            ).all()
-
-            for prod in productions:
-                # 跳过没有生产的产品
-                if prod.produced_quantity <= 0:
-                    continue
-
-                # 获取玩家产品信息
-                player_product = PlayerProduct.query.get(prod.product_id)
-                if not player_product or not player_product.is_unlocked:
-                    continue
+        # 本局每个配方的解锁人数（动态圈粉率）
+        unlock_counts = ReputationCalculator.get_unlock_counts(game_id)
+
+        # 一次连接查询取出本回合所有在场玩家的有效生产计划及其产品、配方
+        rows = db.session.query(
+            RoundProduction.id,
+            RoundProduction.price,
+            RoundProduction.produced_quantity,
+            Player.id,
+            Player.nickname,
+            PlayerProduct.id,
+            PlayerProduct.recipe_id,
+            PlayerProduct.total_sold,
+            PlayerProduct.current_ad_score,
+            ProductRecipe.name,
+            ProductRecipe.base_fan_rate
+        ).join(
+            Player, Player.id == RoundProduction.player_id
+        ).join(
+            PlayerProduct, PlayerProduct.id == RoundProduction.product_id
+        ).join(
+            ProductRecipe, ProductRecipe.id == PlayerProduct.recipe_id
+        ).filter(
+            Player.game_id == game_id,
+            Player.is_active == True,
+            RoundProduction.round_number == round_number,
+            RoundProduction.produced_quantity > 0,
+            PlayerProduct.is_unlocked == True
+        ).order_by(Player.id, RoundProduction.id).all()
+
+        for (production_id, price, produced_quantity, player_id, nickname, player_product_id,
+             recipe_id, total_sold, current_ad_score, recipe_name, base_fan_rate) in rows:
+            # 计算口碑分
+            ad_score = ad_scores.get(player_id, current_ad_score or 0)
+            reputation = ReputationCalculator.compute(
+                base_fan_rate=float(base_fan_rate),
+                unlocked_count=unlock_counts.get(recipe_id, 0),
+                ad_score=ad_score,
+                total_sold=total_sold or 0
+            )
 
-                # 计算口碑分
-                ad_score = ad_scores.get(player.id, player_product.current_ad_score or 0)
-                reputation = ReputationCalculator.calculate(player_product, ad_score=ad_score)
-
-                products.append({
-                    "production_id": prod.id,
-                    "player_id": player.id,
-                    "player_name": player.nickname,
-                    "product_name": player_product.recipe.name,
-                    "reputation": reputation,
-                    "ad_score": ad_score,
-                    "price": float(prod.price),
-                    "available": prod.produced_quantity,
-                    "sold_high": 0,
-                    "sold_low": 0
-                })
+            products.append({
+                "production_id": production_id,
+                "player_product_id": player_product_id,
+                "player_id": player_id,
+                "player_name": nickname,
+                "product_name": recipe_name,
+                "reputation": reputation,
+                "ad_score": ad_score,
+                "price": float(price),
+                "available": produced_quantity,
+                "sold_high": 0,
+                "sold_low": 0
+            })
 
         return products
 
 
     @staticmethod
-    def _save_sales(products: List[Dict]) -> float:
+    def _save_sales(products: List[Dict], commit: bool = True) -> float:
         """
-        保存销售结果到数据库
+        保存销售结果到数据库（集合式批量更新）
+
+        - round_productions: 按主键 executemany 写入销量与营业额
+        - player_products: total_sold = total_sold + :delta 原子累加，并发结算不会丢失增量
 
         Args:
-            products: 产品销售数据列表
+            products: 产品销售数据列表（需包含 production_id / player_product_id）
+            commit: 是否立即提交；回合结算在同一事务内调用时传 False
 
         Returns:
             总营业额
         """
         total_revenue = 0.0
+        production_rows = []
+        sold_deltas = {}
 
         for product in products:
-            prod = RoundProduction.query.get(product['production_id'])
-            if not prod:
-                continue
-
             total_sold = product['sold_high'] + product['sold_low']
             revenue = total_sold * product['price']
 
-            # 更新生产记录
-            prod.sold_quantity = total_sold
-            prod.sold_to_high_tier = product['sold_high']
-            prod.sold_to_low_tier = product['sold_low']
-            prod.revenue = revenue
-
+            production_rows.append({
+                "id": product['production_id'],
+                "sold_quantity": total_sold,
+                "sold_to_high_tier": product['sold_high'],
+                "sold_to_low_tier": product['sold_low'],
+                "revenue": revenue
+            })
             total_revenue += revenue
 
-            # 更新玩家产品的累计销售数
-            player_product = PlayerProduct.query.get(prod.product_id)
-            if player_product:
-                player_product.total_sold += total_sold
+            player_product_id = product.get('player_product_id')
+            if player_product_id and total_sold:
+                sold_deltas[player_product_id] = sold_deltas.get(player_product_id, 0) + total_sold
+
+        # 更新生产记录
+        if production_rows:
+            db.session.execute(update(RoundProduction), production_rows)
+
+        # 更新玩家产品的累计销售数
+        if sold_deltas:
+            table = PlayerProduct.__table__
+            db.session.execute(
+                table.update()
+                .where(table.c.id == bindparam('player_product_id'))
+                .values(total_sold=func.coalesce(table.c.total_sold, 0) + bindparam('delta')),
+                [
+                    {"player_product_id": player_product_id, "delta": delta}
+                    for player_product_id, delta in sold_deltas.items()
+                ]
+            )
+
+        # 批量 UPDATE 不会同步会话中已加载的对象，使其过期以便后续读取最新值
+        for obj in list(db.session.identity_map.values()):
+            if isinstance(obj, (RoundProduction, PlayerProduct)):
+                db.session.expire(obj)
 
         # 提交数据库更改
-        db.session.commit()
+        if commit:
+            db.session.commit()
 
         return total_revenue
 
 
+# 预先计算的折扣档位表（进程内只读）：档位 -> 折扣率；原材料 -> 各档位折后单价
+_DISCOUNT_RATES: Tuple[float, ...] = tuple(
+    1.0 - (tier * GameConstants.DISCOUNT_PER_TIER)
+    for tier in range(GameConstants.MAX_DISCOUNT_TIERS + 1)
+)
+_TIER_UNIT_PRICES: Mapping[str, Tuple[float, ...]] = MappingProxyType({
+    material: tuple(base_price * rate for rate in _DISCOUNT_RATES)
+    for material, base_price in GameConstants.MATERIAL_BASE_PRICES.items()
+})
+
+
 class DiscountCalculator:
-    """批量折扣计算器"""
+    """
+    批量折扣计算器
+
+    折扣率与各原材料的折后单价在模块加载时按档位预先算好，
+    计算时只需求出档位再查表。
+    """
+
+    DISCOUNT_RATES = _DISCOUNT_RATES
+    TIER_UNIT_PRICES = _TIER_UNIT_PRICES
+
+    @staticmethod
+    def discount_tier(quantity: int) -> int:
+        """购买数量对应的折扣档位（0 ~ MAX_DISCOUNT_TIERS）"""
+        if quantity <= 0:
+            return 0
+        return min(quantity // GameConstants.DISCOUNT_TIER_SIZE, GameConstants.MAX_DISCOUNT_TIERS)
 
     @staticmethod
     def calculate_discount_price(quantity: int, base_unit_price: float) -> float:
@@ -349,14 +591,7 @@ class DiscountCalculator:
         if quantity <= 0:
             return base_unit_price
 
-        # 计算折扣档次
-        discount_tier = min(quantity // GameConstants.DISCOUNT_TIER_SIZE,
-                           GameConstants.MAX_DISCOUNT_TIERS)
-
-        # 计算折扣率
-        discount_rate = 1.0 - (discount_tier * GameConstants.DISCOUNT_PER_TIER)
-
-        return base_unit_price * discount_rate
+        return base_unit_price * DiscountCalculator.DISCOUNT_RATES[DiscountCalculator.discount_tier(quantity)]
 
     @staticmethod
     def calculate_total_cost(quantity: int, base_unit_price: float) -> float:
@@ -398,27 +633,22 @@ class DiscountCalculator:
             if quantity <= 0:
                 continue
 
-            base_price = GameConstants.MATERIAL_BASE_PRICES.get(material, 0)
-            if base_price <= 0:
+            unit_prices = DiscountCalculator.TIER_UNIT_PRICES.get(material)
+            if not unit_prices or unit_prices[0] <= 0:
                 continue
 
-            # 计算折后单价
-            unit_price = DiscountCalculator.calculate_discount_price(
-                quantity, base_price
-            )
-
-            # 计算折扣率
-            discount_tier = min(quantity // GameConstants.DISCOUNT_TIER_SIZE,
-                               GameConstants.MAX_DISCOUNT_TIERS)
-            discount_rate = 1.0 - (discount_tier * GameConstants.DISCOUNT_PER_TIER)
+            # 查表得到折后单价与折扣率
+            tier = DiscountCalculator.discount_tier(quantity)
+            unit_price = unit_prices[tier]
+            discount_rate = DiscountCalculator.DISCOUNT_RATES[tier]
 
-            # 计算总价
-            material_total = quantity * unit_price
+            # 计算总价（先按原材料取整，总成本由取整后的分项相加，与成本曲线一致）
+            material_total = round(quantity * unit_price, 2)
 
             costs[material] = {
                 "quantity": quantity,
                 "unit_price": round(unit_price, 2),
-                "total": round(material_total, 2),
+                "total": material_total,
                 "discount_rate": round(discount_rate, 2)
             }
 
@@ -428,6 +658,29 @@ class DiscountCalculator:
 
         return costs
 
+    @staticmethod
+    def material_cost_curve(material: str, max_quantity: int) -> List[float]:
+        """
+        某原材料购买 0..max_quantity 份的总成本曲线（含批量折扣）
+
+        Args:
+            material: 原材料名
+            max_quantity: 最大份数
+
+        Returns:
+            长度为 max_quantity + 1 的列表，第 q 项为购买 q 份的总成本；未知原材料全为 0
+        """
+        unit_prices = DiscountCalculator.TIER_UNIT_PRICES.get(material)
+        if not unit_prices:
+            return [0.0] * (max_quantity + 1)
+
+        tier_size = GameConstants.DISCOUNT_TIER_SIZE
+        max_tier = GameConstants.MAX_DISCOUNT_TIERS
+        return [
+            round(quantity * unit_prices[min(quantity // tier_size, max_tier)], 2)
+            for quantity in range(max_quantity + 1)
+        ]
+
 
 # 导出类
 __all__ = ['ReputationCalculator', 'CustomerFlowAllocator', 'DiscountCalculator']
@@ -5,6 +5,7 @@ Handles employee hiring, firing, and management
 from typing import Dict, List
 from app.core.database import db
 from app.models.player import Player, Employee
+from app.services.ledger_service import LedgerService
 
 
 class EmployeeService:
@@ -51,15 +52,15 @@ class EmployeeService:
         if salary <= 0:
             raise ValueError("Salary must be positive")
 
-        # Check cash and deduct upfront
-        if player.cash < salary:
-            raise ValueError(f"Insufficient cash to hire employee, need {salary}, have {float(player.cash)}")
-        player.cash -= salary
-
         # Validate productivity
         if productivity <= 0:
             raise ValueError("Productivity must be positive")
 
+        # Check cash and deduct upfront
+        if player.cash < salary:
+            raise ValueError(f"Insufficient cash to hire employee, need {salary}, have {float(player.cash)}")
+        LedgerService.record(player, round_number, 'hire', -salary)
+
         # Create employee
         employee = Employee(
             shop_id=player.shop.id,
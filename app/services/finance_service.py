@@ -2,19 +2,22 @@
 Finance service
 Handles finance record generation, profit calculation, and financial reports
 """
-from typing import Dict, List
+from typing import Dict, List, Tuple
+from sqlalchemy import func, insert
+from sqlalchemy.exc import IntegrityError
 from app.core.database import db
 from app.models.player import Player
 from app.models.product import RoundProduction
-from app.models.finance import FinanceRecord
+from app.models.finance import FinanceRecord, FinalReport
 from app.services.round_service import RoundService
+from app.utils.etag import payload_etag
 
 
 class FinanceService:
     """Finance management service"""
 
     @staticmethod
-    def generate_finance_record(player_id: int, round_number: int) -> FinanceRecord:
+    def generate_finance_record(player_id: int, round_number: int, commit: bool = True) -> FinanceRecord:
         """
         Generate finance record for a player in a specific round
 
@@ -29,6 +32,7 @@ class FinanceService:
         Args:
             player_id: Player ID
             round_number: Round number
+            commit: Commit immediately; pass False to only flush inside a caller's transaction
 
         Returns:
             FinanceRecord object
@@ -93,10 +97,125 @@ class FinanceService:
         # 6. Update player's total_profit
         player.total_profit = cumulative_profit
 
-        db.session.commit()
+        if commit:
+            db.session.commit()
+        else:
+            db.session.flush()
 
         return finance_record
 
+    @staticmethod
+    def generate_finance_records_for_game(game_id: int, round_number: int, commit: bool = True) -> int:
+        """
+        Generate finance records for all active players of a game in one pass
+
+        Same figures as generate_finance_record, but revenue, expenses and previous
+        cumulative profit are read with grouped queries and all records are inserted
+        with a single bulk INSERT. Players that already have a record are skipped.
+
+        Args:
+            game_id: Game ID
+            round_number: Round number
+            commit: Commit immediately; pass False to only flush inside a caller's transaction
+
+        Returns:
+            Number of finance records created
+        """
+        from app.models.product import PlayerProduct, ProductRecipe
+
+        players = Player.query.filter_by(game_id=game_id, is_active=True).all()
+        if not players:
+            return 0
+        player_ids = [player.id for player in players]
+
+        # Records for this round and previous cumulative profits
+        records = db.session.query(
+            FinanceRecord.player_id, FinanceRecord.round_number, FinanceRecord.cumulative_profit
+        ).filter(
+            FinanceRecord.player_id.in_(player_ids),
+            FinanceRecord.round_number.in_([round_number, round_number - 1])
+        ).all()
+
+        existing = {player_id for player_id, rnd, _ in records if rnd == round_number}
+        previous_cumulative = {
+            player_id: float(cumulative or 0)
+            for player_id, rnd, cumulative in records if rnd == round_number - 1
+        }
+
+        # 1. Revenue and breakdown for every player in one query
+        revenue = {player_id: {"total": 0.0, "breakdown": []} for player_id in player_ids}
+        production_rows = db.session.query(
+            RoundProduction.player_id,
+            RoundProduction.sold_quantity,
+            RoundProduction.price,
+            RoundProduction.revenue,
+            ProductRecipe.name
+        ).outerjoin(
+            PlayerProduct, PlayerProduct.id == RoundProduction.product_id
+        ).outerjoin(
+            ProductRecipe, ProductRecipe.id == PlayerProduct.recipe_id
+        ).filter(
+            RoundProduction.player_id.in_(player_ids),
+            RoundProduction.round_number == round_number
+        ).order_by(RoundProduction.id).all()
+
+        for player_id, sold_quantity, price, prod_revenue, product_name in production_rows:
+            prod_revenue = float(prod_revenue or 0)
+            revenue[player_id]["total"] += prod_revenue
+            revenue[player_id]["breakdown"].append({
+                "product_name": product_name or "Unknown",
+                "quantity": sold_quantity,
+                "price": float(price),
+                "revenue": prod_revenue
+            })
+
+        # 2. Expenses for every player
+        expenses_by_player = RoundService.calculate_round_expenses_for_game(game_id, round_number)
+
+        # 3-5. Build records
+        rows = []
+        for player in players:
+            if player.id in existing:
+                continue
+
+            revenue_data = revenue[player.id]
+            expenses = expenses_by_player[player.id]
+            round_profit = revenue_data["total"] - expenses["total"]
+            cumulative_profit = previous_cumulative.get(player.id, 0.0) + round_profit
+
+            rows.append({
+                "player_id": player.id,
+                "round_number": round_number,
+                # Revenue
+                "total_revenue": revenue_data["total"],
+                "revenue_breakdown": revenue_data["breakdown"],
+                # Expenses
+                "rent_expense": expenses["rent"],
+                "salary_expense": expenses["salary"],
+                "material_expense": expenses["material"],
+                "decoration_expense": expenses["decoration"],
+                "research_expense": expenses["market_research"],
+                "ad_expense": expenses["advertisement"],
+                "research_cost": expenses["product_research"],
+                "total_expense": expenses["total"],
+                # Profit
+                "round_profit": round_profit,
+                "cumulative_profit": cumulative_profit
+            })
+
+            # 6. Update player's total_profit
+            player.total_profit = cumulative_profit
+
+        if rows:
+            db.session.execute(insert(FinanceRecord), rows)
+
+        if commit:
+            db.session.commit()
+        else:
+            db.session.flush()
+
+        return len(rows)
+
     @staticmethod
     def get_finance_record(player_id: int, round_number: int) -> Dict:
         """
@@ -244,6 +363,169 @@ class FinanceService:
             "rounds": rounds_data
         }
 
+    @staticmethod
+    def build_final_report(game_id: int) -> FinalReport:
+        """
+        Build and store the end-of-game report
+
+        Called by advance_round inside the settlement transaction of the last
+        round (does not commit). Uses three queries: players, finance records
+        and per-product sales totals.
+
+        Payload (per-round values are arrays aligned with "rounds"):
+            {
+                "game_id": 1,
+                "rounds": [1, 2, ...],
+                "rankings": [
+                    {"rank": 1, "player_id": 1, "nickname": "Player 1", "total_profit": 5000.0, "cash": 12000.0},
+                    ...
+                ],
+                "players": [
+                    {
+                        "player_id": 1,
+                        "nickname": "Player 1",
+                        "series": {"revenue": [...], "expense": [...], "profit": [...], "cumulative_profit": [...]},
+                        "products": [{"product_name": "Milk Tea", "produced": 80, "sold": 72, "revenue": 1440.0}, ...]
+                    },
+                    ...
+                ]
+            }
+
+        Args:
+            game_id: Game ID
+
+        Returns:
+            FinalReport object
+        """
+        from app.models.product import PlayerProduct, ProductRecipe
+
+        players = Player.query.filter_by(game_id=game_id, is_active=True).all()
+        player_ids = [player.id for player in players]
+
+        records = FinanceRecord.query.filter(
+            FinanceRecord.player_id.in_(player_ids)
+        ).order_by(FinanceRecord.round_number).all() if player_ids else []
+        rounds = sorted({record.round_number for record in records})
+        position = {round_number: i for i, round_number in enumerate(rounds)}
+
+        series = {
+            player_id: {
+                "revenue": [0.0] * len(rounds),
+                "expense": [0.0] * len(rounds),
+                "profit": [0.0] * len(rounds),
+                "cumulative_profit": [0.0] * len(rounds)
+            }
+            for player_id in player_ids
+        }
+        for record in records:
+            i = position[record.round_number]
+            player_series = series[record.player_id]
+            player_series["revenue"][i] = float(record.total_revenue)
+            player_series["expense"][i] = float(record.total_expense)
+            player_series["profit"][i] = float(record.round_profit)
+            player_series["cumulative_profit"][i] = float(record.cumulative_profit)
+
+        products = {player_id: [] for player_id in player_ids}
+        product_rows = db.session.query(
+            RoundProduction.player_id,
+            ProductRecipe.name,
+            func.sum(RoundProduction.produced_quantity),
+            func.sum(RoundProduction.sold_quantity),
+            func.sum(RoundProduction.revenue)
+        ).join(
+            PlayerProduct, PlayerProduct.id == RoundProduction.product_id
+        ).join(
+            ProductRecipe, ProductRecipe.id == PlayerProduct.recipe_id
+        ).filter(
+            RoundProduction.player_id.in_(player_ids)
+        ).group_by(
+            RoundProduction.player_id, ProductRecipe.name
+        ).order_by(
+            RoundProduction.player_id, ProductRecipe.name
+        ).all() if player_ids else []
+
+        for player_id, product_name, produced, sold, revenue in product_rows:
+            products[player_id].append({
+                "product_name": product_name,
+                "produced": int(produced or 0),
+                "sold": int(sold or 0),
+                "revenue": float(revenue or 0)
+            })
+
+        # Sort by total profit descending (same order as get_profit_summary)
+        ranked = sorted(players, key=lambda p: float(p.total_profit), reverse=True)
+        rankings = [
+            {
+                "rank": idx + 1,
+                "player_id": player.id,
+                "nickname": player.nickname,
+                "total_profit": float(player.total_profit),
+                "cash": float(player.cash)
+            }
+            for idx, player in enumerate(ranked)
+        ]
+
+        payload = {
+            "game_id": game_id,
+            "rounds": rounds,
+            "rankings": rankings,
+            "players": [
+                {
+                    "player_id": player.id,
+                    "nickname": player.nickname,
+                    "series": series[player.id],
+                    "products": products[player.id]
+                }
+                for player in ranked
+            ]
+        }
+
+        report = FinalReport(game_id=game_id, payload=payload, etag=payload_etag(payload))
+        db.session.add(report)
+        db.session.flush()
+
+        return report
+
+    @staticmethod
+    def get_final_report(game_id: int) -> Tuple[Dict, str]:
+        """
+        Get the end-of-game report
+
+        Reports are built when the last round settles. Games that finished before
+        reports existed get theirs built on first request; if two such requests
+        race, the loser of the unique insert re-reads the winner's row.
+
+        Args:
+            game_id: Game ID
+
+        Returns:
+            (payload, etag)
+
+        Raises:
+            ValueError: Game not found or not finished
+        """
+        report = FinalReport.query.filter_by(game_id=game_id).first()
+        if report:
+            return report.payload, report.etag
+
+        from app.models.game import Game
+
+        game = Game.query.get(game_id)
+        if not game:
+            raise ValueError(f"Game {game_id} not found")
+        if game.status != 'finished':
+            raise ValueError(f"Game {game_id} is not finished yet")
+
+        try:
+            report = FinanceService.build_final_report(game_id)
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent first request stored the report first: serve that one
+            db.session.rollback()
+            report = FinalReport.query.filter_by(game_id=game_id).one()
+
+        return report.payload, report.etag
+
     @staticmethod
     def _calculate_revenue(player_id: int, round_number: int) -> Dict:
         """
@@ -0,0 +1,195 @@
+"""
+Ledger service
+Records every cash movement of a player as an append-only ledger entry
+"""
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, insert
+from app.core.database import db
+from app.models.player import Player
+from app.models.finance import CashLedgerEntry
+
+
+class LedgerService:
+    """Cash ledger service"""
+
+    # Entry types that are spending (amount < 0) and map 1:1 onto round expense keys
+    EXPENSE_TYPES = ('material', 'decoration', 'advertisement', 'market_research', 'product_research')
+    ENTRY_TYPES = EXPENSE_TYPES + ('hire', 'revenue')
+
+    @staticmethod
+    def record(player: Player, round_number: int, entry_type: str, amount) -> CashLedgerEntry:
+        """
+        Apply a cash movement to the player and append it to the ledger
+
+        Does not commit; the entry is written in the caller's transaction together
+        with the business change that caused it.
+
+        Args:
+            player: Player object (its cash is updated in place)
+            round_number: Round the movement belongs to
+            entry_type: One of ENTRY_TYPES
+            amount: Signed amount, negative for spending
+
+        Returns:
+            The new CashLedgerEntry
+
+        Raises:
+            ValueError: If entry_type is unknown
+        """
+        if entry_type not in LedgerService.ENTRY_TYPES:
+            raise ValueError(f"Unknown ledger entry type: {entry_type}")
+
+        amount = Decimal(str(amount))
+        player.cash = Decimal(str(player.cash)) + amount
+
+        entry = CashLedgerEntry(
+            player_id=player.id,
+            round_number=round_number,
+            entry_type=entry_type,
+            amount=amount,
+            balance_after=player.cash
+        )
+        db.session.add(entry)
+        return entry
+
+    @staticmethod
+    def record_many(movements: List[Tuple[Player, object]], round_number: int, entry_type: str) -> int:
+        """
+        Apply one cash movement per player and append all entries in one bulk insert
+
+        Same effect as calling record for each (player, amount) pair, with a
+        statement count that does not grow with the number of players. Does not commit.
+
+        Args:
+            movements: [(player, signed amount), ...]
+            round_number: Round the movements belong to
+            entry_type: One of ENTRY_TYPES
+
+        Returns:
+            Number of entries written
+
+        Raises:
+            ValueError: If entry_type is unknown
+        """
+        if entry_type not in LedgerService.ENTRY_TYPES:
+            raise ValueError(f"Unknown ledger entry type: {entry_type}")
+
+        rows = []
+        for player, amount in movements:
+            amount = Decimal(str(amount))
+            player.cash = Decimal(str(player.cash)) + amount
+            rows.append({
+                "player_id": player.id,
+                "round_number": round_number,
+                "entry_type": entry_type,
+                "amount": amount,
+                "balance_after": player.cash
+            })
+
+        if rows:
+            db.session.execute(insert(CashLedgerEntry), rows)
+        return len(rows)
+
+    @staticmethod
+    def backfill(player_id: int, round_number: int, entry_type: str, amount) -> CashLedgerEntry:
+        """
+        Append an entry for a movement that was applied to cash before the ledger existed
+
+        Cash is not touched and balance_after stays NULL, as for rows written by
+        scripts/add_cash_ledger.py. Does not commit.
+
+        Raises:
+            ValueError: If entry_type is unknown
+        """
+        if entry_type not in LedgerService.ENTRY_TYPES:
+            raise ValueError(f"Unknown ledger entry type: {entry_type}")
+
+        entry = CashLedgerEntry(
+            player_id=player_id,
+            round_number=round_number,
+            entry_type=entry_type,
+            amount=Decimal(str(amount)),
+            balance_after=None
+        )
+        db.session.add(entry)
+        return entry
+
+    @staticmethod
+    def get_entries(player_id: int, round_number: Optional[int] = None) -> List[Dict]:
+        """
+        Get a player's ledger entries in the order they were recorded
+
+        Args:
+            player_id: Player ID
+            round_number: Optional, only entries of this round
+
+        Returns:
+            List of entry dictionaries (see CashLedgerEntry.to_dict)
+
+        Raises:
+            ValueError: If player not found
+        """
+        player = Player.query.get(player_id)
+        if not player:
+            raise ValueError(f"Player {player_id} not found")
+
+        query = CashLedgerEntry.query.filter_by(player_id=player_id)
+        if round_number is not None:
+            query = query.filter_by(round_number=round_number)
+
+        return [entry.to_dict() for entry in query.order_by(CashLedgerEntry.id).all()]
+
+    @staticmethod
+    def net_amount(player_id: int, round_number: int, entry_type: str) -> Optional[Decimal]:
+        """
+        Net ledger amount of one entry type for a player-round (negative = net spending)
+
+        Args:
+            player_id: Player ID
+            round_number: Round number
+            entry_type: One of ENTRY_TYPES
+
+        Returns:
+            Decimal sum of the matching entries, None if there are none
+            (e.g. movements made before the ledger existed)
+        """
+        total = db.session.query(func.sum(CashLedgerEntry.amount)).filter(
+            CashLedgerEntry.player_id == player_id,
+            CashLedgerEntry.round_number == round_number,
+            CashLedgerEntry.entry_type == entry_type
+        ).scalar()
+        if total is None:
+            return None
+        return Decimal(str(total)).quantize(Decimal("0.01"))
+
+    @staticmethod
+    def round_totals(round_number: int, *player_filters) -> Dict[int, Dict[str, float]]:
+        """
+        Net ledger amount per player and entry type for one round, in a single query
+
+        Args:
+            round_number: Round number
+            player_filters: SQLAlchemy criteria on Player (e.g. Player.game_id == 1)
+
+        Returns:
+            {player_id: {"material": -1234.5, "advertisement": -800.0, ...}}
+            Only entry types that occurred are present.
+        """
+        rows = db.session.query(
+            CashLedgerEntry.player_id, CashLedgerEntry.entry_type, func.sum(CashLedgerEntry.amount)
+        ).join(
+            Player, Player.id == CashLedgerEntry.player_id
+        ).filter(
+            *player_filters,
+            CashLedgerEntry.round_number == round_number
+        ).group_by(CashLedgerEntry.player_id, CashLedgerEntry.entry_type).all()
+
+        totals: Dict[int, Dict[str, float]] = {}
+        for player_id, entry_type, amount in rows:
+            totals.setdefault(player_id, {})[entry_type] = float(amount or 0)
+        return totals
+
+
+# Export
+__all__ = ['LedgerService']
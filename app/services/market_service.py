@@ -6,6 +6,8 @@ from typing import Dict, List
 from app.core.database import db
 from app.models.player import Player
 from app.models.finance import MarketAction
+from app.services.ledger_service import LedgerService
+from app.utils.game_cache import GameScopedCache
 from app.utils.game_constants import GameConstants
 
 
@@ -30,7 +32,7 @@ class MarketService:
         if player.cash < cost:
             raise ValueError(f"Insufficient cash! Need {cost}, have {float(player.cash)}")
 
-        player.cash -= cost
+        LedgerService.record(player, round_number, 'advertisement', -cost)
         # 将本回合广告分同步到玩家所有已解锁产品，供口碑计算使用
         from app.models.product import PlayerProduct
         unlocked_products = PlayerProduct.query.filter_by(
@@ -49,6 +51,7 @@ class MarketService:
         )
         db.session.add(market_action)
         db.session.commit()
+        GameScopedCache.invalidate_game(player.game_id)
 
         return {
             "success": True,
@@ -73,20 +76,13 @@ class MarketService:
         if player.cash < cost:
             raise ValueError(f"Insufficient cash! Need {cost}, have {float(player.cash)}")
 
-        player.cash -= cost
+        LedgerService.record(player, round_number, 'market_research', -cost)
 
-        from app.models.game import CustomerFlow
         from app.services.round_service import RoundService
 
         next_round = round_number + 1
 
-        customer_flow = CustomerFlow.query.filter_by(
-            game_id=player.game_id,
-            round_number=next_round
-        ).first()
-
-        if not customer_flow:
-            customer_flow = RoundService.generate_customer_flow(player.game_id, next_round)
+        customer_flow = RoundService.get_customer_flow(player.game_id, next_round)
 
         market_action = MarketAction(
             player_id=player_id,
@@ -103,8 +99,8 @@ class MarketService:
             "cost": cost,
             "next_round": next_round,
             "customer_flow": {
-                "high_tier_customers": customer_flow.high_tier_customers,
-                "low_tier_customers": customer_flow.low_tier_customers
+                "high_tier_customers": customer_flow["high_tier_customers"],
+                "low_tier_customers": customer_flow["low_tier_customers"]
             },
             "remaining_cash": float(player.cash)
         }
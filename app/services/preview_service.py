@@ -0,0 +1,205 @@
+"""
+销售预览服务
+基于本回合已提交的生产计划加一个假设调整（价格/产量），在内存中试算销量，不写数据库
+"""
+from typing import Dict, List, Optional
+from app.models.game import Game
+from app.models.player import Player
+from app.models.product import PlayerProduct
+from app.services.calculation_engine import CustomerFlowAllocator, ReputationCalculator
+from app.services.production_service import ProductionService
+from app.utils.game_cache import GameScopedCache
+
+
+class SalesPreviewService:
+    """销售预览服务"""
+
+    # 每局最多缓存的预览条数（调整项由客户端决定，不设上限会随请求无限增长）
+    MAX_PREVIEWS_PER_GAME = 256
+
+    # 每局 (round_number, player_id, 调整项) -> 预览结果，结算输入变化时随 invalidate_game 失效
+    _previews = GameScopedCache(max_entries_per_game=MAX_PREVIEWS_PER_GAME)
+
+    @staticmethod
+    def preview_sales(player_id: int, round_number: int, override: Optional[Dict] = None) -> Dict:
+        """
+        预览本回合销量（不提交、不结算）
+
+        结算输入快照与预览结果按局缓存，同一房间内反复拖动价格滑块只做内存计算；
+        使用与正式结算相同的确定性随机流，输入不变时预览与结算结果一致。
+
+        Args:
+            player_id: 玩家ID
+            round_number: 回合数
+            override: 假设调整 {"product_id": 1, "price": 25, "productivity": 10}
+                      productivity 可选，缺省沿用已提交的产量；为 0 表示不生产该产品
+
+        Returns:
+            {
+                "round_number": 1,
+                "override": {...} | None,
+                "baseline": {"products": [...], "total_revenue": 450.0},
+                "projected": {"products": [...], "total_revenue": 520.0}
+            }
+
+        Raises:
+            ValueError: 玩家不存在、调整项不合法
+        """
+        player = Player.query.get(player_id)
+        if not player:
+            raise ValueError(f"玩家 {player_id} 不存在")
+
+        override = SalesPreviewService._normalize_override(player_id, round_number, override)
+
+        baseline = SalesPreviewService._preview(player.game_id, round_number, player_id, None)
+        projected = baseline
+        if override is not None:
+            projected = SalesPreviewService._preview(player.game_id, round_number, player_id, override)
+
+        return {
+            "round_number": round_number,
+            "override": override,
+            "baseline": baseline,
+            "projected": projected
+        }
+
+    @staticmethod
+    def _preview(game_id: int, round_number: int, player_id: int, override: Optional[Dict]) -> Dict:
+        """按局缓存的单次预览"""
+        override_key = None
+        if override is not None:
+            override_key = (override["product_id"], override["price"], override["productivity"])
+
+        return SalesPreviewService._previews.get_or_compute(
+            game_id,
+            (round_number, player_id, override_key),
+            lambda: SalesPreviewService._simulate(game_id, round_number, player_id, override)
+        )
+
+    @staticmethod
+    def _simulate(game_id: int, round_number: int, player_id: int, override: Optional[Dict]) -> Dict:
+        inputs = CustomerFlowAllocator.get_cached_inputs(game_id, round_number)
+
+        products = inputs["products"]
+        if override is not None:
+            products = SalesPreviewService._apply_override(products, player_id, override)
+
+        result = CustomerFlowAllocator.allocate_products(
+            products,
+            inputs["high_tier_customers"],
+            inputs["low_tier_customers"],
+            rng=CustomerFlowAllocator.settlement_rng(Game.query.get(game_id), round_number)
+        )
+
+        own_products = []
+        total_revenue = 0.0
+        for p in result["sales_details"]:
+            if p["player_id"] != player_id:
+                continue
+            sold = p["sold_high"] + p["sold_low"]
+            revenue = sold * p["price"]
+            total_revenue += revenue
+            own_products.append({
+                "product_id": p["player_product_id"],
+                "product_name": p["product_name"],
+                "price": p["price"],
+                "produced": sold + p["available"],
+                "sold": sold,
+                "sold_to_high": p["sold_high"],
+                "sold_to_low": p["sold_low"],
+                "revenue": revenue
+            })
+
+        return {
+            "products": own_products,
+            "total_revenue": total_revenue
+        }
+
+    @staticmethod
+    def _apply_override(products: List[Dict], player_id: int, override: Dict) -> List[Dict]:
+        """
+        在快照副本上应用调整项（不修改共享快照）
+
+        已提交的产品保留原位置（影响并列组余数的分配顺序），未提交的产品追加到末尾
+        """
+        product_id = override["product_id"]
+        productivity = override["productivity"]
+
+        adjusted = []
+        matched = None
+        for p in products:
+            if p["player_id"] == player_id and p["player_product_id"] == product_id:
+                if matched is None:
+                    matched = dict(p, price=override["price"])
+                    if productivity is not None:
+                        matched["available"] = productivity
+                    if matched["available"] > 0:
+                        adjusted.append(matched)
+                continue
+            adjusted.append(p)
+
+        if matched is not None:
+            return adjusted
+
+        if not productivity:
+            raise ValueError(f"产品 {product_id} 不在本回合生产计划中，请同时提供 productivity")
+
+        player_product = PlayerProduct.query.get(product_id)
+        if not player_product or player_product.player_id != player_id:
+            raise ValueError(f"产品 {product_id} 不属于玩家 {player_id}")
+        if not player_product.is_unlocked:
+            raise ValueError(f"产品 {player_product.recipe.name} 尚未解锁，请先研发")
+
+        ad_score = next((p["ad_score"] for p in products if p["player_id"] == player_id), None)
+        adjusted.append({
+            "production_id": None,
+            "player_product_id": player_product.id,
+            "player_id": player_id,
+            "player_name": player_product.player.nickname,
+            "product_name": player_product.recipe.name,
+            "reputation": ReputationCalculator.calculate(player_product, ad_score=ad_score),
+            "ad_score": ad_score if ad_score is not None else (player_product.current_ad_score or 0),
+            "price": override["price"],
+            "available": productivity,
+            "sold_high": 0,
+            "sold_low": 0
+        })
+        return adjusted
+
+    @staticmethod
+    def _normalize_override(player_id: int, round_number: int, override: Optional[Dict]) -> Optional[Dict]:
+        """标准化并校验调整项（定价规则、定价锁定与正式提交一致）"""
+        if not override:
+            return None
+
+        if 'product_id' not in override:
+            raise ValueError("缺少 product_id")
+        try:
+            price_val = float(override.get('price'))
+        except Exception:
+            raise ValueError("price 必须是数字")
+
+        productivity_val = override.get('productivity')
+        if productivity_val is not None:
+            try:
+                productivity_val = int(productivity_val)
+            except Exception:
+                raise ValueError("productivity 必须是整数")
+            if productivity_val < 0:
+                raise ValueError("productivity 不能为负数")
+
+        normalized = {
+            "product_id": int(override["product_id"]),
+            "price": price_val,
+            "productivity": productivity_val
+        }
+
+        check = [dict(normalized, productivity=productivity_val if productivity_val is not None else 1)]
+        ProductionService._validate_pricing(check)
+        ProductionService._validate_price_lock(player_id, round_number, check)
+
+        return normalized
+
+
+# 导出
+__all__ = ['SalesPreviewService']
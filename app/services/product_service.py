@@ -8,6 +8,9 @@ from app.core.database import db
 from app.models.player import Player
 from app.models.product import ProductRecipe, PlayerProduct
 from app.models.finance import ResearchLog
+from app.services.ledger_service import LedgerService
+from app.services.calculation_engine import ReputationCalculator
+from app.utils.game_cache import GameScopedCache
 from app.utils.game_constants import GameConstants
 
 
@@ -79,7 +82,7 @@ class ProductService:
             )
 
         # Deduct cost
-        player.cash -= cost
+        LedgerService.record(player, round_number, 'product_research', -cost)
 
         # Check against recipe difficulty
         # Difficulty 3: need >= 3 (easy) - 67% success rate (4,5,6成功)
@@ -122,6 +125,9 @@ class ProductService:
 
         db.session.commit()
 
+        if product_unlocked:
+            GameScopedCache.invalidate_game(player.game_id)
+
         return {
             "success": True,
             "dice_result": dice_result,
@@ -166,6 +172,7 @@ class ProductService:
         if existing:
             existing.is_unlocked = True
             db.session.commit()
+            GameScopedCache.invalidate_game(player.game_id)
             return existing
 
         # Create new
@@ -179,6 +186,7 @@ class ProductService:
 
         db.session.add(player_product)
         db.session.commit()
+        GameScopedCache.invalidate_game(player.game_id)
 
         return player_product
 
@@ -316,8 +324,6 @@ class ProductService:
         if product.player_id != player_id:
             raise ValueError(f"Product {product_id} does not belong to player {player_id}")
 
-        from app.services.calculation_engine import ReputationCalculator
-
         # Calculate reputation
         reputation = ReputationCalculator.calculate(product)
 
@@ -2,12 +2,19 @@
 生产决策服务
 处理生产计划提交、原材料计算、生产力验证等
 """
-from typing import List, Dict
+from datetime import datetime
 from decimal import Decimal
+from typing import List, Dict, Optional, Tuple
+from sqlalchemy import and_, delete, func, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 from app.core.database import db
+from app.models.game import RoundSubmission
 from app.models.player import Player, Employee
 from app.models.product import PlayerProduct, ProductRecipe, RoundProduction
 from app.services.calculation_engine import DiscountCalculator
+from app.services.ledger_service import LedgerService
+from app.utils.game_cache import GameScopedCache
 from app.utils.game_constants import GameConstants
 
 
@@ -19,6 +26,8 @@ class ProductionService:
         """
         提交生产计划
 
+        重复提交时与已保存的计划比对，只改动有变化的行，原材料费只扣除或退还差额。
+
         Args:
             player_id: 玩家ID
             round_number: 回合数
@@ -32,6 +41,7 @@ class ProductionService:
                 "success": True,
                 "material_needs": {"tea": 10, "milk": 20, ...},
                 "material_costs": {"tea": {...}, "total_cost": 123.45},
+                "material_delta": 123.45,  # 本次实际扣除（负数为退还）的原材料费
                 "remaining_cash": 8876.55
             }
 
@@ -39,96 +49,429 @@ class ProductionService:
             ValueError: 各种验证错误
         """
         # 标准化输入，确保数值类型正确
-        normalized_productions = []
-        for prod in productions:
-            if 'product_id' not in prod:
-                raise ValueError("缺少 product_id")
-            try:
-                price_val = float(prod.get('price', 0))
-            except Exception:
-                raise ValueError("price 必须是数字")
-            try:
-                productivity_val = int(prod.get('productivity', 0) or 0)
-            except Exception:
-                raise ValueError("productivity 必须是整数")
-            normalized_productions.append({
-                "product_id": prod["product_id"],
-                "price": price_val,
-                "productivity": productivity_val
-            })
+        normalized_productions = ProductionService.normalize_productions(productions)
 
-        player = Player.query.get(player_id)
-        if not player:
-            raise ValueError(f"玩家 {player_id} 不存在")
+        # 0. 一次性加载玩家、店铺、总生产力与计划涉及的产品（含配方），后续验证只读上下文
+        context = ProductionService.load_submission_context(player_id, normalized_productions)
+        player = context["player"]
 
         # 1. 验证生产力分配
-        total_productivity = ProductionService._get_total_productivity(player_id)
         ProductionService._validate_productivity_allocation(
-            normalized_productions, total_productivity
+            normalized_productions, context["total_productivity"]
         )
 
         # 2. 验证定价
         ProductionService._validate_pricing(normalized_productions)
 
         # 2.5. 验证定价锁定（每3回合可调整）
-        ProductionService._validate_price_lock(player_id, round_number, normalized_productions)
+        ProductionService._validate_price_lock(player_id, round_number, normalized_productions, context)
 
         # 3. 验证产品是否已解锁
-        ProductionService._validate_products_unlocked(player_id, normalized_productions)
+        ProductionService._validate_products_unlocked(player_id, normalized_productions, context)
 
         # 4. 计算原材料需求
-        material_needs = ProductionService.calculate_material_needs(normalized_productions)
+        material_needs = ProductionService.calculate_material_needs(normalized_productions, context)
 
         # 5. 计算原材料成本（含批量折扣）
         material_costs = DiscountCalculator.calculate_material_costs(material_needs)
         purchase_cost = material_costs["total_cost"]
 
-        # 6. 检查余额
-        if player.cash < purchase_cost:
+        # 6. 重复提交只结算差额：本回合已付原材料费来自现金流水
+        saved_plan = ProductionService._load_saved_plan(player_id, round_number)
+        already_paid, from_ledger = ProductionService._material_already_paid(player_id, round_number, saved_plan)
+        if not from_ledger and already_paid:
+            # 账本上线前提交的计划：先补记当时已扣的原材料费，之后的差额才能对上
+            LedgerService.backfill(player_id, round_number, 'material', -already_paid)
+        material_delta = Decimal(str(purchase_cost)) - already_paid
+
+        # 7. 检查余额
+        if material_delta > 0 and player.cash < material_delta:
             raise ValueError(
-                f"现金不足！需要 {purchase_cost} 元，当前余额 {float(player.cash)} 元"
+                f"现金不足！需要 {float(material_delta)} 元，当前余额 {float(player.cash)} 元"
             )
 
-        # 7. 扣除原材料成本（转换为Decimal避免类型错误）
-        player.cash -= Decimal(str(purchase_cost))
+        # 8. 扣除或退还原材料差额（记入现金流水）
+        if material_delta != 0:
+            LedgerService.record(player, round_number, 'material', -material_delta)
 
-        # 8. 删除该玩家本回合的旧生产计划（如果有）
-        RoundProduction.query.filter_by(
-            player_id=player_id,
-            round_number=round_number
-        ).delete()
+        # 9. 与已提交的计划比对，只更新/新增/删除有变化的行
+        submitted = ProductionService._apply_plan_diff(player_id, round_number, normalized_productions, saved_plan)
 
-        # 9. 保存新的生产计划并更新产品价格
+        # 10. 更新产品价格
         for prod_data in normalized_productions:
             if prod_data['productivity'] <= 0:
                 continue
 
-            production = RoundProduction(
-                player_id=player_id,
-                round_number=round_number,
-                product_id=prod_data['product_id'],
-                allocated_productivity=prod_data['productivity'],
-                price=prod_data['price'],
-                produced_quantity=prod_data['productivity']  # 生产力 = 生产数量
-            )
-            db.session.add(production)
-
             # Update player_product price and last_price_change_round if price changed
-            player_product = PlayerProduct.query.get(prod_data['product_id'])
+            player_product = context["products"].get(prod_data['product_id'])
             if player_product and player_product.current_price != prod_data['price']:
                 player_product.current_price = prod_data['price']
                 player_product.last_price_change_round = round_number
 
-        # 10. 提交所有更改
+        # 11. 记录提交状态（与生产计划同一事务；全部产量为 0 视为未提交）
+        game_id = player.game_id
+        ProductionService._mark_submitted(game_id, round_number, player_id, submitted=submitted)
+
+        # 12. 提交所有更改
         db.session.commit()
+        GameScopedCache.invalidate_game(game_id)
 
         return {
             "success": True,
             "material_needs": material_needs,
             "material_costs": material_costs,
+            "material_delta": float(material_delta),
             "remaining_cash": float(player.cash)
         }
 
+    @staticmethod
+    def get_submission_status(game_id: int, round_number: int) -> Dict:
+        """
+        获取一局某回合的提交情况（一条查询：在职玩家左连接提交记录）
+
+        Returns:
+            {
+                "game_id": 1,
+                "round_number": 1,
+                "submitted_count": 1,
+                "total_players": 2,
+                "all_submitted": False,
+                "players": [
+                    {"player_id": 1, "nickname": "玩家1", "submitted": True, "submitted_at": "..."},
+                    {"player_id": 2, "nickname": "玩家2", "submitted": False, "submitted_at": None}
+                ]
+            }
+        """
+        rows = db.session.query(
+            Player.id, Player.nickname, RoundSubmission.submitted_at
+        ).outerjoin(
+            RoundSubmission, and_(
+                RoundSubmission.player_id == Player.id,
+                RoundSubmission.game_id == game_id,
+                RoundSubmission.round_number == round_number
+            )
+        ).filter(
+            Player.game_id == game_id,
+            Player.is_active == True
+        ).order_by(Player.id).all()
+
+        players = [
+            {
+                "player_id": player_id,
+                "nickname": nickname,
+                "submitted": submitted_at is not None,
+                "submitted_at": submitted_at.isoformat() if submitted_at else None
+            }
+            for player_id, nickname, submitted_at in rows
+        ]
+        submitted_count = sum(1 for p in players if p["submitted"])
+
+        return {
+            "game_id": game_id,
+            "round_number": round_number,
+            "submitted_count": submitted_count,
+            "total_players": len(players),
+            "all_submitted": bool(players) and submitted_count == len(players),
+            "players": players
+        }
+
+    @staticmethod
+    def _mark_submitted(game_id: int, round_number: int, player_id: int, submitted: bool = True):
+        """
+        写入或删除玩家本回合的提交记录（不提交事务）
+
+        先按唯一键更新；没有记录时在保存点内插入，
+        并发提交抢先插入导致唯一键冲突时回滚保存点并改为更新。
+        """
+        submission = RoundSubmission.query.filter_by(
+            game_id=game_id,
+            round_number=round_number,
+            player_id=player_id
+        )
+
+        if not submitted:
+            submission.delete(synchronize_session=False)
+            return
+
+        now = datetime.utcnow()
+        if submission.update({"submitted_at": now}, synchronize_session=False):
+            return
+
+        try:
+            with db.session.begin_nested():
+                db.session.add(RoundSubmission(
+                    game_id=game_id,
+                    round_number=round_number,
+                    player_id=player_id,
+                    submitted_at=now
+                ))
+        except IntegrityError:
+            submission.update({"submitted_at": now}, synchronize_session=False)
+
+    @staticmethod
+    def _load_saved_plan(player_id: int, round_number: int) -> List:
+        """本回合已保存的生产计划行（只取比对所需的列）"""
+        return db.session.query(
+            RoundProduction.id,
+            RoundProduction.product_id,
+            RoundProduction.allocated_productivity,
+            RoundProduction.price
+        ).filter_by(
+            player_id=player_id,
+            round_number=round_number
+        ).order_by(RoundProduction.id).all()
+
+    @staticmethod
+    def _material_already_paid(player_id: int, round_number: int, saved_plan: Optional[List] = None) -> Tuple[Decimal, bool]:
+        """
+        玩家本回合已支付的原材料费
+
+        优先读取现金流水；没有流水记录但已有保存的计划（账本上线前提交、回填遗漏）时，
+        按已保存计划重新计算原材料费，避免重复提交时再扣一次全款。
+
+        Returns:
+            (已支付金额, 是否来自现金流水)
+        """
+        paid = LedgerService.net_amount(player_id, round_number, 'material')
+        if paid is not None:
+            return -paid, True
+
+        if saved_plan is None:
+            saved_plan = ProductionService._load_saved_plan(player_id, round_number)
+        if not saved_plan:
+            return Decimal("0"), False
+
+        needs = ProductionService.calculate_material_needs([
+            {"product_id": row.product_id, "productivity": row.allocated_productivity}
+            for row in saved_plan
+        ])
+        return Decimal(str(DiscountCalculator.calculate_material_costs(needs)["total_cost"])), False
+
+    @staticmethod
+    def _apply_plan_diff(player_id: int, round_number: int, productions: List[Dict], existing: List) -> bool:
+        """
+        把新计划与本回合已保存的计划比对，批量执行 UPDATE / INSERT / DELETE（不提交事务）
+
+        同一产品按出现顺序一一配对：数值未变的行不动，变化的行原地更新，
+        多出的新条目插入，旧计划中多余的行删除。
+
+        Args:
+            existing: _load_saved_plan 的结果
+
+        Returns:
+            新计划是否包含产量大于 0 的条目
+        """
+        unmatched: Dict[int, List] = {}
+        for row in existing:
+            unmatched.setdefault(row.product_id, []).append(row)
+
+        updates = []
+        inserts = []
+        for prod_data in productions:
+            if prod_data['productivity'] <= 0:
+                continue
+
+            candidates = unmatched.get(prod_data['product_id'])
+            if not candidates:
+                inserts.append({
+                    "player_id": player_id,
+                    "round_number": round_number,
+                    "product_id": prod_data['product_id'],
+                    "allocated_productivity": prod_data['productivity'],
+                    "price": prod_data['price'],
+                    "produced_quantity": prod_data['productivity']  # 生产力 = 生产数量
+                })
+                continue
+
+            row = candidates.pop(0)
+            if row.allocated_productivity != prod_data['productivity'] or float(row.price or 0) != prod_data['price']:
+                updates.append({
+                    "id": row.id,
+                    "allocated_productivity": prod_data['productivity'],
+                    "price": prod_data['price'],
+                    "produced_quantity": prod_data['productivity']
+                })
+
+        deletes = [row.id for rows in unmatched.values() for row in rows]
+
+        if updates:
+            db.session.execute(update(RoundProduction), updates)
+        if inserts:
+            db.session.execute(insert(RoundProduction), inserts)
+        if deletes:
+            db.session.execute(
+                delete(RoundProduction).where(RoundProduction.id.in_(deletes)),
+                execution_options={"synchronize_session": False}
+            )
+
+        return len(existing) - len(deletes) + len(inserts) > 0
+
+    @staticmethod
+    def normalize_productions(productions: List[Dict]) -> List[Dict]:
+        """
+        标准化生产计划输入，确保数值类型正确
+
+        Returns:
+            [{"product_id": 1, "price": 15.0, "productivity": 5}, ...]
+
+        Raises:
+            ValueError: 缺少 product_id 或数值格式错误
+        """
+        normalized_productions = []
+        for prod in productions:
+            if not isinstance(prod, dict) or 'product_id' not in prod:
+                raise ValueError("缺少 product_id")
+            try:
+                product_id_val = int(prod["product_id"])
+            except Exception:
+                raise ValueError("product_id 必须是整数")
+            try:
+                price_val = float(prod.get('price', 0))
+            except Exception:
+                raise ValueError("price 必须是数字")
+            try:
+                productivity_val = int(prod.get('productivity', 0) or 0)
+            except Exception:
+                raise ValueError("productivity 必须是整数")
+            normalized_productions.append({
+                "product_id": product_id_val,
+                "price": price_val,
+                "productivity": productivity_val
+            })
+
+        return normalized_productions
+
+    @staticmethod
+    def load_submission_context(player_id: int, productions: List[Dict]) -> Dict:
+        """
+        加载一次提交所需的全部实体，查询条数与计划大小无关
+
+        Args:
+            player_id: 玩家ID
+            productions: 生产计划列表（只读取 product_id）
+
+        Returns:
+            {
+                "player": Player,             # 已预加载 shop
+                "total_productivity": 15,     # 在职员工生产力之和
+                "products": {product_id: PlayerProduct}  # 已预加载 recipe，只含计划涉及的产品
+            }
+
+        Raises:
+            ValueError: 玩家不存在
+        """
+        player = Player.query.options(joinedload(Player.shop)).filter_by(id=player_id).first()
+        if not player:
+            raise ValueError(f"玩家 {player_id} 不存在")
+
+        total_productivity = 0
+        if player.shop:
+            total_productivity = db.session.query(
+                func.coalesce(func.sum(Employee.productivity), 0)
+            ).filter(
+                Employee.shop_id == player.shop.id,
+                Employee.is_active == True
+            ).scalar()
+
+        return {
+            "player": player,
+            "total_productivity": int(total_productivity),
+            "products": ProductionService._load_products(productions)
+        }
+
+    @staticmethod
+    def _load_products(productions: List[Dict]) -> Dict[int, PlayerProduct]:
+        """按计划中的 product_id 批量加载玩家产品及配方（一条查询）"""
+        product_ids = {prod_data['product_id'] for prod_data in productions}
+        if not product_ids:
+            return {}
+
+        products = PlayerProduct.query.options(
+            joinedload(PlayerProduct.recipe)
+        ).filter(PlayerProduct.id.in_(product_ids)).all()
+        return {product.id: product for product in products}
+
+    # 成本曲线允许的最大产量，防止一次请求生成过长的数组
+    MAX_COST_CURVE_QUANTITY = 1000
+
+    @staticmethod
+    def get_cost_curve(player_id: int, max_quantity: Optional[int] = None) -> Dict:
+        """
+        获取玩家已解锁产品的原材料成本曲线（产量 0..N），供前端滑块本地插值
+
+        同一原材料的折扣按合计份数计算，多产品组合的精确成本为：
+        sum(material_curves[m][sum(recipe[m] * 产量)] for m in 原材料)
+
+        Args:
+            player_id: 玩家ID
+            max_quantity: 最大产量 N，缺省为玩家当前总生产力
+
+        Returns:
+            {
+                "player_id": 1,
+                "max_quantity": 30,
+                "material_curves": {"tea": [0.0, 6.0, ...], ...},  # 下标为原材料份数
+                "products": [
+                    {
+                        "product_id": 1,
+                        "recipe_id": 1,
+                        "name": "奶茶",
+                        "recipe": {"milk": 1, "tea": 1},
+                        "costs": [0.0, 10.0, 20.0, ...]  # 下标为该产品单独生产的杯数
+                    },
+                    ...
+                ]
+            }
+
+        Raises:
+            ValueError: 玩家不存在或 max_quantity 越界
+        """
+        context = ProductionService.load_submission_context(player_id, [])
+        if max_quantity is None:
+            max_quantity = context["total_productivity"]
+        if max_quantity < 0 or max_quantity > ProductionService.MAX_COST_CURVE_QUANTITY:
+            raise ValueError(f"max_quantity 必须在 0-{ProductionService.MAX_COST_CURVE_QUANTITY} 之间")
+
+        products = PlayerProduct.query.options(
+            joinedload(PlayerProduct.recipe)
+        ).filter_by(
+            player_id=player_id,
+            is_unlocked=True
+        ).order_by(PlayerProduct.id).all()
+
+        # 每种原材料的曲线长度 = N × 已解锁配方中该原材料的最大单杯用量
+        per_unit_max = {}
+        for product in products:
+            for material, amount in product.recipe.recipe_json.items():
+                per_unit_max[material] = max(per_unit_max.get(material, 0), amount)
+
+        material_curves = {
+            material: DiscountCalculator.material_cost_curve(material, max_quantity * amount)
+            for material, amount in per_unit_max.items()
+        }
+
+        return {
+            "player_id": player_id,
+            "max_quantity": max_quantity,
+            "material_curves": material_curves,
+            "products": [
+                {
+                    "product_id": product.id,
+                    "recipe_id": product.recipe_id,
+                    "name": product.recipe.name,
+                    "recipe": product.recipe.recipe_json,
+                    "costs": [
+                        round(sum(
+                            material_curves[material][amount * quantity]
+                            for material, amount in product.recipe.recipe_json.items()
+                        ), 2)
+                        for quantity in range(max_quantity + 1)
+                    ]
+                }
+                for product in products
+            ]
+        }
+
     @staticmethod
     def get_production_plan(player_id: int, round_number: int) -> List[Dict]:
         """
@@ -174,24 +517,26 @@ class ProductionService:
         return result
 
     @staticmethod
-    def calculate_material_needs(productions: List[Dict]) -> Dict[str, int]:
+    def calculate_material_needs(productions: List[Dict], context: Optional[Dict] = None) -> Dict[str, int]:
         """
         计算原材料总需求
 
         Args:
             productions: 生产计划列表
+            context: 可选，load_submission_context 的结果；缺省时批量加载产品
 
         Returns:
             {"tea": 15, "milk": 25, "fruit": 0, "ingredient": 10}
         """
         needs = {"tea": 0, "milk": 0, "fruit": 0, "ingredient": 0}
+        products = context["products"] if context else ProductionService._load_products(productions)
 
         for prod_data in productions:
             if prod_data['productivity'] <= 0:
                 continue
 
             # 获取产品配方
-            player_product = PlayerProduct.query.get(prod_data['product_id'])
+            player_product = products.get(prod_data['product_id'])
             if not player_product:
                 continue
 
@@ -206,28 +551,6 @@ class ProductionService:
 
         return needs
 
-    @staticmethod
-    def _get_total_productivity(player_id: int) -> int:
-        """
-        获取玩家的总生产力（所有在职员工的生产力之和）
-
-        Args:
-            player_id: 玩家ID
-
-        Returns:
-            总生产力
-        """
-        player = Player.query.get(player_id)
-        if not player or not player.shop:
-            return 0
-
-        employees = Employee.query.filter_by(
-            shop_id=player.shop.id,
-            is_active=True
-        ).all()
-
-        return sum(emp.productivity for emp in employees)
-
     @staticmethod
     def _validate_productivity_allocation(productions: List[Dict], total_productivity: int):
         """
@@ -268,18 +591,23 @@ class ProductionService:
                 )
 
     @staticmethod
-    def _validate_products_unlocked(player_id: int, productions: List[Dict]):
+    def _validate_products_unlocked(player_id: int, productions: List[Dict], context: Optional[Dict] = None):
         """
         验证所有产品是否已解锁
 
+        Args:
+            context: 可选，load_submission_context 的结果；缺省时批量加载产品
+
         Raises:
             ValueError: 如果产品未解锁
         """
+        products = context["products"] if context else ProductionService._load_products(productions)
+
         for prod_data in productions:
             if prod_data['productivity'] <= 0:
                 continue
 
-            player_product = PlayerProduct.query.get(prod_data['product_id'])
+            player_product = products.get(prod_data['product_id'])
 
             if not player_product:
                 raise ValueError(f"产品 {prod_data['product_id']} 不存在")
@@ -293,7 +621,8 @@ class ProductionService:
                 )
 
     @staticmethod
-    def _validate_price_lock(player_id: int, round_number: int, productions: List[Dict]):
+    def _validate_price_lock(player_id: int, round_number: int, productions: List[Dict],
+                             context: Optional[Dict] = None):
         """
         验证定价锁定（每3回合可调整一次）
 
@@ -304,15 +633,18 @@ class ProductionService:
             player_id: 玩家ID
             round_number: 当前回合数
             productions: 生产计划列表
+            context: 可选，load_submission_context 的结果；缺省时批量加载产品
 
         Raises:
             ValueError: 如果尝试在锁定期内修改价格
         """
+        products = context["products"] if context else ProductionService._load_products(productions)
+
         for prod_data in productions:
             if prod_data['productivity'] <= 0:
                 continue
 
-            player_product = PlayerProduct.query.get(prod_data['product_id'])
+            player_product = products.get(prod_data['product_id'])
             if not player_product:
                 continue
 
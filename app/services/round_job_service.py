@@ -0,0 +1,190 @@
+"""
+Round job service
+Runs round advances as background jobs so the HTTP request returns immediately
+"""
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional
+from flask import current_app
+from app.core.database import db
+from app.core.logger import get_logger
+from app.models.game import Game
+from app.services.round_service import RoundService
+
+logger = get_logger("round_job_service")
+
+
+class RoundJobQueueFullError(Exception):
+    """Too many round advance jobs are already queued or running"""
+
+
+class RoundJobService:
+    """
+    Asynchronous round advance
+
+    Jobs run on a bounded worker pool (ROUND_ADVANCE_WORKERS threads), and at most
+    ROUND_ADVANCE_MAX_PENDING jobs may be queued or running at once. There is at
+    most one live job per (game, round): enqueueing again returns the existing job
+    unless it failed. Finished jobs are kept in memory for polling, oldest first out.
+    """
+
+    MAX_FINISHED_JOBS = 1000
+
+    _executor = None
+    _jobs = OrderedDict()
+    _by_round = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def enqueue_advance(game_id: int) -> Dict:
+        """
+        Enqueue advancing the game's current round
+
+        Args:
+            game_id: Game ID
+
+        Returns:
+            Job dictionary (see get_job)
+
+        Raises:
+            ValueError: Game not found or not in progress
+            RoundJobQueueFullError: ROUND_ADVANCE_MAX_PENDING jobs are already pending
+        """
+        game = Game.query.get(game_id)
+        if not game:
+            raise ValueError(f"Game {game_id} not found")
+
+        # A round being settled is still enqueued: the job waits for that settlement's result
+        if game.status not in ('in_progress', 'settling'):
+            raise ValueError(f"Game is not in progress (current status: {game.status})")
+
+        round_number = game.current_round
+        key = (game_id, round_number)
+        app = current_app._get_current_object()
+
+        with RoundJobService._lock:
+            job_id = RoundJobService._by_round.get(key)
+            job = RoundJobService._jobs.get(job_id) if job_id else None
+            if job is not None and job["status"] != 'failed':
+                return dict(job)
+
+            max_pending = app.config.get('ROUND_ADVANCE_MAX_PENDING', 32)
+            pending = sum(1 for other in RoundJobService._jobs.values() if other["status"] in ('queued', 'running'))
+            if pending >= max_pending:
+                raise RoundJobQueueFullError(f"Too many round advances in progress ({pending}); retry later")
+
+            job = {
+                "job_id": uuid.uuid4().hex,
+                "game_id": game_id,
+                "round_number": round_number,
+                "status": 'queued',
+                "result": None,
+                "error": None,
+                "created_at": datetime.utcnow().isoformat(),
+                "finished_at": None
+            }
+            RoundJobService._jobs[job["job_id"]] = job
+            RoundJobService._by_round[key] = job["job_id"]
+            RoundJobService._trim()
+            snapshot = dict(job)
+
+        # Tests run on an in-memory database: run inline instead of on a worker thread
+        if app.config.get('TESTING'):
+            RoundJobService._run(job["job_id"])
+            return RoundJobService.get_job(job["job_id"])
+
+        RoundJobService._get_executor(app).submit(RoundJobService._run_in_background, app, job["job_id"])
+        return snapshot
+
+    @staticmethod
+    def get_job(job_id: str) -> Optional[Dict]:
+        """
+        Get job status and result
+
+        Returns:
+            {
+                "job_id": "...",
+                "game_id": 1,
+                "round_number": 1,
+                "status": "queued" | "running" | "succeeded" | "failed",
+                "result": {...} | None,   # advance_round result once succeeded
+                "error": "..." | None,
+                "created_at": "...",
+                "finished_at": "..." | None
+            }
+            or None if the job is unknown
+        """
+        with RoundJobService._lock:
+            job = RoundJobService._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    @staticmethod
+    def clear():
+        """Forget all jobs (used when tests rebuild the database)"""
+        with RoundJobService._lock:
+            RoundJobService._jobs.clear()
+            RoundJobService._by_round.clear()
+
+    @staticmethod
+    def _run(job_id: str):
+        with RoundJobService._lock:
+            job = RoundJobService._jobs[job_id]
+            job["status"] = 'running'
+
+        try:
+            result = RoundService.advance_round(job["game_id"], expected_round=job["round_number"])
+        except Exception as e:
+            RoundJobService._finish(job_id, 'failed', error=str(e))
+            if not isinstance(e, ValueError):
+                logger.exception("round_job_failed", extra={"fields": {
+                    "job_id": job_id, "game_id": job["game_id"], "round_number": job["round_number"]
+                }})
+        else:
+            RoundJobService._finish(job_id, 'succeeded', result=result)
+
+    @staticmethod
+    def _run_in_background(app, job_id: str):
+        with app.app_context():
+            try:
+                RoundJobService._run(job_id)
+            finally:
+                db.session.remove()
+
+    @staticmethod
+    def _finish(job_id: str, status: str, result: Optional[Dict] = None, error: Optional[str] = None):
+        with RoundJobService._lock:
+            job = RoundJobService._jobs[job_id]
+            job["status"] = status
+            job["result"] = result
+            job["error"] = error
+            job["finished_at"] = datetime.utcnow().isoformat()
+
+    @staticmethod
+    def _get_executor(app) -> ThreadPoolExecutor:
+        with RoundJobService._lock:
+            if RoundJobService._executor is None:
+                RoundJobService._executor = ThreadPoolExecutor(
+                    max_workers=app.config.get('ROUND_ADVANCE_WORKERS', 2),
+                    thread_name_prefix="round-advance"
+                )
+            return RoundJobService._executor
+
+    @staticmethod
+    def _trim():
+        """Drop the oldest finished jobs beyond MAX_FINISHED_JOBS (caller holds the lock)"""
+        finished = [
+            job_id for job_id, job in RoundJobService._jobs.items()
+            if job["status"] in ('succeeded', 'failed')
+        ]
+        for job_id in finished[:max(0, len(finished) - RoundJobService.MAX_FINISHED_JOBS)]:
+            job = RoundJobService._jobs.pop(job_id)
+            key = (job["game_id"], job["round_number"])
+            if RoundJobService._by_round.get(key) == job_id:
+                del RoundJobService._by_round[key]
+
+
+# Export
+__all__ = ['RoundJobService', 'RoundJobQueueFullError']
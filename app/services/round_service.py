@@ -3,35 +3,70 @@ Round service
 Handles round progression, customer flow generation, and settlement
 """
 import random
-from typing import Dict
-from decimal import Decimal
+import time
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+from sqlalchemy import func, update
 from app.core.database import db
-from app.models.game import Game, CustomerFlow
+from app.core.logger import StageTimer, get_logger
+from app.models.game import Game, RoundSummary
 from app.models.player import Player, Employee
 from app.models.product import RoundProduction, PlayerProduct
 from app.services.calculation_engine import CustomerFlowAllocator
+from app.services.ledger_service import LedgerService
+from app.services.settlement_service import SettlementService
+from app.utils.customer_flow_table import CustomerFlowTable
+from app.utils.etag import payload_etag
+from app.utils.game_cache import GameScopedCache
 from app.utils.game_constants import GameConstants
 
+logger = get_logger("round_service")
+
 
 class RoundService:
     """Round management service"""
 
+    # Results of settled rounds, (game_id, round_number) -> advance_round result.
+    # Settled rounds never change, so game state changes do not invalidate them.
+    _settled = GameScopedCache(invalidate_on_change=False)
+
+    # How long a request that lost the claim waits for the winner to commit
+    SETTLE_WAIT_SECONDS = 30
+    SETTLE_POLL_INTERVAL = 0.05
+
     @staticmethod
-    def advance_round(game_id: int) -> Dict:
+    def advance_round(game_id: int, expected_round: Optional[int] = None) -> Dict:
         """
         Advance to next round
 
         Process:
         1. Verify game is in progress
         2. Check all players submitted production plans
-        3. Generate customer flow
-        4. Allocate customers to products (call CustomerFlowAllocator)
-        5. Calculate revenue for each player
-        6. Advance to next round
-        7. Check if game is finished
+        3. Look up customer flow (in-process table, no database read)
+        4. Claim the round (games.status -> 'settling')
+        5. Allocate customers to products (precomputed by SettlementService when available)
+        6. Save sales and calculate revenue for each player
+        7. Generate finance records for the settled round
+        8. Snapshot the round summary
+        9. Build the final report when the game is finished
+        10. Advance to next round, release the claim and commit
+
+        Emits one "round_settled" log record with per-stage durations and SQL counts.
+
+        The round is claimed first with a compare-and-swap that moves games.status
+        from 'in_progress' to 'settling', committed on its own so no row lock is
+        held during settlement. All settlement steps then run as one unit of work
+        that also moves current_round on and releases the claim; any failure rolls
+        it back and returns the game to 'in_progress'.
+
+        A request that loses the claim, or finds the round already settling, writes
+        nothing and does not allocate: it waits for the winner to commit and returns
+        the committed result. The result is published in-process only after commit.
 
         Args:
             game_id: Game ID
+            expected_round: The round the caller wants to settle. If the game has
+                already moved past it, the stored result of that round is returned.
 
         Returns:
             {
@@ -46,105 +81,168 @@ class RoundService:
         Raises:
             ValueError: Various validation errors
         """
+        from app.services.finance_service import FinanceService
+
         game = Game.query.get(game_id)
         if not game:
             raise ValueError(f"Game {game_id} not found")
 
-        if game.status != 'in_progress':
-            raise ValueError(f"Game is not in progress (current status: {game.status})")
-
         current_round = game.current_round
-        print(f"[RoundService] Starting advance_round for Game {game_id}, Round {current_round}")
+        if expected_round is not None and current_round != expected_round:
+            if current_round > expected_round:
+                # Duplicate of an advance that already committed
+                return RoundService._get_settled_result(game_id, expected_round)
+            raise ValueError(f"Round {expected_round} has not started yet (current round: {current_round})")
 
-        # 1. Check if all active players submitted production plans
-        print(f"[RoundService] Step 1: Verifying submissions")
-        RoundService._verify_all_players_submitted(game_id, current_round)
+        # Another request in this process already settled this round
+        settled = RoundService._settled.get(game_id, current_round)
+        if settled is not None:
+            return settled
 
-        # 2. Generate customer flow for current round
-        print(f"[RoundService] Step 2: Generating customer flow")
-        customer_flow = RoundService.generate_customer_flow(game_id, current_round)
+        if game.status == 'settling':
+            return RoundService._wait_for_settlement(game_id, current_round)
 
-        # 3. Allocate customers to products
-        print(f"[RoundService] Step 3: Allocating customer flow")
-        allocation_result = CustomerFlowAllocator.allocate(game_id, current_round)
-        print(f"[RoundService] Allocation result keys: {list(allocation_result.keys())}")
+        if game.status != 'in_progress':
+            raise ValueError(f"Game is not in progress (current status: {game.status})")
 
-        # 4. Update player revenue (already done in CustomerFlowAllocator._save_sales)
-        print(f"[RoundService] Step 4: Updating player revenue")
-        RoundService._update_player_revenue(game_id, current_round)
+        timer = StageTimer(logger, "round_settled", game_id=game_id, round_number=current_round)
+
+        try:
+            # 1. Check if all active players submitted production plans
+            with timer.stage("verify"):
+                RoundService._verify_all_players_submitted(game_id, current_round)
+
+            # 2. Generate customer flow for current round
+            with timer.stage("flow"):
+                customer_flow = CustomerFlowTable.get(game, current_round)
+
+            # 3. Claim the round (compare-and-swap, committed at once so the row is not kept locked)
+            with timer.stage("claim"):
+                claimed = db.session.execute(
+                    update(Game)
+                    .where(Game.id == game_id, Game.current_round == current_round, Game.status == 'in_progress')
+                    .values(status='settling')
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        if not claimed:
+            logger.info("round_already_claimed", extra={"fields": {
+                "game_id": game_id, "round_number": current_round
+            }})
+            return RoundService._wait_for_settlement(game_id, current_round)
 
-        # 5. Advance to next round
-        print(f"[RoundService] Step 5: Advancing game round")
         previous_round = current_round
-        game.current_round += 1
-
-        # 6. Check if game is finished
-        game_finished = False
-        if game.current_round > GameConstants.TOTAL_ROUNDS:
-            game.status = 'finished'
-            game_finished = True
-
-        db.session.commit()
+        next_round = current_round + 1
+        values = {"current_round": next_round, "status": 'in_progress'}
+
+        # Check if game is finished
+        game_finished = next_round > GameConstants.TOTAL_ROUNDS
+        if game_finished:
+            values["status"] = 'finished'
+            values["finished_at"] = datetime.utcnow()
+
+        try:
+            # 4. Allocate customers to products
+            # Usually precomputed when the last player submitted (SettlementService.schedule)
+            with timer.stage("allocate"):
+                allocation_result = SettlementService.get_allocation(game_id, current_round)
+
+            # 5. Persist sales and update player revenue
+            with timer.stage("revenue"):
+                if allocation_result["sales_details"]:
+                    CustomerFlowAllocator._save_sales(allocation_result["sales_details"], commit=False)
+                RoundService._update_player_revenue(game_id, current_round, allocation_result["sales_details"])
+
+            # 6. Generate finance records for the settled round
+            with timer.stage("finance"):
+                FinanceService.generate_finance_records_for_game(game_id, current_round, commit=False)
+
+            # 7. Snapshot the round summary (results never change after settlement)
+            with timer.stage("summary"):
+                RoundService.snapshot_round_summary(game_id, current_round)
+
+            # 8. Build the final report once the last round is settled
+            if game_finished:
+                with timer.stage("report"):
+                    FinanceService.build_final_report(game_id)
+
+            # 9. Advance to next round and release the claim in the same commit
+            with timer.stage("commit"):
+                db.session.execute(
+                    update(Game)
+                    .where(Game.id == game_id, Game.status == 'settling')
+                    .values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            RoundService._release_claim(game_id, current_round)
+            raise
 
-        return {
+        result = {
             "success": True,
             "previous_round": previous_round,
-            "current_round": game.current_round,
-            "customer_flow": customer_flow.to_dict(),
+            "current_round": next_round,
+            "customer_flow": customer_flow,
             "allocation_result": allocation_result,
             "game_finished": game_finished
         }
+        # Published only once committed, so nobody is told about a settlement that rolled back
+        RoundService._settled.set(game_id, current_round, result)
+
+        # Sales and cash changed: drop cached settlement inputs for this game
+        GameScopedCache.invalidate_game(game_id)
+
+        timer.emit(
+            products=len(allocation_result["sales_details"]),
+            total_revenue=allocation_result["total_revenue"],
+            game_finished=game_finished
+        )
+
+        return result
 
     @staticmethod
-    def generate_customer_flow(game_id: int, round_number: int) -> CustomerFlow:
+    def get_customer_flow(game_id: int, round_number: int) -> Dict:
         """
-        Generate customer flow for a round using fixed script
+        Get customer flow for a round
 
-        Uses fixed script from GameConstants.CUSTOMER_FLOW_SCRIPT
-        Rounds 1-10 have predefined customer numbers
+        Numbers come from the in-process CustomerFlowTable (fixed script per scenario,
+        plus per-game overrides in Game.settings); no customer_flows query is made.
 
         Args:
             game_id: Game ID
             round_number: Round number
 
         Returns:
-            CustomerFlow object
-        """
-        # Check if already exists
-        existing = CustomerFlow.query.filter_by(
-            game_id=game_id,
-            round_number=round_number
-        ).first()
-
-        if existing:
-            return existing
-
-        # Use fixed customer flow script
-        if round_number in GameConstants.CUSTOMER_FLOW_SCRIPT:
-            flow_data = GameConstants.CUSTOMER_FLOW_SCRIPT[round_number]
-            high_tier = flow_data["high"]
-            low_tier = flow_data["low"]
-        else:
-            # Fallback for invalid round numbers
-            raise ValueError(f"Invalid round number: {round_number}. Must be 1-10.")
-
-        customer_flow = CustomerFlow(
-            game_id=game_id,
-            round_number=round_number,
-            high_tier_customers=high_tier,
-            low_tier_customers=low_tier
-        )
+            {
+                "game_id": 1,
+                "round_number": 1,
+                "high_tier_customers": 40,
+                "low_tier_customers": 300
+            }
 
-        db.session.add(customer_flow)
-        db.session.commit()
+        Raises:
+            ValueError: Game not found or invalid round number
+        """
+        game = Game.query.get(game_id)
+        if not game:
+            raise ValueError(f"Game {game_id} not found")
 
-        return customer_flow
+        return CustomerFlowTable.get(game, round_number)
 
     @staticmethod
     def get_round_summary(game_id: int, round_number: int) -> Dict:
         """
         Get summary of a specific round
 
+        Settled rounds are served from their RoundSummary snapshot; other rounds
+        are built live.
+
         Args:
             game_id: Game ID
             round_number: Round number
@@ -165,116 +263,271 @@ class RoundService:
                 ]
             }
         """
-        # Get customer flow
-        customer_flow = CustomerFlow.query.filter_by(
+        summary, _ = RoundService.get_round_summary_with_etag(game_id, round_number)
+        return summary
+
+    @staticmethod
+    def get_round_summary_with_etag(game_id: int, round_number: int) -> Tuple[Dict, str]:
+        """
+        Get round summary together with its strong ETag
+
+        A settled round is a single read of its snapshot row. Rounds without a
+        snapshot (not settled yet, or settled before snapshots existed) are built
+        live and not stored.
+
+        Returns:
+            (summary, etag)
+        """
+        snapshot = RoundSummary.query.filter_by(game_id=game_id, round_number=round_number).first()
+        if snapshot:
+            return snapshot.payload, snapshot.etag
+
+        summary = RoundService._build_round_summary(game_id, round_number)
+        return summary, payload_etag(summary)
+
+    @staticmethod
+    def snapshot_round_summary(game_id: int, round_number: int) -> RoundSummary:
+        """
+        Serialize the round summary into its snapshot row
+
+        Called by advance_round inside the settlement transaction (does not commit).
+        """
+        summary = RoundService._build_round_summary(game_id, round_number)
+        snapshot = RoundSummary(
             game_id=game_id,
-            round_number=round_number
-        ).first()
+            round_number=round_number,
+            payload=summary,
+            etag=payload_etag(summary)
+        )
+        db.session.add(snapshot)
+        db.session.flush()
+        return snapshot
 
-        if not customer_flow:
-            raise ValueError(f"No customer flow data for round {round_number}")
+    @staticmethod
+    def _build_round_summary(game_id: int, round_number: int) -> Dict:
+        """Build the round summary with a fixed number of queries (players, productions, finance records)"""
+        from app.models.finance import FinanceRecord
+        from app.models.product import ProductRecipe
+
+        # Get customer flow
+        customer_flow = RoundService.get_customer_flow(game_id, round_number)
 
         # Get all active players
-        players = Player.query.filter_by(game_id=game_id, is_active=True).all()
+        players = Player.query.filter_by(game_id=game_id, is_active=True).order_by(Player.id).all()
+        player_ids = [player.id for player in players]
+
+        # Productions of all players with product names
+        productions = {player_id: [] for player_id in player_ids}
+        production_rows = db.session.query(
+            RoundProduction.player_id,
+            RoundProduction.product_id,
+            RoundProduction.produced_quantity,
+            RoundProduction.sold_quantity,
+            RoundProduction.sold_to_high_tier,
+            RoundProduction.sold_to_low_tier,
+            RoundProduction.price,
+            RoundProduction.revenue,
+            ProductRecipe.name
+        ).outerjoin(
+            PlayerProduct, PlayerProduct.id == RoundProduction.product_id
+        ).outerjoin(
+            ProductRecipe, ProductRecipe.id == PlayerProduct.recipe_id
+        ).filter(
+            RoundProduction.player_id.in_(player_ids),
+            RoundProduction.round_number == round_number
+        ).order_by(RoundProduction.id).all() if player_ids else []
+
+        for (player_id, product_id, produced, sold, sold_high, sold_low,
+             price, revenue, product_name) in production_rows:
+            productions[player_id].append({
+                "product_id": product_id,
+                "product_name": product_name if product_name else product_id,
+                "produced": produced,
+                "sold": sold,
+                "sold_to_high": sold_high,
+                "sold_to_low": sold_low,
+                "price": float(price),
+                "revenue": float(revenue)
+            })
+
+        # Round profit from finance records
+        round_profits = dict(db.session.query(
+            FinanceRecord.player_id, FinanceRecord.round_profit
+        ).filter(
+            FinanceRecord.player_id.in_(player_ids),
+            FinanceRecord.round_number == round_number
+        ).all()) if player_ids else {}
 
         player_summaries = []
         for player in players:
-            # Get player's productions for this round
-            productions = RoundProduction.query.filter_by(
-                player_id=player.id,
-                round_number=round_number
-            ).all()
-
-            total_revenue = sum(float(p.revenue) for p in productions)
-            total_sold = sum(p.sold_quantity for p in productions)
-
-            # Get round profit from finance record
-            from app.models.finance import FinanceRecord
-            finance_record = FinanceRecord.query.filter_by(
-                player_id=player.id,
-                round_number=round_number
-            ).first()
-
-            round_profit = float(finance_record.round_profit) if finance_record else 0.0
-
-            production_details = []
-            for prod in productions:
-                player_product = PlayerProduct.query.get(prod.product_id)
-                production_details.append({
-                    "product_id": prod.product_id,
-                    "product_name": player_product.recipe.name if player_product and player_product.recipe else prod.product_id,
-                    "produced": prod.produced_quantity,
-                    "sold": prod.sold_quantity,
-                    "sold_to_high": prod.sold_to_high_tier,
-                    "sold_to_low": prod.sold_to_low_tier,
-                    "price": float(prod.price),
-                    "revenue": float(prod.revenue)
-                })
+            production_details = productions[player.id]
+            round_profit = round_profits.get(player.id)
 
             player_summaries.append({
                 "player_id": player.id,
                 "nickname": player.nickname,
                 "productions": production_details,
-                "total_revenue": total_revenue,
-                "total_sold": total_sold,
-                "round_profit": round_profit
+                "total_revenue": sum(p["revenue"] for p in production_details),
+                "total_sold": sum(p["sold"] for p in production_details),
+                "round_profit": float(round_profit) if round_profit is not None else 0.0
             })
 
         return {
             "round_number": round_number,
-            "customer_flow": customer_flow.to_dict(),
+            "customer_flow": customer_flow,
             "players": player_summaries
         }
 
+    @staticmethod
+    def _release_claim(game_id: int, round_number: int):
+        """Return a game whose settlement failed from 'settling' to 'in_progress'"""
+        try:
+            db.session.execute(
+                update(Game)
+                .where(Game.id == game_id, Game.current_round == round_number, Game.status == 'settling')
+                .values(status='in_progress')
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            logger.exception("round_claim_release_failed", extra={"fields": {
+                "game_id": game_id, "round_number": round_number
+            }})
+
+    @staticmethod
+    def _wait_for_settlement(game_id: int, round_number: int) -> Dict:
+        """
+        Wait for the request that claimed the round to commit, then return its result
+
+        Polls the committed game state; writes nothing.
+
+        Raises:
+            ValueError: The settlement failed and was released, or did not finish in time
+        """
+        deadline = time.monotonic() + RoundService.SETTLE_WAIT_SECONDS
+        while True:
+            settled = RoundService._settled.get(game_id, round_number)
+            if settled is not None:
+                return settled
+
+            # End the current transaction so the next read sees the latest commit
+            db.session.rollback()
+            game = Game.query.get(game_id)
+            if game.current_round > round_number:
+                return RoundService._get_settled_result(game_id, round_number)
+            if game.status != 'settling':
+                raise ValueError(f"Settlement of round {round_number} failed; advance the round again")
+            if time.monotonic() >= deadline:
+                raise ValueError(f"Round {round_number} is still being settled; retry later")
+            time.sleep(RoundService.SETTLE_POLL_INTERVAL)
+
+    @staticmethod
+    def _get_settled_result(game_id: int, round_number: int) -> Dict:
+        """
+        Result of an already settled round
+
+        Served from the in-process cache when the winning advance ran in this
+        process, otherwise rebuilt from the persisted sales.
+        """
+        cached = RoundService._settled.get(game_id, round_number)
+        if cached is not None:
+            return cached
+
+        game = Game.query.get(game_id)
+        customer_flow = CustomerFlowTable.get(game, round_number)
+
+        rows = db.session.query(RoundProduction, Player.nickname).join(
+            Player, Player.id == RoundProduction.player_id
+        ).filter(
+            Player.game_id == game_id,
+            Player.is_active == True,
+            RoundProduction.round_number == round_number
+        ).order_by(Player.id, RoundProduction.id).all()
+
+        sales_details = [
+            {
+                "production_id": prod.id,
+                "player_product_id": prod.product_id,
+                "player_id": prod.player_id,
+                "player_name": nickname,
+                "price": float(prod.price),
+                "available": prod.produced_quantity - prod.sold_quantity,
+                "sold_high": prod.sold_to_high_tier,
+                "sold_low": prod.sold_to_low_tier
+            }
+            for prod, nickname in rows
+        ]
+
+        return {
+            "success": True,
+            "previous_round": round_number,
+            "current_round": game.current_round,
+            "customer_flow": customer_flow,
+            "allocation_result": {
+                "high_tier_served": sum(p["sold_high"] for p in sales_details),
+                "low_tier_served": sum(p["sold_low"] for p in sales_details),
+                "total_revenue": sum(float(prod.revenue or 0) for prod, _ in rows),
+                "sales_details": sales_details
+            },
+            "game_finished": game.status == 'finished'
+        }
+
     @staticmethod
     def _verify_all_players_submitted(game_id: int, round_number: int):
         """
         Verify all active players submitted production plans
 
+        Reads the round_submissions tracker in a single query.
+
         Raises:
             ValueError: If any player hasn't submitted
         """
-        players = Player.query.filter_by(game_id=game_id, is_active=True).all()
+        from app.services.production_service import ProductionService
 
-        for player in players:
-            productions = RoundProduction.query.filter_by(
-                player_id=player.id,
-                round_number=round_number
-            ).all()
+        status = ProductionService.get_submission_status(game_id, round_number)
 
-            if not productions:
+        for player in status["players"]:
+            if not player["submitted"]:
                 raise ValueError(
-                    f"Player {player.nickname} (ID: {player.id}) has not submitted production plan for round {round_number}"
+                    f"Player {player['nickname']} (ID: {player['player_id']}) has not submitted production plan for round {round_number}"
                 )
 
     @staticmethod
-    def _update_player_revenue(game_id: int, round_number: int):
+    def _update_player_revenue(game_id: int, round_number: int, sales_details: List[Dict]):
         """
         Update player cash with revenue from sales
 
+        Revenue is taken from the allocation's sales_details (the rows _save_sales
+        just wrote) and the ledger entries go in one bulk insert, so the statement
+        count does not depend on the number of players.
+        Does not commit; runs inside the advance_round transaction.
+
         Args:
             game_id: Game ID
             round_number: Round number
+            sales_details: allocation_result["sales_details"]
         """
+        revenue_by_player = {}
+        for product in sales_details:
+            # Same rounding as round_productions.revenue (DECIMAL(10, 2))
+            revenue = round((product['sold_high'] + product['sold_low']) * product['price'], 2)
+            revenue_by_player[product['player_id']] = revenue_by_player.get(product['player_id'], 0) + revenue
+
         players = Player.query.filter_by(game_id=game_id, is_active=True).all()
 
+        movements = []
         for player in players:
-            # Get all productions for this round
-            productions = RoundProduction.query.filter_by(
-                player_id=player.id,
-                round_number=round_number
-            ).all()
+            total_revenue = round(revenue_by_player.get(player.id, 0), 2)
 
-            # Calculate total revenue
-            total_revenue = sum(float(p.revenue or 0) for p in productions)
-            
-            print(f"[RoundService] Player {player.id} Revenue: {total_revenue}, Current Cash: {player.cash}")
+            logger.debug("player_revenue", extra={"fields": {
+                "player_id": player.id, "revenue": total_revenue, "cash": player.cash
+            }})
 
-            # Update player cash
-            # FIX: Convert float to Decimal to avoid TypeError
-            player.cash += Decimal(str(total_revenue))
+            if total_revenue:
+                movements.append((player, total_revenue))
 
-        db.session.commit()
+        LedgerService.record_many(movements, round_number, 'revenue')
 
     @staticmethod
     def calculate_round_expenses(player_id: int, round_number: int) -> Dict[str, float]:
@@ -305,65 +558,94 @@ class RoundService:
                 "product_research": 0.0,
                 "total": 0.0
             }
-        """
-        from app.models.finance import MarketAction, ResearchLog
 
-        player = Player.query.get(player_id)
-        if not player:
+        Raises:
+            ValueError: If player not found
+        """
+        expenses = RoundService._aggregate_round_expenses(round_number, Player.id == player_id)
+        if player_id not in expenses:
             raise ValueError(f"Player {player_id} not found")
 
+        return expenses[player_id]
+
+    @staticmethod
+    def calculate_round_expenses_for_game(game_id: int, round_number: int) -> Dict[int, Dict[str, float]]:
+        """
+        Calculate round expenses for every active player in a game
+
+        Args:
+            game_id: Game ID
+            round_number: Round number
+
+        Returns:
+            {player_id: {same structure as calculate_round_expenses}}
+        """
+        return RoundService._aggregate_round_expenses(
+            round_number, Player.game_id == game_id, Player.is_active == True
+        )
+
+    @staticmethod
+    def _aggregate_round_expenses(round_number: int, *player_filters) -> Dict[int, Dict[str, float]]:
+        """
+        Round expenses for the players matching player_filters
+
+        Three SUM/GROUP BY queries (rent, salary, cash ledger), whatever the number
+        of players. Spending recorded in the ledger (materials, decoration,
+        advertisement, market and product research) maps 1:1 onto expense keys.
+
+        Args:
+            round_number: Round number
+            player_filters: SQLAlchemy criteria on Player (e.g. Player.id == 1)
+
+        Returns:
+            {player_id: {same structure as calculate_round_expenses}}
+        """
+        from app.models.player import Shop
+
+        # 1. Rent (players without a shop pay nothing)
+        rent_rows = db.session.query(Player.id, Shop.rent).outerjoin(
+            Shop, Shop.player_id == Player.id
+        ).filter(*player_filters).all()
+
         expenses = {
-            "rent": 0.0,
-            "salary": 0.0,
-            "material": 0.0,
-            "decoration": 0.0,
-            "market_research": 0.0,
-            "advertisement": 0.0,
-            "product_research": 0.0
+            player_id: {
+                "rent": float(rent) if rent else 0.0,
+                "salary": 0.0,
+                "material": 0.0,
+                "decoration": 0.0,
+                "market_research": 0.0,
+                "advertisement": 0.0,
+                "product_research": 0.0
+            }
+            for player_id, rent in rent_rows
         }
-
-        # 1. Rent expense
-        if player.shop:
-            expenses["rent"] = float(player.shop.rent) if player.shop.rent else 0.0
-
-        # 2. Salary expense
-        if player.shop:
-            employees = Employee.query.filter_by(
-                shop_id=player.shop.id,
-                is_active=True
-            ).all()
-            expenses["salary"] = sum(float(emp.salary) for emp in employees)
-
-        # 3. Material expense (already deducted during production submission)
-        # We need to track this separately
-        # For now, this will be 0 as material costs are deducted immediately
-        expenses["material"] = 0.0
-
-        # 4. Market actions (advertisement, market research)
-        market_actions = MarketAction.query.filter_by(
-            player_id=player_id,
-            round_number=round_number
-        ).all()
-
-        for action in market_actions:
-            if action.action_type == 'ad':
-                expenses["advertisement"] += float(action.cost)
-            elif action.action_type == 'research':
-                expenses["market_research"] += float(action.cost)
-
-        # 5. Product research
-        research_logs = ResearchLog.query.filter_by(
-            player_id=player_id,
-            round_number=round_number
-        ).all()
-
-        expenses["product_research"] = sum(float(r.cost) for r in research_logs)
+        if not expenses:
+            return expenses
+
+        # 2. Salary of active employees
+        salary_rows = db.session.query(Shop.player_id, func.sum(Employee.salary)).join(
+            Employee, Employee.shop_id == Shop.id
+        ).join(
+            Player, Player.id == Shop.player_id
+        ).filter(
+            *player_filters,
+            Employee.is_active == True
+        ).group_by(Shop.player_id).all()
+
+        for player_id, salary in salary_rows:
+            expenses[player_id]["salary"] = float(salary or 0)
+
+        # 3. Cash spent this round, from the ledger (amounts are negative)
+        for player_id, totals in LedgerService.round_totals(round_number, *player_filters).items():
+            for entry_type in LedgerService.EXPENSE_TYPES:
+                if entry_type in totals:
+                    expenses[player_id][entry_type] = -totals[entry_type]
 
         # Calculate total
-        expenses["total"] = sum(expenses.values())
+        for player_expenses in expenses.values():
+            player_expenses["total"] = sum(player_expenses.values())
 
         return expenses
 
-
 # Export
 __all__ = ['RoundService']
@@ -7,6 +7,7 @@ from datetime import datetime, timedelta
 from app.core.database import db
 from app.models.player import Player
 from app.models.game import Game
+from app.utils.game_cache import GameScopedCache
 
 
 def _cleanup_once(inactive_seconds: int = 300):
@@ -26,6 +27,10 @@ def _cleanup_once(inactive_seconds: int = 300):
 
     db.session.commit()
 
+    # 玩家离开后解锁人数变化
+    for game_id in affected_game_ids:
+        GameScopedCache.invalidate_game(game_id)
+
     # 删除已空房间
     for game_id in affected_game_ids:
         if Player.query.filter_by(game_id=game_id).count() == 0:
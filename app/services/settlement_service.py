@@ -0,0 +1,127 @@
+"""
+Settlement service
+Precomputes round allocation in the background once every player has submitted
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict
+from flask import current_app
+from app.core.database import db
+from app.core.logger import get_logger
+from app.models.game import Game
+from app.services.calculation_engine import CustomerFlowAllocator
+from app.utils.game_cache import GameScopedCache
+
+logger = get_logger("settlement_service")
+
+
+class SettlementService:
+    """
+    Eager settlement
+
+    The last production submission of a round schedules the allocation on a
+    background executor. advance_round then picks up the computed outcome and
+    only has to persist it. Results are cached per game-round and dropped by
+    GameScopedCache.invalidate_game whenever settlement inputs change, so a
+    late resubmission can never be settled with stale numbers.
+    """
+
+    _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="eager-settlement")
+    _results = GameScopedCache()
+    _pending = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def schedule(game_id: int, round_number: int):
+        """
+        Schedule background allocation for a game-round (no-op if already running)
+
+        Args:
+            game_id: Game ID
+            round_number: Round number
+        """
+        app = current_app._get_current_object()
+
+        # Tests run on an in-memory database: compute inline instead of on a worker thread
+        if app.config.get('TESTING'):
+            SettlementService.compute(game_id, round_number)
+            return
+
+        key = (game_id, round_number)
+        with SettlementService._lock:
+            running = SettlementService._pending.get(key)
+            if running is not None and not running.done():
+                return
+
+            future = SettlementService._executor.submit(
+                SettlementService._run_in_background, app, game_id, round_number
+            )
+            SettlementService._pending[key] = future
+
+        future.add_done_callback(lambda f: SettlementService._forget(key, f))
+
+    @staticmethod
+    def compute(game_id: int, round_number: int) -> Dict:
+        """
+        Get the allocation result for a game-round, computing it if not cached
+
+        Returns:
+            Same structure as CustomerFlowAllocator.allocate_products
+        """
+        return SettlementService._results.get_or_compute(
+            game_id,
+            round_number,
+            lambda: SettlementService._allocate(game_id, round_number)
+        )
+
+    @staticmethod
+    def get_allocation(game_id: int, round_number: int) -> Dict:
+        """
+        Allocation result for settlement
+
+        Waits for a background computation that is still running, then returns the
+        cached outcome. If inputs changed meanwhile the cache was invalidated and the
+        allocation is recomputed here.
+        """
+        with SettlementService._lock:
+            future = SettlementService._pending.get((game_id, round_number))
+
+        if future is not None:
+            wait([future])
+
+        return SettlementService.compute(game_id, round_number)
+
+    @staticmethod
+    def _allocate(game_id: int, round_number: int) -> Dict:
+        inputs = CustomerFlowAllocator.get_cached_inputs(game_id, round_number)
+        game = Game.query.get(game_id)
+
+        return CustomerFlowAllocator.allocate_products(
+            inputs["products"],
+            inputs["high_tier_customers"],
+            inputs["low_tier_customers"],
+            rng=CustomerFlowAllocator.settlement_rng(game, round_number)
+        )
+
+    @staticmethod
+    def _run_in_background(app, game_id: int, round_number: int):
+        with app.app_context():
+            try:
+                SettlementService.compute(game_id, round_number)
+            except Exception:
+                # advance_round will recompute synchronously
+                logger.exception("eager_settlement_failed", extra={"fields": {
+                    "game_id": game_id, "round_number": round_number
+                }})
+            finally:
+                db.session.remove()
+
+    @staticmethod
+    def _forget(key, future):
+        with SettlementService._lock:
+            if SettlementService._pending.get(key) is future:
+                del SettlementService._pending[key]
+
+
+# Export
+__all__ = ['SettlementService']
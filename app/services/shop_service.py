@@ -5,6 +5,7 @@ Handles shop opening, decoration, and management
 from typing import Dict
 from app.core.database import db
 from app.models.player import Player, Shop
+from app.services.ledger_service import LedgerService
 from app.utils.game_constants import GameConstants
 
 
@@ -111,7 +112,7 @@ class ShopService:
             )
 
         # Deduct cost
-        player.cash -= cost
+        LedgerService.record(player, player.game.current_round, 'decoration', -cost)
 
         # Update decoration
         previous_level = current_level
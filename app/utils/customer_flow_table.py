@@ -0,0 +1,134 @@
+"""
+客流量表
+各回合客流来自固定剧本，按剧本（scenario）保存在进程内的只读表中；
+单局的个别回合可在 Game.settings 中覆盖，结算热路径不再查询 customer_flows 表
+"""
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+from app.utils.game_constants import GameConstants
+
+
+def _freeze(script: Dict[int, Dict[str, int]]) -> Mapping[int, Tuple[int, int]]:
+    return MappingProxyType({
+        round_number: (int(flow["high"]), int(flow["low"]))
+        for round_number, flow in script.items()
+    })
+
+
+class CustomerFlowTable:
+    """
+    只读客流表
+
+    Game.settings 中的相关字段：
+        flow_scenario: 剧本名，缺省 "default"
+        customer_flow_overrides: {"3": {"high": 50, "low": 200}, ...}  # JSON 键为字符串
+    """
+
+    DEFAULT_SCENARIO = "default"
+
+    SCENARIOS: Mapping[str, Mapping[int, Tuple[int, int]]] = MappingProxyType({
+        DEFAULT_SCENARIO: _freeze(GameConstants.CUSTOMER_FLOW_SCRIPT)
+    })
+
+    @staticmethod
+    def get(game, round_number: int) -> Dict:
+        """
+        获取一局某回合的客流量（纯内存，不访问数据库）
+
+        Args:
+            game: Game 对象（只读取 id 与 settings）
+            round_number: 回合数
+
+        Returns:
+            {
+                "game_id": 1,
+                "round_number": 1,
+                "high_tier_customers": 40,
+                "low_tier_customers": 300
+            }
+
+        Raises:
+            ValueError: 剧本不存在或回合不在剧本中
+        """
+        high, low = CustomerFlowTable.lookup(game.settings, round_number)
+        return {
+            "game_id": game.id,
+            "round_number": round_number,
+            "high_tier_customers": high,
+            "low_tier_customers": low
+        }
+
+    @staticmethod
+    def lookup(settings: Optional[Dict], round_number: int) -> Tuple[int, int]:
+        """按游戏设置查表，返回 (高购买力客户数, 低购买力客户数)"""
+        settings = settings or {}
+
+        override = (settings.get('customer_flow_overrides') or {}).get(str(round_number))
+        if override is not None:
+            return int(override["high"]), int(override["low"])
+
+        scenario = settings.get('flow_scenario') or CustomerFlowTable.DEFAULT_SCENARIO
+        table = CustomerFlowTable.SCENARIOS.get(scenario)
+        if table is None:
+            raise ValueError(f"客流剧本 {scenario} 不存在")
+
+        flow = table.get(round_number)
+        if flow is None:
+            raise ValueError(f"Invalid round number: {round_number}. Must be 1-{GameConstants.TOTAL_ROUNDS}.")
+        return flow
+
+    @staticmethod
+    def set_overrides(game, overrides: Dict, scenario: Optional[str] = None):
+        """
+        写入单局客流覆盖（不提交，由调用方提交）
+
+        Args:
+            game: Game 对象
+            overrides: {round_number: {"high": 50, "low": 200}, ...}
+            scenario: 可选，切换剧本
+
+        Raises:
+            ValueError: 同 with_overrides
+        """
+        game.settings = CustomerFlowTable.with_overrides(game.settings, overrides, scenario)
+
+    @staticmethod
+    def with_overrides(settings: Optional[Dict], overrides: Dict, scenario: Optional[str] = None) -> Dict:
+        """
+        返回合并了客流覆盖的新设置字典（不修改传入的 settings）
+
+        Raises:
+            ValueError: 剧本不存在、回合越界或客流量不是非负整数
+        """
+        if not isinstance(overrides or {}, dict):
+            raise ValueError("客流覆盖格式应为 {回合: {\"high\": 整数, \"low\": 整数}}")
+
+        settings = dict(settings or {})
+
+        if scenario is not None:
+            if scenario not in CustomerFlowTable.SCENARIOS:
+                raise ValueError(f"客流剧本 {scenario} 不存在")
+            settings['flow_scenario'] = scenario
+
+        merged = dict(settings.get('customer_flow_overrides') or {})
+        for round_number, flow in (overrides or {}).items():
+            try:
+                round_number = int(round_number)
+                high = int(flow["high"])
+                low = int(flow["low"])
+            except (TypeError, ValueError, KeyError):
+                raise ValueError("客流覆盖格式应为 {回合: {\"high\": 整数, \"low\": 整数}}")
+
+            if not 1 <= round_number <= GameConstants.TOTAL_ROUNDS:
+                raise ValueError(f"Invalid round number: {round_number}. Must be 1-{GameConstants.TOTAL_ROUNDS}.")
+            if high < 0 or low < 0:
+                raise ValueError("客流量不能为负数")
+
+            merged[str(round_number)] = {"high": high, "low": low}
+
+        settings['customer_flow_overrides'] = merged
+        return settings
+
+
+# 导出
+__all__ = ['CustomerFlowTable']
@@ -0,0 +1,17 @@
+"""
+ETag 工具
+对可 JSON 序列化的结果计算稳定的强 ETag（键排序、紧凑分隔符后取 SHA-256）
+"""
+import hashlib
+import json
+from typing import Any
+
+
+def payload_etag(payload: Any) -> str:
+    """计算 payload 的 ETag（64 位十六进制，不含引号）"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# 导出
+__all__ = ['payload_etag']
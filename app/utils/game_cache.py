@@ -0,0 +1,113 @@
+"""
+进程内按游戏划分的缓存
+服务以单进程运行（run.py），结算相关的只读数据按 game_id 缓存在进程内，
+由修改这些数据的服务在提交后显式失效
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class GameScopedCache:
+    """
+    按 game_id 分区的线程安全缓存
+
+    - 超过 max_games 个游戏时淘汰最久未使用的游戏
+    - 设置 max_entries_per_game 时，单个游戏内超过该条数淘汰最久未使用的条目
+      （键由客户端输入决定的缓存需要设置，避免同一局内无限增长）
+    - 每个游戏维护一个代数，invalidate 后正在计算中的旧结果不会被写回
+    - invalidate_on_change=False 用于保存不随游戏状态变化的数据（如已结算回合的结果），
+      invalidate_game 不会清除它，只能显式 invalidate / discard
+    """
+
+    _instances = []
+
+    def __init__(self, max_games: int = 256, invalidate_on_change: bool = True,
+                 max_entries_per_game: Optional[int] = None):
+        self._lock = threading.Lock()
+        self._games = OrderedDict()
+        self._generations = {}
+        self._max_games = max_games
+        self._max_entries_per_game = max_entries_per_game
+        self._invalidate_on_change = invalidate_on_change
+        GameScopedCache._instances.append(self)
+
+    def get(self, game_id: int, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entries = self._games.get(game_id)
+            if entries is None or key not in entries:
+                return default
+            self._games.move_to_end(game_id)
+            entries.move_to_end(key)
+            return entries[key]
+
+    def set(self, game_id: int, key: Hashable, value: Any):
+        with self._lock:
+            self._store(game_id, key, value)
+
+    def get_or_compute(self, game_id: int, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """命中直接返回；否则调用 factory 计算（不持锁），计算期间未被失效才写回"""
+        with self._lock:
+            entries = self._games.get(game_id)
+            if entries is not None and key in entries:
+                self._games.move_to_end(game_id)
+                entries.move_to_end(key)
+                return entries[key]
+            generation = self._generations.get(game_id, 0)
+
+        value = factory()
+
+        with self._lock:
+            if self._generations.get(game_id, 0) == generation:
+                self._store(game_id, key, value)
+        return value
+
+    def discard(self, game_id: int, key: Hashable):
+        with self._lock:
+            entries = self._games.get(game_id)
+            if entries is not None:
+                entries.pop(key, None)
+
+    def invalidate(self, game_id: int):
+        with self._lock:
+            self._games.pop(game_id, None)
+            self._generations[game_id] = self._generations.get(game_id, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._games.clear()
+            self._generations.clear()
+
+    @classmethod
+    def invalidate_game(cls, game_id: int):
+        """
+        使某局在所有缓存实例中的数据失效
+
+        结算读取的游戏状态（生产计划、广告、解锁、玩家、销量）提交后调用
+        """
+        for cache in cls._instances:
+            if cache._invalidate_on_change:
+                cache.invalidate(game_id)
+
+    @classmethod
+    def clear_all(cls):
+        """清空所有实例（测试重建数据库时使用）"""
+        for cache in cls._instances:
+            cache.clear()
+
+    def _store(self, game_id: int, key: Hashable, value: Any):
+        entries = self._games.get(game_id)
+        if entries is None:
+            entries = self._games[game_id] = OrderedDict()
+        entries[key] = value
+        entries.move_to_end(key)
+        if self._max_entries_per_game is not None:
+            while len(entries) > self._max_entries_per_game:
+                entries.popitem(last=False)
+        self._games.move_to_end(game_id)
+        while len(self._games) > self._max_games:
+            self._games.popitem(last=False)
+
+
+# 导出
+__all__ = ['GameScopedCache']
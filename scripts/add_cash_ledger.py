@@ -0,0 +1,56 @@
+"""
+创建cash_ledger表（现金流水），并从market_actions/research_logs回填历史支出
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import db
+from app.main import app
+from sqlalchemy import text
+
+if __name__ == '__main__':
+    with app.app_context():
+        try:
+            with db.engine.connect() as conn:
+                conn.execute(text('''
+                    CREATE TABLE IF NOT EXISTS cash_ledger (
+                        id INT AUTO_INCREMENT PRIMARY KEY,
+                        player_id INT NOT NULL,
+                        round_number INT NOT NULL,
+                        entry_type VARCHAR(20) NOT NULL,
+                        amount DECIMAL(10,2) NOT NULL,
+                        balance_after DECIMAL(10,2) NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        INDEX idx_ledger_player_round (player_id, round_number, entry_type),
+                        FOREIGN KEY (player_id) REFERENCES players(id) ON DELETE CASCADE
+                    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+                '''))
+                conn.commit()
+            print("✅ cash_ledger表创建成功！")
+        except Exception as e:
+            print(f"⚠️ 创建表失败: {e}")
+
+        # 回填：广告、市场调研、产品研发在旧表中有记录；原材料与装修此前未记录，无法回填
+        try:
+            with db.engine.connect() as conn:
+                existing = conn.execute(text('SELECT COUNT(*) FROM cash_ledger')).scalar()
+                if existing:
+                    print(f"⚠️ cash_ledger已有 {existing} 条记录，跳过回填")
+                else:
+                    conn.execute(text('''
+                        INSERT INTO cash_ledger (player_id, round_number, entry_type, amount, created_at)
+                        SELECT player_id, round_number,
+                               CASE action_type WHEN 'ad' THEN 'advertisement' ELSE 'market_research' END,
+                               -cost, created_at
+                        FROM market_actions
+                    '''))
+                    conn.execute(text('''
+                        INSERT INTO cash_ledger (player_id, round_number, entry_type, amount, created_at)
+                        SELECT player_id, round_number, 'product_research', -cost, created_at
+                        FROM research_logs
+                    '''))
+                    conn.commit()
+                    print("✅ 历史支出回填完成！")
+        except Exception as e:
+            print(f"⚠️ 回填失败: {e}")
@@ -0,0 +1,32 @@
+"""
+创建final_reports表（终局报告）
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import db
+from app.main import app
+from sqlalchemy import text
+
+if __name__ == '__main__':
+    with app.app_context():
+        try:
+            with db.engine.connect() as conn:
+                conn.execute(text('''
+                    CREATE TABLE IF NOT EXISTS final_reports (
+                        id INT AUTO_INCREMENT PRIMARY KEY,
+                        game_id INT NOT NULL,
+                        payload JSON NOT NULL,
+                        etag VARCHAR(64) NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        UNIQUE KEY uk_final_report_game (game_id),
+                        FOREIGN KEY (game_id) REFERENCES games(id) ON DELETE CASCADE
+                    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+                '''))
+                conn.commit()
+            print("✅ final_reports表创建成功！")
+        except Exception as e:
+            print(f"⚠️ 创建表失败: {e}")
+
+        # 已结束的旧游戏在首次请求终局报告时生成，无需回填
@@ -0,0 +1,45 @@
+"""
+创建round_submissions表（回合提交记录），并从round_productions回填已有提交
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import db
+from app.main import app
+from sqlalchemy import text
+
+if __name__ == '__main__':
+    with app.app_context():
+        try:
+            with db.engine.connect() as conn:
+                conn.execute(text('''
+                    CREATE TABLE IF NOT EXISTS round_submissions (
+                        id INT AUTO_INCREMENT PRIMARY KEY,
+                        game_id INT NOT NULL,
+                        round_number INT NOT NULL,
+                        player_id INT NOT NULL,
+                        submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                        UNIQUE KEY uk_submission_game_round_player (game_id, round_number, player_id),
+                        FOREIGN KEY (game_id) REFERENCES games(id) ON DELETE CASCADE,
+                        FOREIGN KEY (player_id) REFERENCES players(id) ON DELETE CASCADE
+                    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+                '''))
+                conn.commit()
+            print("✅ round_submissions表创建成功！")
+        except Exception as e:
+            print(f"⚠️ 创建表失败: {e}")
+
+        # 回填：有生产计划的玩家回合视为已提交（INSERT IGNORE 可重复执行）
+        try:
+            with db.engine.connect() as conn:
+                result = conn.execute(text('''
+                    INSERT IGNORE INTO round_submissions (game_id, round_number, player_id)
+                    SELECT DISTINCT p.game_id, rp.round_number, rp.player_id
+                    FROM round_productions rp
+                    JOIN players p ON p.id = rp.player_id
+                '''))
+                conn.commit()
+            print(f"✅ 回填 {result.rowcount} 条提交记录！")
+        except Exception as e:
+            print(f"⚠️ 回填失败: {e}")
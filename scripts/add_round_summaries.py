@@ -0,0 +1,33 @@
+"""
+创建round_summaries表（回合摘要快照）
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import db
+from app.main import app
+from sqlalchemy import text
+
+if __name__ == '__main__':
+    with app.app_context():
+        try:
+            with db.engine.connect() as conn:
+                conn.execute(text('''
+                    CREATE TABLE IF NOT EXISTS round_summaries (
+                        id INT AUTO_INCREMENT PRIMARY KEY,
+                        game_id INT NOT NULL,
+                        round_number INT NOT NULL,
+                        payload JSON NOT NULL,
+                        etag VARCHAR(64) NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        UNIQUE KEY uk_summary_game_round (game_id, round_number),
+                        FOREIGN KEY (game_id) REFERENCES games(id) ON DELETE CASCADE
+                    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+                '''))
+                conn.commit()
+            print("✅ round_summaries表创建成功！")
+        except Exception as e:
+            print(f"⚠️ 创建表失败: {e}")
+
+        # 已结算的旧回合没有快照时按需实时计算，无需回填
@@ -13,7 +13,7 @@ DROP TABLE IF EXISTS `games`;
 CREATE TABLE `games` (
     `id` INT AUTO_INCREMENT PRIMARY KEY,
     `room_code` VARCHAR(6) UNIQUE NOT NULL COMMENT '房间号',
-    `status` VARCHAR(20) NOT NULL DEFAULT 'waiting' COMMENT '游戏状态: waiting, playing, finished',
+    `status` VARCHAR(20) NOT NULL DEFAULT 'waiting' COMMENT '游戏状态: waiting, in_progress, settling(回合结算中), finished',
     `current_round` INT DEFAULT 1 COMMENT '当前回合',
     `max_players` INT DEFAULT 4 COMMENT '最大玩家数',
     `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -239,6 +239,66 @@ CREATE TABLE `market_actions` (
     FOREIGN KEY (`player_id`) REFERENCES `players`(`id`) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='市场行动表';
 
+-- ============================================
+-- 13. 回合摘要快照表 (round_summaries)
+-- ============================================
+DROP TABLE IF EXISTS `round_summaries`;
+CREATE TABLE `round_summaries` (
+    `id` INT AUTO_INCREMENT PRIMARY KEY,
+    `game_id` INT NOT NULL COMMENT '游戏ID',
+    `round_number` INT NOT NULL COMMENT '回合数',
+    `payload` JSON NOT NULL COMMENT '回合摘要',
+    `etag` VARCHAR(64) NOT NULL COMMENT 'payload 的 SHA-256',
+    `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY `uk_summary_game_round` (`game_id`, `round_number`),
+    FOREIGN KEY (`game_id`) REFERENCES `games`(`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='回合摘要快照表';
+
+-- ============================================
+-- 14. 终局报告表 (final_reports)
+-- ============================================
+DROP TABLE IF EXISTS `final_reports`;
+CREATE TABLE `final_reports` (
+    `id` INT AUTO_INCREMENT PRIMARY KEY,
+    `game_id` INT NOT NULL COMMENT '游戏ID',
+    `payload` JSON NOT NULL COMMENT '排名、逐回合序列、分产品汇总',
+    `etag` VARCHAR(64) NOT NULL COMMENT 'payload 的 SHA-256',
+    `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY `uk_final_report_game` (`game_id`),
+    FOREIGN KEY (`game_id`) REFERENCES `games`(`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='终局报告表';
+
+-- ============================================
+-- 15. 现金流水表 (cash_ledger)
+-- ============================================
+DROP TABLE IF EXISTS `cash_ledger`;
+CREATE TABLE `cash_ledger` (
+    `id` INT AUTO_INCREMENT PRIMARY KEY,
+    `player_id` INT NOT NULL COMMENT '玩家ID',
+    `round_number` INT NOT NULL COMMENT '回合数',
+    `entry_type` VARCHAR(20) NOT NULL COMMENT 'material/hire/product_research/advertisement/market_research/decoration/revenue',
+    `amount` DECIMAL(10,2) NOT NULL COMMENT '带符号金额，支出为负',
+    `balance_after` DECIMAL(10,2) NULL COMMENT '记账后现金余额（回填的历史记录为NULL）',
+    `created_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX `idx_ledger_player_round` (`player_id`, `round_number`, `entry_type`),
+    FOREIGN KEY (`player_id`) REFERENCES `players`(`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='现金流水表（只追加）';
+
+-- ============================================
+-- 16. 回合提交记录表 (round_submissions)
+-- ============================================
+DROP TABLE IF EXISTS `round_submissions`;
+CREATE TABLE `round_submissions` (
+    `id` INT AUTO_INCREMENT PRIMARY KEY,
+    `game_id` INT NOT NULL COMMENT '游戏ID',
+    `round_number` INT NOT NULL COMMENT '回合数',
+    `player_id` INT NOT NULL COMMENT '玩家ID',
+    `submitted_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY `uk_submission_game_round_player` (`game_id`, `round_number`, `player_id`),
+    FOREIGN KEY (`game_id`) REFERENCES `games`(`id`) ON DELETE CASCADE,
+    FOREIGN KEY (`player_id`) REFERENCES `players`(`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='回合提交记录表';
+
 -- ============================================
 -- 完成
 -- ============================================
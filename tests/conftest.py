@@ -1,10 +1,15 @@
+from contextlib import contextmanager
+
 import pytest
+from sqlalchemy import event
 
 from app.main import create_app
 from app.core.database import db
 from app.models.game import Game
 from app.models.player import Player
 from app.models.product import ProductRecipe, PlayerProduct
+from app.services.round_job_service import RoundJobService
+from app.utils.game_cache import GameScopedCache
 
 
 @pytest.fixture
@@ -17,6 +22,10 @@ def app():
         "TESTING": True,
     })
 
+    # 每个测试都重建数据库，game_id 会重复，进程内缓存需同步清空
+    GameScopedCache.clear_all()
+    RoundJobService.clear()
+
     with app.app_context():
         db.drop_all()
         db.create_all()
@@ -32,6 +41,25 @@ def app_ctx(app):
         yield app
 
 
+@pytest.fixture
+def count_sql(app_ctx):
+    """Context manager factory that collects the SQL statements issued inside the block."""
+    @contextmanager
+    def _count():
+        statements = []
+
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", _record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, "before_cursor_execute", _record)
+
+    return _count
+
+
 @pytest.fixture
 def two_players(app_ctx):
     """Create a game with two active players."""
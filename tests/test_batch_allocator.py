@@ -0,0 +1,53 @@
+import random
+
+from app.services.batch_allocator import BatchCustomerFlowAllocator
+from app.services.calculation_engine import CustomerFlowAllocator
+
+
+def _random_market(rng):
+    """随机市场：口碑/价格取少量离散值以制造大量并列组。"""
+    products = [
+        {
+            "production_id": i,
+            "reputation": rng.choice([0.0, 0.05, 0.2, 3.0, 6.0]),
+            "price": float(rng.choice([10, 15, 20, 25])),
+            "available": rng.randint(0, 40),
+        }
+        for i in range(rng.randint(0, 12))
+    ]
+    return products, rng.randint(0, 200), rng.randint(0, 300)
+
+
+def test_batch_matches_scalar_path_with_same_rng():
+    """同一随机种子下，批量引擎与标量内核逐产品结果一致。"""
+    gen = random.Random(2025)
+    markets = []
+    for seed in range(300):
+        products, high, low = _random_market(gen)
+        markets.append((seed, products, high, low))
+
+    batch = BatchCustomerFlowAllocator.allocate_many([
+        {
+            "products": products,
+            "high_tier_customers": high,
+            "low_tier_customers": low,
+            "rng": random.Random(seed),
+        }
+        for seed, products, high, low in markets
+    ])
+
+    for (seed, products, high, low), result in zip(markets, batch):
+        expected = CustomerFlowAllocator.allocate_products(products, high, low, rng=random.Random(seed))
+        assert result == expected
+
+
+def test_batch_empty_markets():
+    results = BatchCustomerFlowAllocator.allocate_many([
+        {"products": [], "high_tier_customers": 10, "low_tier_customers": 10}
+    ])
+    assert results == [{
+        "high_tier_served": 0,
+        "low_tier_served": 0,
+        "total_revenue": 0.0,
+        "sales_details": []
+    }]
@@ -0,0 +1,78 @@
+import pytest
+
+from app.core.database import db
+from app.models.player import Employee, Shop
+from app.services.batch_plan_evaluator import BatchPlanEvaluator
+from app.services.calculation_engine import DiscountCalculator
+from app.services.production_service import ProductionService
+
+
+@pytest.fixture
+def staffed_player(two_players, make_recipe, unlock_product):
+    """P1 开店、生产力 120，解锁两款产品（第二款定价已锁定在 20 元）。"""
+    _, p1, _ = two_players
+    shop = Shop(player_id=p1.id, location="downtown", rent=500, created_round=1)
+    db.session.add(shop)
+    db.session.flush()
+    db.session.add(Employee(shop_id=shop.id, name="E", salary=100, productivity=120, hired_round=1))
+    milk_tea = unlock_product(p1.id, make_recipe(recipe_json={"milk": 1, "tea": 1}).id)
+    fruit = unlock_product(p1.id, make_recipe(recipe_json={"fruit": 2, "ingredient": 1}).id, price=20)
+    fruit.last_price_change_round = 1
+    db.session.commit()
+    return p1, milk_tea, fruit
+
+
+def test_batch_matches_single_plan_path(app_ctx, staffed_player):
+    """批量结果与逐个方案调用 calculate_material_needs / calculate_material_costs 一致。"""
+    p1, milk_tea, fruit = staffed_player
+    plans = [
+        [],
+        [{"product_id": milk_tea.id, "productivity": 30, "price": 15}],
+        [{"product_id": milk_tea.id, "productivity": 60, "price": 20},
+         {"product_id": fruit.id, "productivity": 40, "price": 20}],
+        [{"product_id": fruit.id, "productivity": 120, "price": 20},
+         {"product_id": fruit.id, "productivity": 0, "price": 20}],
+    ]
+
+    result = BatchPlanEvaluator.evaluate_many(p1.id, 2, plans)
+
+    assert result["total_productivity"] == 120
+    for plan, evaluated in zip(plans, result["results"]):
+        normalized = ProductionService.normalize_productions(plan)
+        needs = ProductionService.calculate_material_needs(normalized)
+        costs = DiscountCalculator.calculate_material_costs(needs)
+        assert evaluated["valid"] is True, evaluated["errors"]
+        assert evaluated["material_needs"] == needs
+        assert evaluated["material_costs"] == costs
+        assert evaluated["remaining_cash"] == pytest.approx(10000 - costs["total_cost"])
+
+
+def test_batch_reports_errors_per_plan(app, staffed_player):
+    """每个方案各自返回校验错误，一个方案出错不影响其他方案。"""
+    p1, milk_tea, fruit = staffed_player
+
+    response = app.test_client().post("/api/v1/production/evaluate-plans", json={
+        "player_id": p1.id,
+        "round_number": 2,
+        "plans": [
+            [{"product_id": milk_tea.id, "productivity": 10, "price": 15}],
+            [{"product_id": milk_tea.id, "productivity": 200, "price": 12}],
+            [{"product_id": fruit.id, "productivity": 10, "price": 25}],
+            [{"price": 15}],
+            "not a plan",
+        ],
+    })
+
+    assert response.status_code == 200
+    results = response.get_json()["data"]["results"]
+    assert [r["valid"] for r in results] == [True, False, False, False, False]
+    assert len(results[1]["errors"]) == 2  # 生产力超限 + 定价不是 5 的倍数
+    assert "锁定" in results[2]["errors"][0]
+    assert results[3]["errors"] == ["缺少 product_id"]
+    assert results[4]["material_costs"] == {"total_cost": 0.0}
+
+    too_many = [[]] * (BatchPlanEvaluator.MAX_PLANS + 1)
+    response = app.test_client().post("/api/v1/production/evaluate-plans", json={
+        "player_id": p1.id, "round_number": 2, "plans": too_many,
+    })
+    assert response.status_code == 400
@@ -1,8 +1,9 @@
 from app.core.database import db
-from app.models.game import Game, CustomerFlow
+from app.models.game import Game
 from app.models.player import Player
 from app.models.product import ProductRecipe, PlayerProduct, RoundProduction
 from app.services.calculation_engine import CustomerFlowAllocator
+from app.utils.customer_flow_table import CustomerFlowTable
 
 
 def test_low_tier_customers_can_buy_with_zero_history(app_ctx):
@@ -55,8 +56,7 @@ def test_low_tier_customers_can_buy_with_zero_history(app_ctx):
     )
     db.session.add_all([prod1, prod2])
 
-    flow = CustomerFlow(game_id=game.id, round_number=1, high_tier_customers=0, low_tier_customers=20)
-    db.session.add(flow)
+    CustomerFlowTable.set_overrides(game, {1: {"high": 0, "low": 20}})
     db.session.commit()
 
     result = CustomerFlowAllocator.allocate(game.id, 1)
@@ -120,8 +120,7 @@ def test_high_then_low_allocation_respects_reputation_and_price(app_ctx, two_pla
     )
     db.session.add_all([prod1, prod2])
 
-    flow = CustomerFlow(game_id=game.id, round_number=1, high_tier_customers=10, low_tier_customers=10)
-    db.session.add(flow)
+    CustomerFlowTable.set_overrides(game, {1: {"high": 10, "low": 10}})
     db.session.commit()
 
     result = CustomerFlowAllocator.allocate(game.id, 1)
@@ -141,3 +140,155 @@ def test_high_then_low_allocation_respects_reputation_and_price(app_ctx, two_pla
     # 库存应被消费完
     assert updated_prod1.sold_quantity == 5
     assert updated_prod2.sold_quantity == 10
+
+
+def test_allocate_products_kernel_without_database():
+    """
+    分配内核只依赖内存记录：不需要数据库会话，且不修改输入。
+    场景：A 口碑高价格高，B 口碑低价格低；高消费4人、低消费10人。
+    预期：高消费先买 A（4杯），低消费先买 B（8杯）再买 A 剩余（2杯）。
+    """
+    products = [
+        {"production_id": 1, "reputation": 3.0, "price": 30.0, "available": 6},
+        {"production_id": 2, "reputation": 0.05, "price": 10.0, "available": 8},
+    ]
+
+    result = CustomerFlowAllocator.allocate_products(products, high_tier_total=4, low_tier_total=10)
+
+    assert result["high_tier_served"] == 4
+    assert result["low_tier_served"] == 10
+    details = {p["production_id"]: p for p in result["sales_details"]}
+    assert (details[1]["sold_high"], details[1]["sold_low"]) == (4, 2)
+    assert (details[2]["sold_high"], details[2]["sold_low"]) == (0, 8)
+    assert result["total_revenue"] == 6 * 30.0 + 8 * 10.0
+
+    # 输入记录保持不变，可重复用于预览/模拟
+    assert products[0]["available"] == 6
+    assert "sold_high" not in products[0]
+
+
+def test_tie_group_water_filling_scales_with_group_size():
+    """
+    同口碑同价格的产品组内注水平分：小库存先卖光，其余按水位平分，余数每个最多+1。
+    大客流（数十万）也只按组大小计算。
+    """
+    products = [
+        {"production_id": 1, "reputation": 1.0, "price": 20.0, "available": 1},
+        {"production_id": 2, "reputation": 1.0, "price": 20.0, "available": 200000},
+        {"production_id": 3, "reputation": 1.0, "price": 20.0, "available": 200000},
+    ]
+
+    result = CustomerFlowAllocator.allocate_products(products, high_tier_total=300001, low_tier_total=0)
+    sold = [p["sold_high"] for p in result["sales_details"]]
+    assert sold == [1, 150000, 150000]
+
+    # 余数：10 人分给 3 个各有 5 杯的产品 -> 3/3/4 的某种排列
+    products = [
+        {"production_id": i, "reputation": 1.0, "price": 20.0, "available": 5}
+        for i in range(3)
+    ]
+    result = CustomerFlowAllocator.allocate_products(products, high_tier_total=10, low_tier_total=0)
+    assert sorted(p["sold_high"] for p in result["sales_details"]) == [3, 3, 4]
+
+
+def test_settlement_rng_is_reproducible_per_game_round(app_ctx, two_players):
+    """结算随机流由游戏种子、game_id、回合数决定：同输入可逐位复算，不同回合互不相同。"""
+    game, _, _ = two_players
+    game.settings = {"rng_seed": 12345}
+    db.session.commit()
+
+    products = [
+        {"production_id": i, "reputation": 1.0, "price": 20.0, "available": 7}
+        for i in range(6)
+    ]
+
+    first = CustomerFlowAllocator.allocate_products(
+        products, 20, 0, rng=CustomerFlowAllocator.settlement_rng(game, 1)
+    )
+    again = CustomerFlowAllocator.allocate_products(
+        products, 20, 0, rng=CustomerFlowAllocator.settlement_rng(game, 1)
+    )
+    assert first == again
+
+    round_1 = CustomerFlowAllocator.settlement_rng(game, 1).random()
+    round_2 = CustomerFlowAllocator.settlement_rng(game, 2).random()
+    assert round_1 != round_2
+
+
+def test_product_loader_uses_constant_number_of_queries(app_ctx, two_players, make_recipe, unlock_product, count_sql):
+    """结算加载器的 SQL 次数与玩家数、产品数无关。"""
+    game, p1, p2 = two_players
+    recipes = [make_recipe(), make_recipe()]
+    for player in (p1, p2):
+        for recipe in recipes:
+            product = unlock_product(player.id, recipe.id, price=20)
+            db.session.add(RoundProduction(
+                player_id=player.id, round_number=1, product_id=product.id,
+                allocated_productivity=5, price=20, produced_quantity=5,
+            ))
+    db.session.commit()
+    game_id = game.id
+
+    with count_sql() as statements:
+        products = CustomerFlowAllocator._get_all_products(game_id, 1)
+
+    assert len(products) == 4
+    assert len(statements) == 3
+    # 两名玩家都解锁了同一配方：圈粉率 5% - 5% 衰减后取下限 5%
+    assert all(p["reputation"] == 0.05 for p in products)
+
+
+def test_save_sales_bulk_updates_and_accumulates_total_sold(app_ctx, two_players, make_recipe, unlock_product, count_sql):
+    """写回为两条批量语句；累计销量在数据库端累加，不覆盖已有值。"""
+    game, p1, p2 = two_players
+    recipe = make_recipe()
+    products = []
+    for player in (p1, p2):
+        player_product = unlock_product(player.id, recipe.id, price=20, total_sold=7)
+        production = RoundProduction(
+            player_id=player.id, round_number=1, product_id=player_product.id,
+            allocated_productivity=5, price=20, produced_quantity=5,
+        )
+        db.session.add(production)
+        db.session.commit()
+        products.append({
+            "production_id": production.id,
+            "player_product_id": player_product.id,
+            "price": 20.0,
+            "sold_high": 2,
+            "sold_low": 1,
+        })
+
+    with count_sql() as statements:
+        total_revenue = CustomerFlowAllocator._save_sales(products)
+
+    assert total_revenue == 2 * 3 * 20.0
+    assert len([s for s in statements if s.startswith("UPDATE")]) == 2
+
+    for product in products:
+        production = RoundProduction.query.get(product["production_id"])
+        assert (production.sold_quantity, production.sold_to_high_tier, production.sold_to_low_tier) == (3, 2, 1)
+        assert float(production.revenue) == 60.0
+        assert PlayerProduct.query.get(product["player_product_id"]).total_sold == 10
+
+
+def test_customer_flow_table_uses_script_and_game_overrides(app_ctx, two_players, count_sql):
+    """客流来自进程内剧本表，单局覆盖写在 Game.settings，加载结算输入不查询 customer_flows。"""
+    import pytest
+
+    game, _, _ = two_players
+
+    assert CustomerFlowTable.get(game, 2)["high_tier_customers"] == 90
+    CustomerFlowTable.set_overrides(game, {"2": {"high": 7, "low": 8}})
+    db.session.commit()
+    game_id = game.id
+
+    with count_sql() as statements:
+        inputs = CustomerFlowAllocator.load_inputs(game_id, 2)
+
+    assert (inputs["high_tier_customers"], inputs["low_tier_customers"]) == (7, 8)
+    assert not any("customer_flows" in s for s in statements)
+    assert CustomerFlowTable.get(game, 3)["low_tier_customers"] == 330
+
+    with pytest.raises(ValueError):
+        CustomerFlowTable.set_overrides(game, {11: {"high": 1, "low": 1}})
@@ -4,6 +4,7 @@ from decimal import Decimal
 from app.core.database import db
 from app.services.market_service import MarketService
 from app.services.product_service import ProductService
+from app.services.ledger_service import LedgerService
 from app.models.finance import MarketAction, ResearchLog
 from app.models.player import Player
 from app.models.product import ProductRecipe, PlayerProduct
@@ -84,3 +85,46 @@ def test_research_fail_still_costs_no_unlock(app_ctx, two_players, make_recipe):
     log = ResearchLog.query.filter_by(player_id=p1.id, recipe_id=recipe.id, round_number=1).first()
     assert log is not None
     assert log.success is False
+
+
+def test_research_success_refreshes_unlock_count_cache(app_ctx, two_players, make_recipe, unlock_product):
+    """研发成功后按局缓存的解锁人数应失效，口碑圈粉率衰减随之更新。"""
+    from app.services.calculation_engine import ReputationCalculator
+
+    game, p1, p2 = two_players
+    recipe = make_recipe(base_fan_rate=20.0, difficulty=3)
+    product = unlock_product(p1.id, recipe.id, price=20, total_sold=100)
+
+    assert ReputationCalculator.get_unlock_counts(game.id) == {recipe.id: 1}
+    assert ReputationCalculator.calculate(product) == pytest.approx(0.20 * 100)
+
+    ProductService.research_product(player_id=p2.id, recipe_id=recipe.id, round_number=1, dice_result=6)
+
+    assert ReputationCalculator.get_unlock_counts(game.id) == {recipe.id: 2}
+    reputations = ReputationCalculator.calculate_many(game.id, [product])
+    assert reputations[product.id] == pytest.approx(0.15 * 100)
+
+
+def test_cash_movements_are_recorded_in_ledger(app, two_players, make_recipe):
+    """每笔现金变动都写入流水，余额连续可追溯，并可通过接口审计。"""
+    _, p1, _ = two_players
+    recipe = make_recipe(difficulty=3)
+    initial_cash = float(p1.cash)
+
+    MarketService.place_advertisement(p1.id, round_number=1, dice_result=3)
+    ProductService.research_product(player_id=p1.id, recipe_id=recipe.id, round_number=1, dice_result=6)
+    MarketService.conduct_market_research(p1.id, round_number=1)
+
+    entries = LedgerService.get_entries(p1.id, round_number=1)
+    assert [e["entry_type"] for e in entries] == ["advertisement", "product_research", "market_research"]
+
+    balance = initial_cash
+    for entry in entries:
+        balance += entry["amount"]
+        assert entry["balance_after"] == balance
+    assert float(Player.query.get(p1.id).cash) == balance
+
+    response = app.test_client().get(f"/api/v1/finance/{p1.id}/ledger?round_number=1")
+    assert response.status_code == 200
+    assert response.get_json()["data"] == entries
+    assert app.test_client().get("/api/v1/finance/999/ledger").status_code == 404
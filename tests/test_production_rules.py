@@ -50,3 +50,255 @@ def test_material_discount_applied():
     # 超过5档，最低5折
     unit_price_300 = DiscountCalculator.calculate_discount_price(quantity=300, base_unit_price=base)
     assert unit_price_300 == pytest.approx(base * 0.5)
+
+
+def _open_staffed_shops(*players, productivity=30):
+    from app.models.player import Shop
+
+    for player in players:
+        shop = Shop(player_id=player.id, location="downtown", rent=500, created_round=1)
+        db.session.add(shop)
+        db.session.flush()
+        db.session.add(Employee(shop_id=shop.id, name="E", salary=100, productivity=productivity, hired_round=1))
+    db.session.commit()
+
+
+def test_submit_sql_count_does_not_grow_with_plan_size(app_ctx, two_players, make_recipe, unlock_product, count_sql):
+    """提交生产计划的 SQL 条数与计划中的产品数无关。"""
+    _, p1, p2 = two_players
+    _open_staffed_shops(p1, p2)
+
+    def _submit_and_count(player, count):
+        products = [unlock_product(player.id, make_recipe().id) for _ in range(count)]
+        plan = [{"product_id": product.id, "price": 20, "productivity": 5} for product in products]
+        db.session.expire_all()
+
+        with count_sql() as statements:
+            result = ProductionService.submit_production_plan(player.id, 1, plan)
+
+        assert result["success"] is True
+        assert result["material_needs"]["tea"] == 5 * count
+        return len(statements)
+
+    assert _submit_and_count(p1, 1) == _submit_and_count(p2, 4)
+
+
+def test_submission_tracker_follows_submits(app, two_players, make_recipe, unlock_product):
+    """提交生产计划同步写入提交记录，推进回合与轮询接口都读取该记录。"""
+    from app.services.round_service import RoundService
+
+    game, p1, p2 = two_players
+    _open_staffed_shops(p1, p2)
+    recipe = make_recipe()
+    products = {player.id: unlock_product(player.id, recipe.id, price=20) for player in (p1, p2)}
+    game_id, p1_id, p2_id = game.id, p1.id, p2.id
+    client = app.test_client()
+
+    def _submit(player_id, productivity=5):
+        return client.post("/api/v1/production/submit", json={
+            "player_id": player_id,
+            "round_number": 1,
+            "productions": [{"product_id": products[player_id].id, "price": 20, "productivity": productivity}],
+        }).get_json()["data"]
+
+    assert _submit(p1_id)["all_players_submitted"] is False
+
+    status = client.get(f"/api/v1/rounds/{game_id}/1/submissions").get_json()["data"]
+    assert (status["submitted_count"], status["total_players"], status["all_submitted"]) == (1, 2, False)
+    assert [p["submitted"] for p in status["players"]] == [True, False]
+
+    with pytest.raises(ValueError, match="P2"):
+        RoundService._verify_all_players_submitted(game_id, 1)
+
+    # 重新提交全零计划视为撤回提交
+    assert _submit(p1_id, productivity=0)["all_players_submitted"] is False
+    assert ProductionService.get_submission_status(game_id, 1)["submitted_count"] == 0
+
+    _submit(p1_id)
+    assert _submit(p2_id)["all_players_submitted"] is True
+    RoundService._verify_all_players_submitted(game_id, 1)
+
+
+def test_discount_tables_match_tier_rule():
+    """预计算档位表与逐档公式一致。"""
+    for material, base in GameConstants.MATERIAL_BASE_PRICES.items():
+        for quantity in (1, 49, 50, 99, 100, 249, 250, 1000):
+            tier = min(quantity // 50, 5)
+            expected = base * (1.0 - tier * 0.1)
+            assert DiscountCalculator.calculate_material_costs({material: quantity})[material]["unit_price"] == round(expected, 2)
+            assert DiscountCalculator.material_cost_curve(material, quantity)[quantity] == round(quantity * expected, 2)
+
+
+def test_material_total_cost_adds_up_rounded_curve_entries(monkeypatch):
+    """总成本等于各原材料取整后的分项之和，与成本曲线逐项相加完全一致（含不足一分的单价）。"""
+    monkeypatch.setattr(DiscountCalculator, "TIER_UNIT_PRICES", {
+        material: tuple(round(base * rate + 0.005, 3) for rate in DiscountCalculator.DISCOUNT_RATES)
+        for material, base in (("tea", 6.113), ("milk", 4.071), ("fruit", 5.337), ("ingredient", 2.019))
+    })
+    materials = sorted(DiscountCalculator.TIER_UNIT_PRICES)
+    curves = {material: DiscountCalculator.material_cost_curve(material, 400) for material in materials}
+
+    for step in range(400):
+        needs = {material: (step * (k + 3) + k) % 401 for k, material in enumerate(materials)}
+        costs = DiscountCalculator.calculate_material_costs(needs)
+        from_curves = round(sum(curves[material][quantity] for material, quantity in needs.items()), 2)
+        from_items = round(sum(costs[material]["total"] for material in materials if material in costs), 2)
+        assert costs["total_cost"] == from_curves == from_items
+
+
+def test_cost_curve_endpoint_matches_material_preview(app, two_players, make_recipe, unlock_product):
+    """成本曲线与逐次 material-preview 的结果一致。"""
+    _, p1, _ = two_players
+    _open_staffed_shops(p1, productivity=120)
+    milk_tea = unlock_product(p1.id, make_recipe(recipe_json={"milk": 1, "tea": 1}).id)
+    fruit = unlock_product(p1.id, make_recipe(recipe_json={"fruit": 2}).id)
+    unlock_product(p1.id, make_recipe().id).is_unlocked = False
+    db.session.commit()
+    client = app.test_client()
+
+    data = client.get(f"/api/v1/production/{p1.id}/cost-curve").get_json()["data"]
+    assert data["max_quantity"] == 120
+    assert [p["product_id"] for p in data["products"]] == [milk_tea.id, fruit.id]
+    assert len(data["material_curves"]["fruit"]) == 241
+
+    for quantity in (0, 1, 25, 50, 120):
+        for product in (milk_tea, fruit):
+            preview = client.post("/api/v1/production/material-preview", json={
+                "productions": [{"product_id": product.id, "productivity": quantity, "price": 20}],
+            }).get_json()["data"]
+            curve = next(p for p in data["products"] if p["product_id"] == product.id)
+            assert curve["costs"][quantity] == pytest.approx(preview["material_costs"]["total_cost"])
+
+    assert client.get(f"/api/v1/production/{p1.id}/cost-curve?max_quantity=5000").status_code == 400
+
+
+def test_resubmission_applies_diff_and_net_material_cost(app_ctx, two_players, make_recipe, unlock_product):
+    """重复提交只改动变化的行，原材料费按差额扣除或退还。"""
+    from app.models.product import RoundProduction
+    from app.services.ledger_service import LedgerService
+
+    _, p1, _ = two_players
+    _open_staffed_shops(p1)
+    tea = unlock_product(p1.id, make_recipe(recipe_json={"milk": 1, "tea": 1}).id)
+    fruit = unlock_product(p1.id, make_recipe(recipe_json={"fruit": 2}).id)
+    player_id = p1.id
+
+    def _submit(*plan):
+        result = ProductionService.submit_production_plan(player_id, 1, [
+            {"product_id": product.id, "productivity": productivity, "price": 20}
+            for product, productivity in plan
+        ])
+        rows = {row.product_id: row.id for row in RoundProduction.query.filter_by(player_id=player_id)}
+        return result, rows
+
+    first, rows = _submit((tea, 10), (fruit, 10))
+    assert first["material_delta"] == first["material_costs"]["total_cost"]
+
+    # 内容不变：不写行、不记流水
+    same, same_rows = _submit((tea, 10), (fruit, 10))
+    assert same["material_delta"] == 0.0
+    assert same_rows == rows
+    assert len(LedgerService.get_entries(player_id)) == 1
+
+    # 减产并删除一个产品：原行原地更新，退还差额
+    smaller, smaller_rows = _submit((tea, 4))
+    assert smaller_rows == {tea.id: rows[tea.id]}
+    assert smaller["material_delta"] == pytest.approx(
+        smaller["material_costs"]["total_cost"] - first["material_costs"]["total_cost"]
+    )
+    assert RoundProduction.query.get(rows[tea.id]).allocated_productivity == 4
+
+    assert float(Player.query.get(player_id).cash) == pytest.approx(10000 - smaller["material_costs"]["total_cost"])
+    assert -float(LedgerService.net_amount(player_id, 1, "material")) == smaller["material_costs"]["total_cost"]
+
+
+def test_material_preview_accepts_string_product_ids(app, two_players, make_recipe, unlock_product):
+    """原始 JSON 中字符串形式的 product_id 与整数等价。"""
+    _, p1, _ = two_players
+    product = unlock_product(p1.id, make_recipe(recipe_json={"milk": 1, "tea": 1}).id)
+    client = app.test_client()
+
+    def _preview(product_id):
+        return client.post("/api/v1/production/material-preview", json={
+            "productions": [{"product_id": product_id, "productivity": 5, "price": 20}],
+        })
+
+    data = _preview(str(product.id)).get_json()["data"]
+    assert data["material_needs"] == {"tea": 5, "milk": 5, "fruit": 0, "ingredient": 0}
+    assert data == _preview(product.id).get_json()["data"]
+    assert _preview("abc").status_code == 400
+
+
+def test_resubmission_of_pre_ledger_plan_is_not_charged_twice(app_ctx, two_players, make_recipe, unlock_product):
+    """账本上线前提交的计划没有流水：按已保存计划补记已付费用，重复提交只结算差额。"""
+    from app.models.product import RoundProduction
+    from app.services.ledger_service import LedgerService
+
+    _, p1, _ = two_players
+    _open_staffed_shops(p1)
+    tea = unlock_product(p1.id, make_recipe(recipe_json={"milk": 1, "tea": 1}).id)
+    legacy_cost = DiscountCalculator.calculate_material_costs({"tea": 10, "milk": 10})["total_cost"]
+    db.session.add(RoundProduction(
+        player_id=p1.id, round_number=1, product_id=tea.id,
+        allocated_productivity=10, price=20, produced_quantity=10,
+    ))
+    p1.cash = Decimal("10000") - Decimal(str(legacy_cost))
+    db.session.commit()
+    player_id = p1.id
+
+    plan = [{"product_id": tea.id, "productivity": 4, "price": 20}]
+    result = ProductionService.submit_production_plan(player_id, 1, plan)
+    new_cost = result["material_costs"]["total_cost"]
+    assert result["material_delta"] == pytest.approx(new_cost - legacy_cost)
+    assert float(Player.query.get(player_id).cash) == pytest.approx(10000 - new_cost)
+    assert -float(LedgerService.net_amount(player_id, 1, "material")) == pytest.approx(new_cost)
+
+    assert ProductionService.submit_production_plan(player_id, 1, plan)["material_delta"] == 0.0
+
+
+def test_mark_submitted_survives_concurrent_insert(app_ctx, two_players, monkeypatch):
+    """并发提交在本请求更新之后抢先插入提交记录：唯一键冲突只回滚保存点，改为更新。"""
+    from sqlalchemy import insert
+    from sqlalchemy.orm import Query
+    from app.models.game import RoundSubmission
+
+    game, p1, _ = two_players
+    game_id, player_id = game.id, p1.id
+    original_update = Query.update
+    calls = []
+
+    def _racing_update(query, values, **kwargs):
+        calls.append(values)
+        if len(calls) == 1:
+            db.session.execute(insert(RoundSubmission).values(
+                game_id=game_id, round_number=1, player_id=player_id
+            ))
+            return 0
+        return original_update(query, values, **kwargs)
+
+    monkeypatch.setattr(Query, "update", _racing_update)
+    ProductionService._mark_submitted(game_id, 1, player_id)
+    db.session.commit()
+
+    assert len(calls) == 2
+    assert RoundSubmission.query.filter_by(game_id=game_id, round_number=1, player_id=player_id).count() == 1
+
+
+def test_submit_internal_error_does_not_leak_traceback(app, two_players, make_recipe, unlock_product, monkeypatch):
+    """提交接口的 500 响应只返回错误信息，堆栈只写入日志。"""
+    _, p1, _ = two_players
+    _open_staffed_shops(p1)
+    product = unlock_product(p1.id, make_recipe().id)
+
+    def _fail(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(ProductionService, "submit_production_plan", _fail)
+    response = app.test_client().post("/api/v1/production/submit", json={
+        "player_id": p1.id,
+        "round_number": 1,
+        "productions": [{"product_id": product.id, "price": 20, "productivity": 5}],
+    })
+
+    assert response.status_code == 500
+    assert response.get_json() == {"success": False, "error": "Internal server error: boom"}
@@ -0,0 +1,470 @@
+import json
+import logging
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.database import db
+from app.core.logger import JsonFormatter
+from app.models.finance import FinalReport, FinanceRecord
+from app.models.game import Game, RoundSubmission, RoundSummary
+from app.models.player import Employee, Player, Shop
+from app.models.product import RoundProduction
+from app.services.finance_service import FinanceService
+from app.services.ledger_service import LedgerService
+from app.services.round_job_service import RoundJobService
+from app.services.round_service import RoundService
+from app.services.settlement_service import SettlementService
+from app.utils.customer_flow_table import CustomerFlowTable
+from app.utils.game_constants import GameConstants
+
+
+def _setup_round(game, players, make_recipe, unlock_product, high=6, low=10, round_number=1):
+    """每名玩家生产 5 杯同一配方，价格依次 15/20；写入本回合客流。"""
+    recipe = make_recipe()
+    for index, player in enumerate(players):
+        product = unlock_product(player.id, recipe.id, price=15 + 5 * index)
+        db.session.add(RoundProduction(
+            player_id=player.id, round_number=round_number, product_id=product.id,
+            allocated_productivity=5, price=15 + 5 * index, produced_quantity=5,
+        ))
+        db.session.add(RoundSubmission(game_id=game.id, round_number=round_number, player_id=player.id))
+    CustomerFlowTable.set_overrides(game, {round_number: {"high": high, "low": low}})
+    db.session.commit()
+
+
+def test_advance_publishes_precomputed_settlement(app_ctx, two_players, make_recipe, unlock_product, count_sql):
+    """最后一次提交后预计算的分配结果在推进回合时直接写入，不再重新加载结算输入。"""
+    game, p1, p2 = two_players
+    _setup_round(game, [p1, p2], make_recipe, unlock_product)
+    game_id = game.id
+
+    SettlementService.schedule(game_id, 1)
+    precomputed = SettlementService.get_allocation(game_id, 1)
+
+    with count_sql() as statements:
+        result = RoundService.advance_round(game_id)
+
+    assert result["allocation_result"] is precomputed
+    assert not any("product_recipes.base_fan_rate" in s for s in statements)
+
+    sold = {
+        prod.player_id: prod.sold_quantity
+        for prod in RoundProduction.query.filter_by(round_number=1).all()
+    }
+    assert sold == {p1.id: 5, p2.id: 5}
+
+
+def test_advance_settles_round_in_one_commit(app_ctx, two_players, make_recipe, unlock_product):
+    """先单独提交认领（只写 games.status），销量、收入、财务记录与回合推进在第二个事务中一起提交。"""
+    game, p1, p2 = two_players
+    _setup_round(game, [p1, p2], make_recipe, unlock_product)
+    game_id = game.id
+
+    transactions = [[]]
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.split(None, 1)[0].upper() in ("INSERT", "UPDATE", "DELETE"):
+            transactions[-1].append(statement)
+
+    def _commit(conn):
+        transactions.append([])
+
+    event.listen(db.engine, "before_cursor_execute", _record)
+    event.listen(db.engine, "commit", _commit)
+    try:
+        RoundService.advance_round(game_id)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", _record)
+        event.remove(db.engine, "commit", _commit)
+
+    claim, settlement, after = transactions
+    assert len(claim) == 1 and claim[0].startswith("UPDATE games SET status")
+    # games 行只在提交前的最后一条语句才被锁住
+    assert settlement[-1].startswith("UPDATE games SET") and "current_round" in settlement[-1]
+    assert not any(s.startswith("UPDATE games") for s in settlement[:-1])
+    assert after == []
+    assert db.session.get(Game, game_id).current_round == 2
+    assert db.session.get(Game, game_id).status == 'in_progress'
+    records = {r.player_id: float(r.total_revenue) for r in FinanceRecord.query.filter_by(round_number=1).all()}
+    assert records == {p1.id: 75.0, p2.id: 100.0}
+
+
+def test_advance_rolls_back_when_settlement_fails(app_ctx, two_players, make_recipe, unlock_product, monkeypatch):
+    """结算中途失败时整体回滚并释放认领，不会留下写了销量却未推进的回合。"""
+    game, p1, p2 = two_players
+    _setup_round(game, [p1, p2], make_recipe, unlock_product)
+    game_id = game.id
+    cash_before = float(p1.cash)
+
+    def _fail(*args, **kwargs):
+        raise RuntimeError("finance failure")
+
+    monkeypatch.setattr(FinanceService, "generate_finance_records_for_game", _fail)
+
+    with pytest.raises(RuntimeError):
+        RoundService.advance_round(game_id)
+
+    assert db.session.get(Game, game_id).current_round == 1
+    assert db.session.get(Game, game_id).status == 'in_progress'
+    assert float(db.session.get(Player, p1.id).cash) == cash_before
+    assert all(prod.sold_quantity == 0 for prod in RoundProduction.query.all())
+    assert FinanceRecord.query.count() == 0
+
+
+def test_settled_result_is_published_only_after_commit(app_ctx, two_players, make_recipe, unlock_product, monkeypatch):
+    """结算事务提交失败时不发布结果；认领释放后可以重新推进。"""
+    game, p1, p2 = two_players
+    _setup_round(game, [p1, p2], make_recipe, unlock_product)
+    game_id = game.id
+
+    commit = db.session.commit
+    calls = []
+
+    def _commit():
+        calls.append(RoundService._settled.get(game_id, 1))
+        if len(calls) == 2:
+            raise RuntimeError("commit failure")
+        commit()
+
+    monkeypatch.setattr(db.session, "commit", _commit)
+    with pytest.raises(RuntimeError):
+        RoundService.advance_round(game_id)
+    monkeypatch.undo()
+
+    assert calls[:2] == [None, None]
+    assert RoundService._settled.get(game_id, 1) is None
+    assert db.session.get(Game, game_id).status == 'in_progress'
+
+    result = RoundService.advance_round(game_id)
+    assert RoundService._settled.get(game_id, 1) is result
+    assert db.session.get(Game, game_id).current_round == 2
+
+
+def test_advance_waits_for_the_round_being_settled(app_ctx, two_players, make_recipe, unlock_product, monkeypatch):
+    """回合正在被其他请求结算时不再认领、不写入，只等待其提交。"""
+    game, p1, p2 = two_players
+    _setup_round(game, [p1, p2], make_recipe, unlock_product)
+    game_id = game.id
+    game.status = 'settling'
+    db.session.commit()
+
+    def _no_allocation(*args, **kwargs):
+        raise AssertionError("a waiting request must not allocate")
+
+    monkeypatch.setattr(SettlementService, "get_allocation", _no_allocation)
+    monkeypatch.setattr(RoundService, "SETTLE_WAIT_SECONDS", 0)
+    with pytest.raises(ValueError, match="still being settled"):
+        RoundService.advance_round(game_id)
+
+    # 胜者在等待期间提交
+    def _winner_commits(seconds):
+        db.session.execute(db.update(Game).where(Game.id == game_id).values(current_round=2, status='in_progress'))
+        db.session.commit()
+
+    monkeypatch.setattr(RoundService, "SETTLE_WAIT_SECONDS", 5)
+    monkeypatch.setattr("app.services.round_service.time.sleep", _winner_commits)
+    result = RoundService.advance_round(game_id, expected_round=1)
+    assert (result["previous_round"], result["current_round"]) == (1, 2)
+    assert all(prod.sold_quantity == 0 for prod in RoundProduction.query.all())
+
+
+def test_advance_sql_count_does_not_grow_with_players(app_ctx, make_recipe, unlock_product, count_sql):
+    """结算的收入入账直接取自分配结果并批量写入流水，SQL 条数与玩家数无关。"""
+    counts = {}
+    for n in (2, 5):
+        game = Game(room_code=f"SQL0{n}", status="in_progress", current_round=1, max_players=8)
+        db.session.add(game)
+        db.session.flush()
+        players = [
+            Player(game_id=game.id, nickname=f"P{i}", player_number=i, turn_order=i, cash=10000)
+            for i in range(1, n + 1)
+        ]
+        db.session.add_all(players)
+        db.session.commit()
+        _setup_round(game, players, make_recipe, unlock_product, high=30, low=60)
+        player_ids = [player.id for player in players]
+
+        with count_sql() as statements:
+            RoundService.advance_round(game.id)
+        counts[n] = len(statements)
+
+        revenue = {entry["player_id"]: entry["amount"] for pid in player_ids for entry in LedgerService.get_entries(pid)}
+        assert revenue == {pid: 75.0 + 25.0 * i for i, pid in enumerate(player_ids)}
+        assert [float(db.session.get(Player, pid).cash) for pid in player_ids] == [10000 + revenue[pid] for pid in player_ids]
+
+    assert counts[5] == counts[2]
+
+
+def test_game_finance_records_match_per_player_generation(app_ctx, two_players, make_recipe, unlock_product, count_sql):
+    """整局批量生成的财务记录与逐个玩家生成的结果一致，查询数与玩家数无关。"""
+    game, p1, p2 = two_players
+    _setup_round(game, [p1, p2], make_recipe, unlock_product)
+    db.session.add(Shop(player_id=p1.id, location="downtown", rent=500, created_round=1))
+    LedgerService.record(p2, 1, "advertisement", -300)
+    LedgerService.record(p2, 1, "market_research", -100)
+    db.session.commit()
+    shop = Shop.query.filter_by(player_id=p1.id).one()
+    db.session.add(Employee(shop_id=shop.id, name="A", salary=200, productivity=10, hired_round=1))
+    db.session.add(Employee(shop_id=shop.id, name="B", salary=150, productivity=10, hired_round=1))
+    db.session.commit()
+    game_id = game.id
+
+    expected = {}
+    for player in (p1, p2):
+        record = FinanceService.generate_finance_record(player.id, 1)
+        expected[player.id] = record.to_dict()
+        db.session.delete(record)
+    db.session.commit()
+
+    with count_sql() as statements:
+        created = FinanceService.generate_finance_records_for_game(game_id, 1)
+
+    assert created == 2
+    assert sum(s.lstrip().startswith("INSERT INTO finance_records") for s in statements) == 1
+
+    for player_id, record in expected.items():
+        batched = FinanceService.get_finance_record(player_id, 1)
+        for key in ("revenue", "expenses", "profit"):
+            assert batched[key] == record[key]
+    assert expected[p1.id]["expenses"]["salary"] == 350.0
+    assert expected[p2.id]["expenses"]["advertisement"] == 300.0
+
+
+def test_async_advance_is_deduplicated_per_game_round(app_ctx, two_players, make_recipe, unlock_product):
+    """同一局同一回合只会有一个推进任务，重复请求返回同一任务。"""
+    game, p1, p2 = two_players
+    _setup_round(game, [p1, p2], make_recipe, unlock_product)
+    game_id = game.id
+
+    job = RoundJobService.enqueue_advance(game_id)
+    assert job["status"] == "succeeded"
+    assert job["round_number"] == 1
+    assert job["result"]["current_round"] == 2
+
+    polled = RoundJobService.get_job(job["job_id"])
+    assert polled["result"]["previous_round"] == 1
+
+    # 已推进到第 2 回合，过期任务不会再次推进，直接拿到第 1 回合的结果
+    assert RoundService.advance_round(game_id, expected_round=1)["previous_round"] == 1
+    assert db.session.get(Game, game_id).current_round == 2
+    with pytest.raises(ValueError):
+        RoundService.advance_round(game_id, expected_round=3)
+    assert RoundJobService.get_job("missing") is None
+
+
+def test_async_advance_reuses_live_job(app_ctx, two_players):
+    """排队中的任务被重复请求时直接返回，不会再排一次。"""
+    game, _, _ = two_players
+    game_id = game.id
+    job_id = "queued-job"
+    RoundJobService._jobs[job_id] = {
+        "job_id": job_id, "game_id": game_id, "round_number": 1, "status": "queued",
+        "result": None, "error": None, "created_at": None, "finished_at": None,
+    }
+    RoundJobService._by_round[(game_id, 1)] = job_id
+
+    assert RoundJobService.enqueue_advance(game_id)["job_id"] == job_id
+    assert len(RoundJobService._jobs) == 1
+
+
+def test_async_advance_rejected_when_queue_is_full(app, two_players, make_recipe, unlock_product):
+    """排队与执行中的任务达到上限时拒绝新请求（503），已有任务的回合仍返回原任务。"""
+    game, p1, p2 = two_players
+    _setup_round(game, [p1, p2], make_recipe, unlock_product)
+    game_id = game.id
+    app.config["ROUND_ADVANCE_MAX_PENDING"] = 1
+    RoundJobService._jobs["other-game"] = {
+        "job_id": "other-game", "game_id": game_id + 1, "round_number": 1, "status": "running",
+        "result": None, "error": None, "created_at": None, "finished_at": None,
+    }
+    RoundJobService._by_round[(game_id + 1, 1)] = "other-game"
+    client = app.test_client()
+
+    response = client.post(f"/api/v1/rounds/{game_id}/advance?async=true")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert response.get_json()["success"] is False
+    assert db.session.get(Game, game_id).current_round == 1
+    assert len(RoundJobService._jobs) == 1
+
+    RoundJobService._finish("other-game", "succeeded")
+    assert client.post(f"/api/v1/rounds/{game_id}/advance?async=true").status_code == 202
+
+
+def test_concurrent_advance_loser_returns_winner_result(app, two_players, make_recipe, unlock_product, monkeypatch):
+    """回合已被其他请求推进时，CAS 失败的请求直接返回胜者结果，不重新分配、不重复记销量和现金。"""
+    game, p1, p2 = two_players
+    _setup_round(game, [p1, p2], make_recipe, unlock_product)
+    game_id = game.id
+    cash_before = float(p1.cash)
+
+    winner = RoundService.advance_round(game_id)
+
+    def _no_allocation(*args, **kwargs):
+        raise AssertionError("loser must not recompute the allocation")
+
+    monkeypatch.setattr(SettlementService, "get_allocation", _no_allocation)
+
+    # 模拟另一请求在胜者提交前读到的旧状态
+    set_committed_value(db.session.get(Game, game_id), "current_round", 1)
+    loser = RoundService.advance_round(game_id)
+    assert loser is winner
+
+    # 进程内没有胜者结果时从数据库重建
+    RoundService._settled.clear()
+    set_committed_value(db.session.get(Game, game_id), "current_round", 1)
+    rebuilt = RoundService.advance_round(game_id)
+    assert rebuilt["previous_round"] == 1
+    assert rebuilt["current_round"] == 2
+    assert rebuilt["allocation_result"]["total_revenue"] == winner["allocation_result"]["total_revenue"]
+
+    # 胜者提交后才到达的重复请求（同步接口带 expected_round）
+    response = app.test_client().post(f"/api/v1/rounds/{game_id}/advance", json={"expected_round": 1})
+    assert response.status_code == 200
+    assert response.get_json()["data"]["previous_round"] == 1
+
+    assert db.session.get(Game, game_id).current_round == 2
+    assert float(db.session.get(Player, p1.id).cash) == cash_before + 75.0
+    assert [(e["entry_type"], e["amount"]) for e in LedgerService.get_entries(p1.id)] == [("revenue", 75.0)]
+    assert [prod.sold_quantity for prod in RoundProduction.query.order_by(RoundProduction.id)] == [5, 5]
+    assert FinanceRecord.query.count() == 2
+
+
+def test_advance_logs_one_record_with_stage_timings(app_ctx, two_players, make_recipe, unlock_product):
+    """每次结算输出一条带分阶段耗时与 SQL 条数的日志；级别关闭时不输出。"""
+    game, p1, p2 = two_players
+    _setup_round(game, [p1, p2], make_recipe, unlock_product)
+    game_id = game.id
+
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    root = logging.getLogger("naicha")
+    root.addHandler(handler)
+    try:
+        root.setLevel(logging.WARNING)
+        SettlementService.get_allocation(game_id, 1)
+        assert records == []
+
+        root.setLevel(logging.INFO)
+        RoundService.advance_round(game_id)
+    finally:
+        root.removeHandler(handler)
+        root.setLevel(logging.INFO)
+
+    settled = [r for r in records if r.getMessage() == "round_settled"]
+    assert len(settled) == 1
+    fields = settled[0].fields
+    assert fields["game_id"] == game_id and fields["round_number"] == 1
+    assert set(fields["stages_ms"]) == {"verify", "flow", "allocate", "claim", "revenue", "finance", "summary", "commit"}
+    assert fields["sql_count"]["claim"] == 1
+    assert fields["sql_total"] == sum(fields["sql_count"].values()) > 0
+    assert json.loads(JsonFormatter().format(settled[0]))["event"] == "round_settled"
+
+
+def test_round_summary_snapshot_served_with_etag(app, two_players, make_recipe, unlock_product, count_sql):
+    """结算时写入回合摘要快照；之后读取只查一行，带 ETag 的重复请求返回 304。"""
+    game, p1, p2 = two_players
+    _setup_round(game, [p1, p2], make_recipe, unlock_product)
+    game_id = game.id
+    RoundService.advance_round(game_id)
+
+    snapshot = RoundSummary.query.filter_by(game_id=game_id, round_number=1).one()
+    assert [p["total_sold"] for p in snapshot.payload["players"]] == [5, 5]
+
+    with count_sql() as statements:
+        summary, etag = RoundService.get_round_summary_with_etag(game_id, 1)
+
+    assert len(statements) == 1
+    assert etag == snapshot.etag
+    assert summary["players"][1]["round_profit"] == 100.0
+
+    client = app.test_client()
+    first = client.get(f"/api/v1/rounds/{game_id}/1/summary")
+    assert first.status_code == 200
+    assert first.headers["ETag"] == f'"{etag}"'
+
+    again = client.get(f"/api/v1/rounds/{game_id}/1/summary", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_final_report_built_when_last_round_settles(app, two_players, make_recipe, unlock_product):
+    """最后一回合结算时生成终局报告，之后由一个接口直接返回。"""
+    game, p1, p2 = two_players
+    game.current_round = GameConstants.TOTAL_ROUNDS
+    _setup_round(game, [p1, p2], make_recipe, unlock_product, round_number=GameConstants.TOTAL_ROUNDS)
+    game_id = game.id
+
+    result = RoundService.advance_round(game_id)
+    assert result["game_finished"] is True
+    assert db.session.get(Game, game_id).finished_at is not None
+
+    report = FinalReport.query.filter_by(game_id=game_id).one()
+    payload = report.payload
+    assert payload["rounds"] == [GameConstants.TOTAL_ROUNDS]
+    assert [r["player_id"] for r in payload["rankings"]] == [p2.id, p1.id]
+    assert payload["players"][0]["series"]["revenue"] == [100.0]
+    assert payload["players"][0]["products"][0]["sold"] == 5
+
+    client = app.test_client()
+    response = client.get(f"/api/v1/finance/game/{game_id}/final-report")
+    assert response.status_code == 200
+    assert response.get_json()["data"] == payload
+    assert response.headers["ETag"] == f'"{report.etag}"'
+
+
+def test_legacy_final_report_survives_concurrent_first_build(app_ctx, two_players, monkeypatch):
+    """旧游戏首次请求终局报告时并发生成，唯一约束冲突的一方读取已保存的报告。"""
+    game, _, _ = two_players
+    game.status = "finished"
+    db.session.commit()
+    game_id = game.id
+
+    build = FinanceService.build_final_report
+
+    def _racing_build(game_id):
+        # 另一请求抢先提交了报告
+        build(game_id)
+        db.session.commit()
+        return build(game_id)
+
+    monkeypatch.setattr(FinanceService, "build_final_report", _racing_build)
+
+    payload, etag = FinanceService.get_final_report(game_id)
+    assert etag == FinalReport.query.filter_by(game_id=game_id).one().etag
+    assert payload["rankings"]
+
+
+def test_round_expenses_use_fixed_aggregate_queries(app_ctx, two_players, count_sql):
+    """单个玩家与整局的回合支出都用固定条数的聚合查询计算。"""
+    game, p1, p2 = two_players
+    db.session.add(Shop(player_id=p1.id, location="downtown", rent=500, created_round=1))
+    LedgerService.record(p1, 1, "product_research", -600)
+    LedgerService.record(p1, 1, "advertisement", -300)
+    LedgerService.record(p1, 1, "material", -123.45)
+    LedgerService.record(p1, 1, "revenue", 2000)
+    LedgerService.record(p1, 2, "advertisement", -999)
+    db.session.commit()
+    shop = Shop.query.filter_by(player_id=p1.id).one()
+    db.session.add_all([
+        Employee(shop_id=shop.id, name=f"E{i}", salary=100, productivity=10, hired_round=1, is_active=i < 3)
+        for i in range(4)
+    ])
+    db.session.commit()
+    player_id, game_id = p1.id, game.id
+
+    with count_sql() as statements:
+        expenses = RoundService.calculate_round_expenses(player_id, 1)
+
+    assert len(statements) == 3
+    assert expenses == {
+        "rent": 500.0, "salary": 300.0, "material": 123.45, "decoration": 0.0,
+        "market_research": 0.0, "advertisement": 300.0, "product_research": 600.0,
+        "total": 1823.45,
+    }
+    assert RoundService.calculate_round_expenses_for_game(game_id, 1)[player_id] == expenses
+
+    with pytest.raises(ValueError):
+        RoundService.calculate_round_expenses(999, 1)
@@ -0,0 +1,84 @@
+from app.core.database import db
+from app.models.product import RoundProduction
+from app.services.preview_service import SalesPreviewService
+from app.utils.customer_flow_table import CustomerFlowTable
+
+
+def _submit(player, product, quantity, price):
+    db.session.add(RoundProduction(
+        player_id=player.id, round_number=1, product_id=product.id,
+        allocated_productivity=quantity, price=price, produced_quantity=quantity,
+    ))
+
+
+def test_preview_projects_override_without_persisting(app_ctx, two_players, make_recipe, unlock_product):
+    """
+    低消费客户按价格优先：P1 把价格从 20 调到 10 后应抢到更多低消费客户。
+    预览不写数据库。
+    """
+    game, p1, p2 = two_players
+    recipe = make_recipe()
+    pp1 = unlock_product(p1.id, recipe.id, price=20)
+    pp2 = unlock_product(p2.id, recipe.id, price=15)
+    _submit(p1, pp1, 10, 20)
+    _submit(p2, pp2, 10, 15)
+    CustomerFlowTable.set_overrides(game, {1: {"high": 0, "low": 12}})
+    db.session.commit()
+
+    result = SalesPreviewService.preview_sales(
+        p1.id, 1, override={"product_id": pp1.id, "price": 10}
+    )
+
+    assert result["baseline"]["products"][0]["sold"] == 2
+    assert result["projected"]["products"][0]["sold"] == 10
+    assert result["projected"]["total_revenue"] == 100.0
+
+    # 未写入数据库
+    production = RoundProduction.query.filter_by(player_id=p1.id, round_number=1).first()
+    assert production.sold_quantity == 0
+    assert float(production.price) == 20.0
+
+
+def test_preview_is_memoized_per_game_round(app_ctx, two_players, make_recipe, unlock_product, count_sql):
+    """同一调整项重复预览不再重新加载结算输入。"""
+    game, p1, p2 = two_players
+    recipe = make_recipe()
+    pp1 = unlock_product(p1.id, recipe.id, price=20)
+    _submit(p1, pp1, 10, 20)
+    CustomerFlowTable.set_overrides(game, {1: {"high": 5, "low": 5}})
+    db.session.commit()
+    player_id = p1.id
+
+    override = {"product_id": pp1.id, "price": 25}
+    first = SalesPreviewService.preview_sales(player_id, 1, override=override)
+
+    with count_sql() as statements:
+        again = SalesPreviewService.preview_sales(player_id, 1, override=override)
+
+    assert again == first
+    # 只剩玩家存在性与定价锁定校验，不再重新加载结算输入
+    assert not any("round_productions" in s for s in statements)
+
+
+def test_preview_memo_is_bounded_per_game(app_ctx, two_players, make_recipe, unlock_product):
+    """每个不同的调整项都会缓存一条预览，同一局内条数受上限约束，最近使用的保留。"""
+    game, p1, _ = two_players
+    recipe = make_recipe()
+    pp1 = unlock_product(p1.id, recipe.id, price=20)
+    _submit(p1, pp1, 10, 20)
+    CustomerFlowTable.set_overrides(game, {1: {"high": 5, "low": 5}})
+    db.session.commit()
+    player_id, game_id = p1.id, game.id
+    limit = SalesPreviewService.MAX_PREVIEWS_PER_GAME
+
+    for productivity in range(limit + 20):
+        SalesPreviewService.preview_sales(
+            player_id, 1, override={"product_id": pp1.id, "price": 25, "productivity": productivity}
+        )
+
+    previews = SalesPreviewService._previews
+    assert len(previews._games[game_id]) == limit
+    # 基准预览每次都被访问，不会被淘汰
+    assert previews.get(game_id, (1, player_id, None)) is not None
+    assert previews.get(game_id, (1, player_id, (pp1.id, 25.0, 0))) is None
+    assert previews.get(game_id, (1, player_id, (pp1.id, 25.0, limit + 19))) is not None